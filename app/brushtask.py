@@ -1,22 +1,19 @@
-import re
-import sys
 import time
 from datetime import datetime
 
-import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
+from cacheout import Cache
 
 import log
 from app.downloader.client import Qbittorrent, Transmission
 from app.filter import Filter
-from app.helper import DbHelper
+from app.helper import DbHelper, RssHelper, BrushRuleHelper
 from app.message import Message
 from app.rss import Rss
 from app.sites import Sites
 from app.utils import StringUtils, Torrent, ExceptionUtils
 from app.utils.commons import singleton
-from app.utils.types import BrushDeleteType
-from config import BRUSH_REMOVE_TORRENTS_INTERVAL, Config
+from config import BRUSH_REMOVE_TORRENTS_INTERVAL, BRUSH_TORRENTS_CACHE_SIZE, BRUSH_TORRENTS_CACHE_EXPIRE, Config
 
 
 @singleton
@@ -25,9 +22,11 @@ class BrushTask(object):
     sites = None
     filter = None
     dbhelper = None
+    rsshelper = None
     _scheduler = None
     _brush_tasks = []
-    _torrents_cache = []
+    # 已处理过的种子下载链接
+    _torrents_cache = Cache(maxsize=BRUSH_TORRENTS_CACHE_SIZE, ttl=BRUSH_TORRENTS_CACHE_EXPIRE, timer=time.time)
     _downloader_infos = []
     _qb_client = "qbittorrent"
     _tr_client = "transmission"
@@ -37,6 +36,7 @@ class BrushTask(object):
 
     def init_config(self):
         self.dbhelper = DbHelper()
+        self.rsshelper = RssHelper()
         self.message = Message()
         self.sites = Sites()
         self.filter = Filter()
@@ -185,7 +185,14 @@ class BrushTask(object):
                                            dlcount=rss_rule.get("dlcount")):
             return
 
-        rss_result = Rss.parse_rssxml(rss_url)
+        # 选种规则变化时重新处理全部条目
+        rss_consumer = "brush%s" % taskid
+        rss_result = Rss.parse_rssxml(url=rss_url,
+                                      consumer=rss_consumer,
+                                      context=self.rsshelper.get_context(rss_rule, rss_free, cookie, ua))
+        if rss_result is None:
+            log.info("【Brush】%s RSS没有新的数据" % site_name)
+            return
         if len(rss_result) == 0:
             log.warn("【Brush】%s RSS未下载到数据" % site_name)
             return
@@ -198,7 +205,35 @@ class BrushTask(object):
             downloading_count = self.__get_downloading_count(downloader_cfg) or 0
             new_torrent_count = int(max_dlcount) - int(downloading_count)
 
+        # 先按不需要访问详情页面的条件筛选，再并发预取候选种子的详情页面
+        candidates = []
         for res in rss_result:
+            try:
+                # 种子名
+                torrent_name = res.get('title')
+                # 种子链接
+                enclosure = res.get('enclosure')
+                if self._torrents_cache.get(enclosure):
+                    log.debug("【Brush】%s 已处理过" % torrent_name)
+                    continue
+                self._torrents_cache.set(enclosure, True)
+                # 检查种子是否符合选种规则
+                if not BrushRuleHelper.check_rss_rule(rss_rule=rss_rule,
+                                                      title=torrent_name,
+                                                      torrent_size=res.get('size'),
+                                                      pubdate=res.get('pubdate')):
+                    continue
+                candidates.append(res)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                continue
+        if rss_rule and candidates:
+            self.sites.prefetch_torrent_attrs(torrent_urls=[res.get('link') for res in candidates],
+                                              cookie=cookie,
+                                              ua=ua,
+                                              proxy=site_proxy)
+
+        for index, res in enumerate(candidates):
             try:
                 # 种子名
                 torrent_name = res.get('title')
@@ -208,24 +243,14 @@ class BrushTask(object):
                 page_url = res.get('link')
                 # 种子大小
                 size = res.get('size')
-                # 发布时间
-                pubdate = res.get('pubdate')
-
-                if enclosure not in self._torrents_cache:
-                    self._torrents_cache.append(enclosure)
-                else:
-                    log.debug("【Brush】%s 已处理过" % torrent_name)
-                    continue
 
-                # 检查种子是否符合选种规则
-                if not self.__check_rss_rule(rss_rule=rss_rule,
-                                             title=torrent_name,
-                                             torrent_url=page_url,
-                                             torrent_size=size,
-                                             pubdate=pubdate,
-                                             cookie=cookie,
-                                             ua=ua,
-                                             proxy=site_proxy):
+                # 检查种子详情是否符合选种规则
+                if not self.__check_rss_attr_rule(rss_rule=rss_rule,
+                                                  title=torrent_name,
+                                                  torrent_url=page_url,
+                                                  cookie=cookie,
+                                                  ua=ua,
+                                                  proxy=site_proxy):
                     continue
                 # 开始下载
                 log.debug("【Brush】%s 符合条件，开始下载..." % torrent_name)
@@ -243,16 +268,17 @@ class BrushTask(object):
                                            site_info=site_info):
                     # 计数
                     success_count += 1
-                    # 添加种子后不能超过最大下载数量
-                    if max_dlcount and success_count >= new_torrent_count:
-                        break
-
-                    # 再判断一次
-                    if not self.__is_allow_new_torrent(taskid=taskid,
-                                                       taskname=task_name,
-                                                       seedsize=seed_size,
-                                                       dlcount=rss_rule.get("dlcount"),
-                                                       downloadercfg=downloader_cfg):
+                    # 添加种子后不能超过最大下载数量，或再判断一次不允许继续添加
+                    if (max_dlcount and success_count >= new_torrent_count) \
+                            or not self.__is_allow_new_torrent(taskid=taskid,
+                                                               taskname=task_name,
+                                                               seedsize=seed_size,
+                                                               dlcount=rss_rule.get("dlcount"),
+                                                               downloadercfg=downloader_cfg):
+                        # 未处理的条目下次重新处理
+                        for item in candidates[index + 1:]:
+                            self._torrents_cache.delete(item.get('enclosure'))
+                        self.rsshelper.forget(consumer=rss_consumer, url=rss_url, items=candidates[index + 1:])
                         break
             except Exception as err:
                 ExceptionUtils.exception_traceback(err)
@@ -307,7 +333,7 @@ class BrushTask(object):
                 client_type = downloader_cfg.get("type")
                 # qbittorrent
                 if client_type == self._qb_client:
-                    downloader = Qbittorrent(config=downloader_cfg)
+                    downloader = Qbittorrent.get_instance(config=downloader_cfg)
                     # 检查完成状态的
                     torrents, has_err = downloader.get_torrents(ids=torrent_ids, status=["completed"])
                     # 看看是否有错误, 有错误的话就不处理了
@@ -338,12 +364,12 @@ class BrushTask(object):
                         # 下载量
                         downloaded = torrent.get("downloaded")
                         total_downloaded += downloaded
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            seeding_time=seeding_time,
-                                                                            ratio=ratio,
-                                                                            uploaded=uploaded,
-                                                                            avg_upspeed=avg_upspeed,
-                                                                            iatime=iatime)
+                        need_delete, delete_type = BrushRuleHelper.check_remove_rule(remove_rule=remove_rule,
+                                                                                     seeding_time=seeding_time,
+                                                                                     ratio=ratio,
+                                                                                     uploaded=uploaded,
+                                                                                     avg_upspeed=avg_upspeed,
+                                                                                     iatime=iatime)
                         if need_delete:
                             log.info(
                                 "【Brush】%s 做种达到删种条件：%s，删除任务..." % (torrent.get('name'), delete_type.value))
@@ -378,10 +404,10 @@ class BrushTask(object):
                         # 下载量
                         downloaded = torrent.get("downloaded")
                         total_downloaded += downloaded
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            dltime=dltime,
-                                                                            avg_upspeed=avg_upspeed,
-                                                                            iatime=iatime)
+                        need_delete, delete_type = BrushRuleHelper.check_remove_rule(remove_rule=remove_rule,
+                                                                                     dltime=dltime,
+                                                                                     avg_upspeed=avg_upspeed,
+                                                                                     iatime=iatime)
                         if need_delete:
                             log.info(
                                 "【Brush】%s 达到删种条件：%s，删除下载任务..." % (torrent.get('name'), delete_type.value))
@@ -396,7 +422,7 @@ class BrushTask(object):
                     # 将查询的torrent_ids转为数字型
                     torrent_ids = [int(x) for x in torrent_ids if str(x).isdigit()]
                     # 检查完成状态
-                    downloader = Transmission(config=downloader_cfg)
+                    downloader = Transmission.get_instance(config=downloader_cfg)
                     torrents, has_err = downloader.get_torrents(ids=torrent_ids, status=["seeding", "seed_pending"])
                     # 看看是否有错误, 有错误的话就不处理了
                     if has_err:
@@ -421,11 +447,11 @@ class BrushTask(object):
                         total_uploaded += uploaded
                         # 平均上传速度
                         avg_upspeed = int(uploaded / dltime)
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            seeding_time=seeding_time,
-                                                                            ratio=ratio,
-                                                                            uploaded=uploaded,
-                                                                            avg_upspeed=avg_upspeed)
+                        need_delete, delete_type = BrushRuleHelper.check_remove_rule(remove_rule=remove_rule,
+                                                                                     seeding_time=seeding_time,
+                                                                                     ratio=ratio,
+                                                                                     uploaded=uploaded,
+                                                                                     avg_upspeed=avg_upspeed)
                         if need_delete:
                             log.info("【Brush】%s 做种达到删种条件：%s，删除任务..." % (torrent.name, delete_type.value))
                             if sendmessage:
@@ -456,9 +482,9 @@ class BrushTask(object):
                         total_uploaded += uploaded
                         # 平均上传速度
                         avg_upspeed = int(uploaded / dltime)
-                        need_delete, delete_type = self.__check_remove_rule(remove_rule=remove_rule,
-                                                                            dltime=dltime,
-                                                                            avg_upspeed=avg_upspeed)
+                        need_delete, delete_type = BrushRuleHelper.check_remove_rule(remove_rule=remove_rule,
+                                                                                     dltime=dltime,
+                                                                                     avg_upspeed=avg_upspeed)
                         if need_delete:
                             log.info("【Brush】%s 达到删种条件：%s，删除下载任务..." % (torrent.name, delete_type.value))
                             if sendmessage:
@@ -555,14 +581,14 @@ class BrushTask(object):
         if not downloadercfg:
             return 0
         if downloadercfg.get("type") == self._qb_client:
-            downloader = Qbittorrent(config=downloadercfg)
+            downloader = Qbittorrent.get_instance(config=downloadercfg)
             if not downloader.qbc:
                 return None
             dlitems = downloader.get_downloading_torrents()
             if dlitems is not None:
                 return int(len(dlitems))
         else:
-            downloader = Transmission(config=downloadercfg)
+            downloader = Transmission.get_instance(config=downloadercfg)
             if not downloader.trc:
                 return None
             dlitems = downloader.get_downloading_torrents()
@@ -614,7 +640,7 @@ class BrushTask(object):
             # 添加下载
             if downloadercfg.get("type") == self._qb_client:
                 # 初始化下载器
-                downloader = Qbittorrent(config=downloadercfg)
+                downloader = Qbittorrent.get_instance(config=downloadercfg)
                 if not downloader.qbc:
                     log.error("【Brush】任务 %s 下载器 %s 无法连接" % (taskname, downloadercfg.get("name")))
                     return False
@@ -639,7 +665,7 @@ class BrushTask(object):
                             downloader.torrents_set_force_start(download_id)
             else:
                 # 初始化下载器
-                downloader = Transmission(config=downloadercfg)
+                downloader = Transmission.get_instance(config=downloadercfg)
                 if not downloader.trc:
                     log.error("【Brush】任务 %s 下载器 %s 无法连接" % (taskname, downloadercfg.get("name")))
                     return False
@@ -680,180 +706,29 @@ class BrushTask(object):
 
         return True
 
-    def __check_rss_rule(self,
-                         rss_rule,
-                         title,
-                         torrent_url,
-                         torrent_size,
-                         pubdate,
-                         cookie,
-                         ua,
-                         proxy):
+    def __check_rss_attr_rule(self,
+                              rss_rule,
+                              title,
+                              torrent_url,
+                              cookie,
+                              ua,
+                              proxy):
         """
-        检查种子是否符合刷流过滤条件
+        检查种子详情页面中的促销、HR、做种人数是否符合刷流过滤条件
         :param rss_rule: 过滤条件字典
         :param title: 种子名称
         :param torrent_url: 种子页面地址
-        :param torrent_size: 种子大小
-        :param pubdate: 发布时间
         :param cookie: Cookie
         :param ua: User-Agent
         :return: 是否命中
         """
         if not rss_rule:
             return True
-        # 检查种子大小
-        try:
-            if rss_rule.get("size"):
-                rule_sizes = rss_rule.get("size").split("#")
-                if rule_sizes[0]:
-                    if len(rule_sizes) > 1 and rule_sizes[1]:
-                        min_max_size = rule_sizes[1].split(',')
-                        min_size = min_max_size[0]
-                        if len(min_max_size) > 1:
-                            max_size = min_max_size[1]
-                        else:
-                            max_size = 0
-                        if rule_sizes[0] == "gt" and float(torrent_size) < float(min_size) * 1024 ** 3:
-                            return False
-                        if rule_sizes[0] == "lt" and float(torrent_size) > float(min_size) * 1024 ** 3:
-                            return False
-                        if rule_sizes[0] == "bw" and not float(min_size) * 1024 ** 3 < float(torrent_size) < float(
-                                max_size) * 1024 ** 3:
-                            return False
-
-            # 检查包含规则
-            if rss_rule.get("include"):
-                if not re.search(r"%s" % rss_rule.get("include"), title):
-                    return False
-
-            # 检查排除规则
-            if rss_rule.get("exclude"):
-                if re.search(r"%s" % rss_rule.get("exclude"), title):
-                    return False
-
-            torrent_attr = self.sites.check_torrent_attr(torrent_url=torrent_url,
-                                                         cookie=cookie,
-                                                         ua=ua,
-                                                         proxy=proxy)
-            torrent_peer_count = torrent_attr.get("peer_count")
-            log.debug("【Brush】%s 解析详情, %s" % (title, torrent_attr))
-
-            # 检查免费状态
-            if rss_rule.get("free") == "FREE":
-                if not torrent_attr.get("free"):
-                    log.debug("【Brush】不是一个FREE资源，跳过")
-                    return False
-            elif rss_rule.get("free") == "2XFREE":
-                if not torrent_attr.get("2xfree"):
-                    log.debug("【Brush】不是一个2XFREE资源，跳过")
-                    return False
-
-            # 检查HR状态
-            if rss_rule.get("hr"):
-                if torrent_attr.get("hr"):
-                    log.debug("【Brush】这是一个H&R资源，跳过")
-                    return False
+        torrent_attr = self.sites.check_torrent_attr(torrent_url=torrent_url,
+                                                     cookie=cookie,
+                                                     ua=ua,
+                                                     proxy=proxy)
+        return BrushRuleHelper.check_torrent_attr_rule(rss_rule=rss_rule,
+                                                       title=title,
+                                                       torrent_attr=torrent_attr)
 
-            # 检查做种人数
-            if rss_rule.get("peercount"):
-                # 兼容旧版本
-                peercount_str = rss_rule.get("peercount")
-                if not peercount_str:
-                    peercount_str = "#"
-                elif "#" not in peercount_str:
-                    peercount_str = "lt#" + peercount_str
-                else:
-                    pass
-                peer_counts = peercount_str.split("#")
-                if len(peer_counts) >= 2 and peer_counts[1]:
-                    min_max_count = peer_counts[1].split(',')
-                    min_count = int(min_max_count[0])
-                    if len(min_max_count) > 1:
-                        max_count = int(min_max_count[1])
-                    else:
-                        max_count = sys.maxsize
-                    if peer_counts[0] == "gt" and torrent_peer_count <= min_count:
-                        log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s threshold:%d" % (
-                            title, torrent_peer_count, peer_counts[0], min_count))
-                        return False
-                    if peer_counts[0] == "lt" and torrent_peer_count >= min_count:
-                        log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s threshold:%d" % (
-                            title, torrent_peer_count, peer_counts[0], min_count))
-                        return False
-                    if peer_counts[0] == "bw" and not (min_count <= torrent_peer_count <= max_count):
-                        log.debug("【Brush】%s `判断做种数, 判断条件: left:%d %s peer_count:%d %s right:%d" % (
-                            title, min_count, peer_counts[0], torrent_peer_count, peer_counts[0], max_count))
-                        return False
-
-            # 检查发布时间
-            if rss_rule.get("pubdate") and pubdate:
-                rule_pubdates = rss_rule.get("pubdate").split("#")
-                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
-                    localtz = pytz.timezone(Config().get_timezone())
-                    localnowtime = datetime.now().astimezone(localtz)
-                    localpubdate = pubdate.astimezone(localtz)
-                    log.debug('【Brush】发布时间：%s，当前时间：%s' % (localpubdate.isoformat(), localnowtime.isoformat()))
-                    if (localnowtime - localpubdate).seconds / 3600 > float(rule_pubdates[1]):
-                        log.debug("【Brush】发布时间不符合条件。")
-                        return False
-
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-
-        return True
-
-    @staticmethod
-    def __check_remove_rule(remove_rule, seeding_time=None, ratio=None, uploaded=None, dltime=None, avg_upspeed=None, iatime=None):
-        """
-        检查是否符合删种规则
-        :param remove_rule: 删种规则
-        :param seeding_time: 做种时间
-        :param ratio: 分享率
-        :param uploaded: 上传量
-        :param dltime: 下载耗时
-        :param avg_upspeed: 上传平均速度
-        :param iatime: 未活动时间
-        """
-        if not remove_rule:
-            return False
-        try:
-            if remove_rule.get("time") and seeding_time:
-                rule_times = remove_rule.get("time").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(seeding_time) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.SEEDTIME
-            if remove_rule.get("ratio") and ratio:
-                rule_ratios = remove_rule.get("ratio").split("#")
-                if rule_ratios[0]:
-                    if len(rule_ratios) > 1 and rule_ratios[1]:
-                        if float(ratio) > float(rule_ratios[1]):
-                            return True, BrushDeleteType.RATIO
-            if remove_rule.get("uploadsize") and uploaded:
-                rule_uploadsizes = remove_rule.get("uploadsize").split("#")
-                if rule_uploadsizes[0]:
-                    if len(rule_uploadsizes) > 1 and rule_uploadsizes[1]:
-                        if float(uploaded) > float(rule_uploadsizes[1]) * 1024 ** 3:
-                            return True, BrushDeleteType.UPLOADSIZE
-            if remove_rule.get("dltime") and dltime:
-                rule_times = remove_rule.get("dltime").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(dltime) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.DLTIME
-            if remove_rule.get("avg_upspeed") and avg_upspeed:
-                rule_avg_upspeeds = remove_rule.get("avg_upspeed").split("#")
-                if rule_avg_upspeeds[0]:
-                    if len(rule_avg_upspeeds) > 1 and rule_avg_upspeeds[1]:
-                        if float(avg_upspeed) < float(rule_avg_upspeeds[1]) * 1024:
-                            return True, BrushDeleteType.AVGUPSPEED
-            if remove_rule.get("iatime") and iatime:
-                rule_times = remove_rule.get("iatime").split("#")
-                if rule_times[0]:
-                    if len(rule_times) > 1 and rule_times[1]:
-                        if float(iatime) > float(rule_times[1]) * 3600:
-                            return True, BrushDeleteType.IATIME
-        except Exception as err:
-            ExceptionUtils.exception_traceback(err)
-        return False, BrushDeleteType.NOTDELETE
@@ -4,6 +4,7 @@ from config import Config
 from .main_db import MainDb
 from .main_db import DbPersist
 from .media_db import MediaDb
+from .engine import get_storage_profile
 from alembic.config import Config as AlembicConfig
 from alembic.command import upgrade as alembic_upgrade
 
@@ -18,6 +19,16 @@ def init_db():
     log.console('数据库初始化完成')
 
 
+def benchmark_db():
+    """
+    测试数据库在当前存储配置下的读写性能
+    """
+    profile, _ = get_storage_profile()
+    for db_name, db in [("user.db", MainDb), ("media.db", MediaDb)]:
+        write_tps, read_qps = db.benchmark()
+        log.console(f'数据库 {db_name} 存储配置：{profile}，写入：{write_tps} 事务/秒，读取：{read_qps} 次/秒')
+
+
 def init_data():
     """
     初始化数据
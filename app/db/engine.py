@@ -0,0 +1,78 @@
+import os
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+import log
+from app.utils import ExceptionUtils
+from config import Config, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_STORAGE_PROFILES
+
+# 默认的存储配置
+DEFAULT_STORAGE_PROFILE = "balanced"
+
+
+def get_storage_profile():
+    """
+    获取当前使用的存储配置
+    :return: 配置名称, PRAGMA字典
+    """
+    profile = Config().get_config('app').get('db_profile') or DEFAULT_STORAGE_PROFILE
+    if profile not in DB_STORAGE_PROFILES:
+        profile = DEFAULT_STORAGE_PROFILE
+    return profile, DB_STORAGE_PROFILES.get(profile)
+
+
+def create_sqlite_engine(db_name):
+    """
+    创建SQLite数据库引擎，每个新连接按存储配置设置PRAGMA
+    :param db_name: 配置目录下的数据库文件名
+    """
+    _, pragmas = get_storage_profile()
+    engine = create_engine(
+        f"sqlite:///{os.path.join(Config().get_config_path(), db_name)}?check_same_thread=False",
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def benchmark_engine(engine, write_count=200, read_count=2000):
+    """
+    测试数据库在当前存储配置下的读写性能，写入为单条记录的独立事务，读取为按主键查询
+    :return: 每秒写入事务数, 每秒读取次数
+    """
+    table_name = "DB_BENCHMARK"
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            conn.execute(text(f"CREATE TABLE {table_name} (ID INTEGER PRIMARY KEY, DATA TEXT)"))
+            start_time = time.time()
+            for i in range(write_count):
+                with conn.begin():
+                    conn.execute(text(f"INSERT INTO {table_name} (ID, DATA) VALUES (:id, :data)"),
+                                 {"id": i, "data": "x" * 200})
+            write_time = time.time() - start_time
+            start_time = time.time()
+            for i in range(read_count):
+                conn.execute(text(f"SELECT DATA FROM {table_name} WHERE ID = :id"),
+                             {"id": i % write_count}).fetchone()
+            read_time = time.time() - start_time
+            conn.execute(text(f"DROP TABLE {table_name}"))
+        return round(write_count / max(write_time, 1e-6)), round(read_count / max(read_time, 1e-6))
+    except Exception as e:
+        ExceptionUtils.exception_traceback(e)
+        log.warn(f"【Db】数据库性能测试出错：{str(e)}")
+        return 0, 0
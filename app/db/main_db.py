@@ -1,23 +1,16 @@
 import os
 import threading
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
+from app.db.engine import create_sqlite_engine, benchmark_engine
 from app.db.models import Base
 from app.utils import ExceptionUtils, PathUtils
 from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'user.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=50,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+# 写事务排队执行，避免多个线程同时争抢数据库写锁
+write_lock = threading.RLock()
+_Engine = create_sqlite_engine('user.db')
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False,
@@ -35,6 +28,13 @@ class MainDb:
         with lock:
             Base.metadata.create_all(_Engine)
 
+    @staticmethod
+    def benchmark():
+        """
+        测试数据库读写性能
+        """
+        return benchmark_engine(_Engine)
+
     def init_data(self):
         """
         读取config目录下的sql文件，并初始化到数据库，只处理一次
@@ -69,6 +69,15 @@ class MainDb:
         else:
             self.session.add(data)
 
+    def bulk_insert(self, model, rows):
+        """
+        批量插入数据，不创建ORM对象
+        :param model: 表对象
+        :param rows: 字段名 -> 值的字典列表
+        """
+        if rows:
+            self.session.execute(model.__table__.insert(), rows)
+
     def query(self, *obj):
         """
         查询对象
@@ -110,13 +119,14 @@ class DbPersist(object):
 
     def __call__(self, f):
         def persist(*args, **kwargs):
-            try:
-                ret = f(*args, **kwargs)
-                self.db.commit()
-                return True if ret is None else ret
-            except Exception as e:
-                ExceptionUtils.exception_traceback(e)
-                self.db.rollback()
-                return False
+            with write_lock:
+                try:
+                    ret = f(*args, **kwargs)
+                    self.db.commit()
+                    return True if ret is None else ret
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    self.db.rollback()
+                    return False
 
         return persist
@@ -1,27 +1,22 @@
-import os
+import json
 import threading
 import time
-from sqlalchemy import create_engine
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
+from app.db.engine import create_sqlite_engine, benchmark_engine
 from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC
 from app.utils import ExceptionUtils
-from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'media.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=50,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+_Engine = create_sqlite_engine('media.db')
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False))
 
+# 全量同步时使用的影子表
+_SYNC_TABLE = "MEDIASYNC_ITEMS_SYNC"
+_SYNC_COLUMNS = "SERVER, LIBRARY, ITEM_ID, ITEM_TYPE, TITLE, ORGIN_TITLE, YEAR, TMDBID, IMDBID, PATH, NOTE"
+
 
 class MediaDb:
 
@@ -34,6 +29,13 @@ class MediaDb:
         with lock:
             BaseMedia.metadata.create_all(_Engine)
 
+    @staticmethod
+    def benchmark():
+        """
+        测试数据库读写性能
+        """
+        return benchmark_engine(_Engine)
+
     def insert(self, server_type, iteminfo):
         if not server_type or not iteminfo:
             return False
@@ -51,7 +53,8 @@ class MediaDb:
                 YEAR=iteminfo.get("year"),
                 TMDBID=iteminfo.get("tmdbid"),
                 IMDBID=iteminfo.get("imdbid"),
-                PATH=iteminfo.get("path")
+                PATH=iteminfo.get("path"),
+                NOTE=json.dumps(iteminfo.get("seasons")) if iteminfo.get("seasons") is not None else None
             ))
             self.session.commit()
             return True
@@ -60,6 +63,93 @@ class MediaDb:
             self.session.rollback()
         return False
 
+    def create_sync_table(self):
+        """
+        创建全量同步使用的影子表，同步过程中正式表数据保持不变
+        """
+        try:
+            self.session.execute(text(f"DROP TABLE IF EXISTS {_SYNC_TABLE}"))
+            self.session.execute(text(f"CREATE TABLE {_SYNC_TABLE} AS "
+                                      f"SELECT {_SYNC_COLUMNS} FROM MEDIASYNC_ITEMS WHERE 0"))
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def insert_sync_items(self, server_type, items):
+        """
+        批量写入影子表，一批一个事务
+        """
+        if not server_type or not items:
+            return False
+        try:
+            self.session.execute(
+                text(f"INSERT INTO {_SYNC_TABLE} ({_SYNC_COLUMNS}) VALUES "
+                     f"(:SERVER, :LIBRARY, :ITEM_ID, :ITEM_TYPE, :TITLE, :ORGIN_TITLE, "
+                     f":YEAR, :TMDBID, :IMDBID, :PATH, :NOTE)"),
+                [{
+                    "SERVER": server_type,
+                    "LIBRARY": iteminfo.get("library"),
+                    "ITEM_ID": iteminfo.get("id"),
+                    "ITEM_TYPE": iteminfo.get("type"),
+                    "TITLE": iteminfo.get("title"),
+                    "ORGIN_TITLE": iteminfo.get("originalTitle"),
+                    "YEAR": str(iteminfo.get("year")) if iteminfo.get("year") is not None else None,
+                    "TMDBID": iteminfo.get("tmdbid"),
+                    "IMDBID": iteminfo.get("imdbid"),
+                    "PATH": iteminfo.get("path"),
+                    "NOTE": json.dumps(iteminfo.get("seasons")) if iteminfo.get("seasons") is not None else None
+                } for iteminfo in items])
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def swap_sync_table(self):
+        """
+        在一个事务中用影子表替换正式表数据，同一项目重复出现时保留最后一条
+        """
+        try:
+            self.session.execute(text("DELETE FROM MEDIASYNC_ITEMS"))
+            self.session.execute(text(f"INSERT INTO MEDIASYNC_ITEMS ({_SYNC_COLUMNS}) "
+                                      f"SELECT {_SYNC_COLUMNS} FROM {_SYNC_TABLE} WHERE rowid IN "
+                                      f"(SELECT MAX(rowid) FROM {_SYNC_TABLE} GROUP BY SERVER, ITEM_ID)"))
+            self.session.execute(text(f"DROP TABLE {_SYNC_TABLE}"))
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def drop_sync_table(self):
+        """
+        放弃本次同步，删除影子表
+        """
+        try:
+            self.session.execute(text(f"DROP TABLE IF EXISTS {_SYNC_TABLE}"))
+            self.session.commit()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+
+    def delete(self, server_type, item_id):
+        if not server_type or not item_id:
+            return False
+        try:
+            self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
+                                                      MEDIASYNCITEMS.ITEM_ID == item_id).delete()
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
     def empty(self, server_type=None, library=None):
         try:
             if server_type and library:
@@ -124,3 +214,51 @@ class MediaDb:
         if not server_type:
             return None
         return self.session.query(MEDIASYNCSTATISTIC).filter(MEDIASYNCSTATISTIC.SERVER == server_type).first()
+
+    def count(self, server_type, item_types=None):
+        if not server_type:
+            return 0
+        query = self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type)
+        if item_types:
+            query = query.filter(MEDIASYNCITEMS.ITEM_TYPE.in_(item_types))
+        return query.count()
+
+    def get_movies(self, server_type, title, year=None):
+        """
+        从同步数据中查询电影
+        :return: 含title、year属性的字典列表
+        """
+        if not server_type or not title:
+            return []
+        query = self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
+                                                          MEDIASYNCITEMS.ITEM_TYPE.in_(['Movie', 'movie']),
+                                                          MEDIASYNCITEMS.TITLE == title)
+        if year:
+            query = query.filter(MEDIASYNCITEMS.YEAR == str(year))
+        return [{'title': item.TITLE, 'year': item.YEAR} for item in query.all()]
+
+    def get_tv_episodes(self, server_type, title, year=None, tmdbid=None, season=None):
+        """
+        从同步数据中查询剧集某一季已有的集号
+        :return: 集号列表，没有该剧集时返回空列表，同步数据中没有集信息时返回None
+        """
+        if not server_type or not title:
+            return []
+        query = self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
+                                                          MEDIASYNCITEMS.ITEM_TYPE.in_(['Series', 'show']),
+                                                          MEDIASYNCITEMS.TITLE == title)
+        if year:
+            query = query.filter(MEDIASYNCITEMS.YEAR == str(year))
+        items = query.all()
+        if tmdbid:
+            items = [item for item in items if not item.TMDBID or item.TMDBID == str(tmdbid)]
+        exists_episodes = set()
+        for item in items:
+            if item.NOTE is None:
+                return None
+            try:
+                seasons = json.loads(item.NOTE)
+            except ValueError:
+                return None
+            exists_episodes.update(seasons.get(str(season or 1)) or [])
+        return list(exists_episodes)
@@ -353,6 +353,8 @@ class SEARCHRESULTINFO(Base):
     UPLOAD_VOLUME_FACTOR = Column(Float)
     DOWNLOAD_VOLUME_FACTOR = Column(Float)
     NOTE = Column(Text)
+    SESSION = Column(Text, index=True)
+    CREATE_TIME = Column(Integer)
 
 
 class SITEBRUSHDOWNLOADERS(Base):
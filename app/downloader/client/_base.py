@@ -1,10 +1,40 @@
+import json
 import os.path
+import threading
 from abc import ABCMeta, abstractmethod
 
 from config import Config
 
 
 class _IDownloadClient(metaclass=ABCMeta):
+    # 客户端实例池：下载器类型及连接参数 -> 已连接的客户端实例
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, config=None):
+        """
+        从实例池中获取客户端实例，连接参数相同时共用已登录的实例，避免重复登录，
+        连接失败的实例不放入实例池，下次获取时重新连接
+        :param config: 连接参数，为空时使用配置文件中的参数
+        """
+        key = "%s|%s" % (cls.__name__, json.dumps(config or {}, sort_keys=True, default=str))
+        instance = _IDownloadClient._instances.get(key)
+        if instance:
+            return instance
+        with _IDownloadClient._instances_lock:
+            instance = _IDownloadClient._instances.get(key)
+            if not instance:
+                instance = cls(config)
+                if instance.is_connected():
+                    _IDownloadClient._instances[key] = instance
+            return instance
+
+    def is_connected(self):
+        """
+        是否已建立客户端连接
+        """
+        return True
 
     @abstractmethod
     def match(self, ctype):
@@ -88,6 +118,7 @@ class _IDownloadClient(metaclass=ABCMeta):
     def start_torrents(self, ids):
         """
         下载控制：开始
+        :param ids: 种子ID，单个ID或者ID列表，ID列表一次请求处理
         """
         pass
 
@@ -95,6 +126,7 @@ class _IDownloadClient(metaclass=ABCMeta):
     def stop_torrents(self, ids):
         """
         下载控制：停止
+        :param ids: 种子ID，单个ID或者ID列表，ID列表一次请求处理
         """
         pass
 
@@ -102,9 +134,20 @@ class _IDownloadClient(metaclass=ABCMeta):
     def delete_torrents(self, delete_file, ids):
         """
         删除种子
+        :param delete_file: 是否删除文件
+        :param ids: 种子ID，单个ID或者ID列表，ID列表一次请求处理
         """
         pass
 
+    def add_torrents_tag(self, ids, tags):
+        """
+        批量添加种子标签，保留种子原有的标签
+        :param ids: 种子ID列表
+        :param tags: 标签或标签列表
+        :return: 处理状态
+        """
+        return False
+
     @abstractmethod
     def get_download_dirs(self):
         """
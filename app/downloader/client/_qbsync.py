@@ -0,0 +1,165 @@
+import threading
+import time
+
+import log
+from config import QB_SYNC_INTERVAL
+
+
+class QbSyncCache(object):
+    """
+    qBittorrent种子状态缓存，按下载器地址共用：通过sync/maindata接口按rid增量同步种子状态，
+    首次及rid失效时全量同步，之后只获取变化的字段和删除的种子；
+    QB_SYNC_INTERVAL内的重复查询直接使用内存中的快照，下载器中的种子有变动时由调用方标记过期
+    """
+    # 下载器地址 -> 缓存
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    # 状态筛选 -> 种子状态，与qBittorrent的torrents/info接口一致，兼容5.x的stopped状态
+    _STATE_FILTERS = {
+        "downloading": {"downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL",
+                        "pausedDL", "stoppedDL", "queuedDL", "forcedDL"},
+        "seeding": {"uploading", "stalledUP", "checkingUP", "queuedUP", "forcedUP"},
+        "completed": {"uploading", "stalledUP", "checkingUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP"},
+        "paused": {"pausedDL", "pausedUP", "stoppedDL", "stoppedUP"},
+        "stopped": {"pausedDL", "pausedUP", "stoppedDL", "stoppedUP"},
+        "stalled": {"stalledUP", "stalledDL"},
+        "stalled_uploading": {"stalledUP"},
+        "stalled_downloading": {"stalledDL"},
+        "errored": {"error", "missingFiles", "unknown"}
+    }
+
+    def __init__(self):
+        self._rid = 0
+        # 种子Hash -> 种子状态
+        self._torrents = {}
+        self._sync_time = 0
+        self._expired = True
+        self._lock = threading.Lock()
+        # 命中快照、增量同步、全量同步的次数
+        self._hits = 0
+        self._refreshes = 0
+        self._full_updates = 0
+
+    @classmethod
+    def get_cache(cls, key):
+        """
+        获取下载器的种子状态缓存
+        :param key: 下载器地址及用户名
+        """
+        cache = cls._caches.get(key)
+        if cache:
+            return cache
+        with cls._caches_lock:
+            if key not in cls._caches:
+                cls._caches[key] = cls()
+            return cls._caches[key]
+
+    @classmethod
+    def is_supported_filter(cls, status):
+        """
+        是否可以在本地按状态筛选
+        """
+        if not status:
+            return True
+        if not isinstance(status, list):
+            status = [status]
+        return all(s in cls._STATE_FILTERS or s in ["all", "active", "inactive", "resumed", "running"]
+                   for s in status)
+
+    def expire(self):
+        """
+        标记快照过期，下次查询时增量同步
+        """
+        self._expired = True
+
+    def get_stats(self):
+        """
+        缓存统计：命中快照、增量同步、全量同步的次数及当前种子数
+        """
+        return {
+            "hits": self._hits,
+            "refreshes": self._refreshes,
+            "full_updates": self._full_updates,
+            "torrents": len(self._torrents)
+        }
+
+    def get_torrents(self, qbc, ids=None, status=None, tag=None):
+        """
+        从快照中查询种子，快照过期时先同步
+        :param qbc: qBittorrent客户端
+        :param ids: 种子Hash或Hash列表
+        :param status: 状态筛选或状态筛选列表，多个时满足任一即可
+        :param tag: 标签或标签列表，多个时需同时包含
+        :return: 种子状态列表，同步出错时抛出异常
+        """
+        with self._lock:
+            if self._expired or time.time() - self._sync_time >= QB_SYNC_INTERVAL:
+                self.__sync(qbc)
+            else:
+                self._hits += 1
+            if ids:
+                if not isinstance(ids, list):
+                    ids = [ids]
+                torrents = [self._torrents[tid.lower()] for tid in ids if tid and tid.lower() in self._torrents]
+            else:
+                torrents = self._torrents.values()
+            if status:
+                if not isinstance(status, list):
+                    status = [status]
+                torrents = [torrent for torrent in torrents
+                            if any(self.__match_status(torrent, s) for s in status)]
+            if tag:
+                if not isinstance(tag, list):
+                    tag = [tag]
+                torrents = [torrent for torrent in torrents
+                            if all(t in self.__split_tags(torrent.get("tags")) for t in tag if t)]
+            # 返回副本，避免后续同步修改调用方持有的种子状态
+            return [dict(torrent) for torrent in torrents]
+
+    def __sync(self, qbc):
+        """
+        按rid同步种子状态，出错时重置rid，下次全量同步
+        """
+        try:
+            maindata = qbc.sync_maindata(rid=self._rid)
+        except Exception:
+            self._rid = 0
+            self._expired = True
+            raise
+        if maindata.get("full_update"):
+            self._torrents = {}
+            self._full_updates += 1
+            log.debug(f"【Downloader】qBittorrent种子状态全量同步，"
+                      f"种子数：{len(maindata.get('torrents') or {})}，缓存统计：{self.get_stats()}")
+        else:
+            self._refreshes += 1
+        for torrent_hash, data in (maindata.get("torrents") or {}).items():
+            torrent = self._torrents.get(torrent_hash)
+            if torrent is None:
+                torrent = self._torrents[torrent_hash] = {"hash": torrent_hash}
+            torrent.update(data)
+        for torrent_hash in maindata.get("torrents_removed") or []:
+            self._torrents.pop(torrent_hash, None)
+        self._rid = maindata.get("rid") or 0
+        self._sync_time = time.time()
+        self._expired = False
+
+    @classmethod
+    def __match_status(cls, torrent, status):
+        state = torrent.get("state")
+        if status == "all":
+            return True
+        if status == "active":
+            return bool(torrent.get("dlspeed") or torrent.get("upspeed"))
+        if status == "inactive":
+            return not (torrent.get("dlspeed") or torrent.get("upspeed"))
+        if status in ["resumed", "running"]:
+            return state not in cls._STATE_FILTERS["paused"]
+        return state in cls._STATE_FILTERS.get(status, ())
+
+    @staticmethod
+    def __split_tags(tags):
+        if not tags:
+            return []
+        return [t.strip() for t in str(tags).split(",")]
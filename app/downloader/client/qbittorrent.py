@@ -9,6 +9,7 @@ from pkg_resources import parse_version as v
 import log
 import qbittorrentapi
 from app.downloader.client._base import _IDownloadClient
+from app.downloader.client._qbsync import QbSyncCache
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.types import DownloaderType
 from config import Config
@@ -23,6 +24,8 @@ class Qbittorrent(_IDownloadClient):
     _auto_management = False
     qbc = None
     ver = None
+    # 种子状态缓存，同一下载器的所有实例共用
+    _sync_cache = None
     host = None
     port = None
     username = None
@@ -54,6 +57,7 @@ class Qbittorrent(_IDownloadClient):
     def connect(self):
         if self.host and self.port:
             self.qbc = self.__login_qbittorrent()
+            self._sync_cache = QbSyncCache.get_cache(f"{self.host}:{self.port}:{self.username}")
 
     def __login_qbittorrent(self):
         """
@@ -79,6 +83,9 @@ class Qbittorrent(_IDownloadClient):
             log.error(f"【{self.client_type}】qBittorrent连接出错：{str(err)}")
             return None
 
+    def is_connected(self):
+        return True if self.qbc else False
+
     def get_status(self):
         if not self.qbc:
             return False
@@ -96,6 +103,11 @@ class Qbittorrent(_IDownloadClient):
         if not self.qbc:
             return [], True
         try:
+            # 从同步的快照中筛选，不支持的状态筛选时直接查询
+            if self._sync_cache and QbSyncCache.is_supported_filter(status):
+                torrents = [qbittorrentapi.TorrentDictionary(torrent, client=self.qbc)
+                            for torrent in self._sync_cache.get_torrents(self.qbc, ids=ids, status=status, tag=tag)]
+                return torrents, False
             torrents = self.qbc.torrents_info(torrent_hashes=ids, status_filter=status, tag=tag)
             if self.is_ver_less_4_4():
                 torrents = self.filter_torrent_by_tag(torrents, tag=tag)
@@ -104,6 +116,19 @@ class Qbittorrent(_IDownloadClient):
             ExceptionUtils.exception_traceback(err)
             return [], True
 
+    def __expire_sync_cache(self):
+        """
+        种子有变动，下次查询时重新同步种子状态
+        """
+        if self._sync_cache:
+            self._sync_cache.expire()
+
+    def get_sync_stats(self):
+        """
+        种子状态缓存的命中及同步次数
+        """
+        return self._sync_cache.get_stats() if self._sync_cache else {}
+
     def get_completed_torrents(self, tag=None):
         """
         获取已完成的种子
@@ -130,15 +155,33 @@ class Qbittorrent(_IDownloadClient):
         :param ids: 种子Hash列表
         :param tag: 标签内容
         """
+        self.__expire_sync_cache()
         try:
             return self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return False
 
+    def add_torrents_tag(self, ids, tags):
+        """
+        批量添加种子标签
+        :param ids: 种子Hash列表
+        :param tags: 标签或标签列表
+        """
+        if not self.qbc or not ids or not tags:
+            return False
+        self.__expire_sync_cache()
+        try:
+            self.qbc.torrents_add_tags(tags=tags, torrent_hashes=ids)
+            return True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return False
+
     def set_torrents_status(self, ids, tags=None):
         if not self.qbc:
             return
+        self.__expire_sync_cache()
         try:
             # 打标签
             self.qbc.torrents_add_tags(tags="已整理", torrent_hashes=ids)
@@ -153,6 +196,7 @@ class Qbittorrent(_IDownloadClient):
         """
         设置强制作种
         """
+        self.__expire_sync_cache()
         try:
             self.qbc.torrents_set_force_start(enable=True, torrent_hashes=ids)
         except Exception as err:
@@ -343,6 +387,7 @@ class Qbittorrent(_IDownloadClient):
             seeding_time_limit = int(seeding_time_limit)
         else:
             seeding_time_limit = None
+        self.__expire_sync_cache()
         try:
             if self._auto_management:
                 use_auto_torrent_management = True
@@ -369,6 +414,7 @@ class Qbittorrent(_IDownloadClient):
     def start_torrents(self, ids):
         if not self.qbc:
             return False
+        self.__expire_sync_cache()
         try:
             return self.qbc.torrents_resume(torrent_hashes=ids)
         except Exception as err:
@@ -378,6 +424,7 @@ class Qbittorrent(_IDownloadClient):
     def stop_torrents(self, ids):
         if not self.qbc:
             return False
+        self.__expire_sync_cache()
         try:
             return self.qbc.torrents_pause(torrent_hashes=ids)
         except Exception as err:
@@ -389,6 +436,7 @@ class Qbittorrent(_IDownloadClient):
             return False
         if not ids:
             return False
+        self.__expire_sync_cache()
         try:
             ret = self.qbc.torrents_delete(delete_files=delete_file, torrent_hashes=ids)
             return ret
@@ -69,6 +69,9 @@ class Transmission(_IDownloadClient):
             log.error(f"【{self.client_type}】transmission连接出错：{str(err)}")
             return None
 
+    def is_connected(self):
+        return True if self.trc else False
+
     def get_status(self):
         return True if self.trc else False
 
@@ -157,6 +160,34 @@ class Transmission(_IDownloadClient):
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
+    def add_torrents_tag(self, ids, tags):
+        """
+        批量添加种子标签，原有标签相同的种子合并为一次请求
+        :param ids: 种子ID列表
+        :param tags: 标签或标签列表
+        """
+        if not self.trc or not ids or not tags:
+            return False
+        if not isinstance(ids, list):
+            ids = [ids]
+        if not isinstance(tags, list):
+            tags = [tags]
+        ids = [int(x) for x in ids if str(x).isdigit()]
+        try:
+            torrents = self.trc.get_torrents(ids=ids, arguments=["id", "labels"])
+            # 合并后的标签 -> 种子ID列表
+            label_ids = {}
+            for torrent in torrents:
+                labels = list(torrent.labels or [])
+                labels += [tag for tag in tags if tag not in labels]
+                label_ids.setdefault(tuple(labels), []).append(torrent.id)
+            for labels, tids in label_ids.items():
+                self.trc.change_torrent(labels=list(labels), ids=tids)
+            return True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return False
+
     def set_torrent_tag(self, tid, tag):
         if not tid or not tag:
             return
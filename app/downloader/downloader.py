@@ -12,7 +12,7 @@ from app.message import Message
 from app.sites import Sites
 from app.subtitle import Subtitle
 from app.conf import SystemConfig
-from app.utils import Torrent, StringUtils, SystemUtils, ExceptionUtils
+from app.utils import Torrent, TorrentCache, StringUtils, SystemUtils, ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaType, DownloaderType, SearchType, RmtMode
 from config import Config, PT_TAG, RMT_MEDIAEXT
@@ -1022,14 +1022,19 @@ class Downloader:
         site_info = self.sites.get_site_attr(url)
         if not site_info.get("cookie"):
             return [], None
-        # 保存种子文件
-        file_path, _, _, files, retmsg = Torrent().get_torrent_info(
-            url=url,
-            cookie=site_info.get("cookie"),
-            ua=site_info.get("ua"),
-            referer=page_url if site_info.get("referer") else None,
-            proxy=site_info.get("proxy")
-        )
+        # 已缓存过的种子直接使用文件清单，种子文件已淘汰时由添加下载时重新下载
+        cache_info = TorrentCache().get(url)
+        if cache_info:
+            file_path, files, retmsg = cache_info.get("path"), cache_info.get("files"), ""
+        else:
+            # 保存种子文件
+            file_path, _, _, files, retmsg = Torrent().get_torrent_info(
+                url=url,
+                cookie=site_info.get("cookie"),
+                ua=site_info.get("ua"),
+                referer=page_url if site_info.get("referer") else None,
+                proxy=site_info.get("proxy")
+            )
         if not files:
             log.error("【Downloader】读取种子文件集数出错：%s" % retmsg)
             return [], None
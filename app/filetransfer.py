@@ -12,7 +12,7 @@ import log
 from app.conf import ModuleConf
 from app.helper import DbHelper, ProgressHelper
 from app.helper import ThreadHelper
-from app.media import Media, Category, Scraper
+from app.media import Media, Category, Scraper, LibraryIndex
 from app.media.meta import MetaInfo
 from app.mediaserver import MediaServer
 from app.message import Message
@@ -34,6 +34,7 @@ class FileTransfer:
     threadhelper = None
     dbhelper = None
     progress = None
+    libraryindex = None
 
     _default_rmt_mode = None
     _movie_path = None
@@ -66,6 +67,7 @@ class FileTransfer:
         self.threadhelper = ThreadHelper()
         self.dbhelper = DbHelper()
         self.progress = ProgressHelper()
+        self.libraryindex = LibraryIndex()
         self.init_config()
 
     def init_config(self):
@@ -410,6 +412,7 @@ class FileTransfer:
         if over_flag and old_file and os.path.isfile(old_file):
             log.info("【Rmt】正在删除已存在的文件：%s" % old_file)
             os.remove(old_file)
+            self.libraryindex.update_path(old_file)
         log.info("【Rmt】正在转移文件：%s 到 %s" % (file_name, new_file))
         retcode = self.__transfer_command(file_item=file_item,
                                           target_file=new_file,
@@ -417,6 +420,7 @@ class FileTransfer:
         if retcode == 0:
             log.info("【Rmt】文件 %s %s完成" % (file_name, rmt_mode.value))
             self.dbhelper.insert_transfer_blacklist(file_item)
+            self.libraryindex.update_path(new_file)
         else:
             log.error("【Rmt】文件 %s %s失败，错误码 %s" % (file_name, rmt_mode.value, str(retcode)))
             return retcode
@@ -1001,6 +1005,8 @@ class FileTransfer:
                 return False
             ret, retmsg = SystemUtils.move(org_path, new_path)
             if ret == 0:
+                self.libraryindex.update_path(org_path)
+                self.libraryindex.update_path(new_path)
                 return True
             else:
                 log.error("【Rmt】%s" % retmsg)
@@ -1043,13 +1049,13 @@ class FileTransfer:
             for dest_path in self._movie_path:
                 # 判断精选
                 fav_path = os.path.join(dest_path, RMT_FAVTYPE, dir_name)
-                fav_files = PathUtils.get_dir_files(fav_path, RMT_MEDIAEXT)
+                fav_files = self.__get_library_files(fav_path, parse=False)
                 # 其它分类
                 if self._movie_category_flag:
                     dest_path = os.path.join(dest_path, meta_info.category, dir_name)
                 else:
                     dest_path = os.path.join(dest_path, dir_name)
-                files = PathUtils.get_dir_files(dest_path, RMT_MEDIAEXT)
+                files = self.__get_library_files(dest_path, parse=False)
                 if len(files) > 0 or len(fav_files) > 0:
                     return [{'title': meta_info.title, 'year': meta_info.year}]
             return []
@@ -1073,21 +1079,42 @@ class FileTransfer:
                     dest_path = os.path.join(dest_path, meta_info.category, dir_name, season_name)
                 else:
                     dest_path = os.path.join(dest_path, dir_name, season_name)
-                # 目录不存在
-                if not os.path.exists(dest_path):
-                    continue
-                files = PathUtils.get_dir_files(dest_path, RMT_MEDIAEXT)
-                for file in files:
-                    file_meta_info = MetaInfo(os.path.basename(file))
-                    if not file_meta_info.get_season_list() or not file_meta_info.get_episode_list():
+                for file_info in self.__get_library_files(dest_path).values():
+                    if not file_info:
+                        continue
+                    file_name, file_season_list, file_episode_list = file_info
+                    if not file_season_list or not file_episode_list:
                         continue
-                    if file_meta_info.get_name() != meta_info.title:
+                    if file_name != meta_info.title:
                         continue
-                    if not file_meta_info.is_in_season(season):
+                    if int(season) not in file_season_list:
                         continue
-                    exists_episodes = list(set(exists_episodes).union(set(file_meta_info.get_episode_list())))
+                    exists_episodes = list(set(exists_episodes).union(set(file_episode_list)))
             return list(set(total_episodes).difference(set(exists_episodes)))
 
+    def __get_library_files(self, path, parse=True):
+        """
+        查询媒体库目录下的媒体文件及识别结果，优先使用媒体库索引，索引未就绪时遍历目录
+        :param path: 目录
+        :param parse: 遍历目录时是否识别文件名
+        :return: {文件路径: (名称, 季列表, 集列表)}
+        """
+        files = self.libraryindex.get_media_files(path)
+        if files is not None:
+            return files
+        files = {}
+        if not os.path.exists(path):
+            return files
+        for file in PathUtils.get_dir_files(path, RMT_MEDIAEXT):
+            if not parse:
+                files[file] = None
+                continue
+            file_meta_info = MetaInfo(os.path.basename(file))
+            files[file] = (file_meta_info.get_name(),
+                           file_meta_info.get_season_list(),
+                           file_meta_info.get_episode_list())
+        return files
+
     def __get_best_target_path(self, mtype, in_path=None, size=0):
         """
         查询一个最好的目录返回，有in_path时找与in_path同路径的，没有in_path时，顺序查找1个符合大小要求的，没有in_path和size时，返回第1个
@@ -1,5 +1,6 @@
 import re
 
+import log
 from app.conf import ModuleConf
 from app.helper import DbHelper
 from app.media.meta import ReleaseGroupsMatcher
@@ -14,6 +15,8 @@ class Filter:
     dbhelper = None
     _groups = []
     _rules = []
+    # 规则组ID -> 预编译的规则组匹配器
+    _matchers = {}
 
     def __init__(self):
         self.init_config()
@@ -23,6 +26,11 @@ class Filter:
         self.rg_matcher = ReleaseGroupsMatcher()
         self._groups = self.dbhelper.get_config_filter_group()
         self._rules = self.dbhelper.get_config_filter_rule()
+        self._matchers = {
+            str(group.ID): RuleGroupMatcher(name=group.GROUP_NAME,
+                                            rules=self.get_rules(group.ID))
+            for group in self._groups
+        }
 
     def get_rule_groups(self, groupid=None, default=False):
         """
@@ -92,6 +100,20 @@ class Filter:
         first_order = min([int(rule_info.get("pri")) for rule_info in self.get_rules(groupid=rulegroup)] or [0])
         return 100 - first_order
 
+    def get_rule_matcher(self, rulegroup=None):
+        """
+        获取规则组的预编译匹配器
+        :param rulegroup: 规则组ID，为空时使用默认规则组
+        :return: 规则组匹配器，未配置规则组时返回None
+        """
+        if not rulegroup:
+            rulegroup = self.get_rule_groups(default=True)
+        else:
+            rulegroup = self.get_rule_groups(groupid=rulegroup)
+        if not rulegroup:
+            return None
+        return self._matchers.get(str(rulegroup.get("id")))
+
     def check_rules(self, meta_info, rulegroup=None):
         """
         检查种子是否匹配站点过滤规则：排除规则、包含规则，优先规则
@@ -99,100 +121,28 @@ class Filter:
         :param rulegroup: 规则组ID
         :return: 是否匹配，匹配的优先值，规则名称，值越大越优先
         """
-        if not meta_info:
-            return False, 0, ""
+        return self.check_rules_batch([meta_info], rulegroup)[0]
+
+    def check_rules_batch(self, meta_infos, rulegroup=None):
+        """
+        批量检查种子是否匹配站点过滤规则
+        :param meta_infos: 识别的信息列表
+        :param rulegroup: 规则组ID
+        :return: 每条记录的（是否匹配，匹配的优先值，规则名称）列表
+        """
         # 为-1时不使用过滤规则
         if rulegroup and int(rulegroup) == -1:
-            return True, 0, "不过滤"
-        if meta_info.subtitle:
-            title = "%s %s" % (meta_info.org_string, meta_info.subtitle)
-        else:
-            title = meta_info.org_string
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, "未配置过滤规则"
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
-        # 命中优先级
-        order_seq = 0
-        # 当前规则组是否命中
-        group_match = True
-        for filter_info in filters:
-            # 当前规则是否命中
-            rule_match = True
-            # 命中规则的序号
-            order_seq = 100 - int(filter_info.get('pri'))
-            # 必须包括的项
-            includes = filter_info.get('include')
-            if includes and rule_match:
-                include_flag = True
-                for include in includes:
-                    if not include:
-                        continue
-                    if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
-                        include_flag = False
-                        break
-                if not include_flag:
-                    rule_match = False
-
-            # 不能包含的项
-            excludes = filter_info.get('exclude')
-            if excludes and rule_match:
-                exclude_flag = False
-                exclude_count = 0
-                for exclude in excludes:
-                    if not exclude:
-                        continue
-                    exclude_count += 1
-                    if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
-                        exclude_flag = True
-                if exclude_count > 0 and not exclude_flag:
-                    rule_match = False
-            # 大小
-            sizes = filter_info.get('size')
-            if sizes and rule_match and meta_info.size:
-                meta_info.size = StringUtils.num_filesize(meta_info.size)
-                if sizes.find(',') != -1:
-                    sizes = sizes.split(',')
-                    if sizes[0].isdigit():
-                        begin_size = int(sizes[0].strip())
-                    else:
-                        begin_size = 0
-                    if sizes[1].isdigit():
-                        end_size = int(sizes[1].strip())
-                    else:
-                        end_size = 0
-                else:
-                    begin_size = 0
-                    if sizes.isdigit():
-                        end_size = int(sizes.strip())
-                    else:
-                        end_size = 0
-                if meta_info.type == MediaType.MOVIE:
-                    if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
-                        rule_match = False
-                else:
-                    if meta_info.total_episodes \
-                            and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
-                        rule_match = False
-
-            # 促销
-            free = filter_info.get("free")
-            if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
-                ul_factor, dl_factor = free.split()
-                if float(ul_factor) > meta_info.upload_volume_factor \
-                        or float(dl_factor) < meta_info.download_volume_factor:
-                    rule_match = False
-
-            if rule_match:
-                return True, order_seq, rulegroup.get("name")
-            else:
-                group_match = False
-        if not group_match:
-            return False, 0, rulegroup.get("name")
-        return True, order_seq, rulegroup.get("name")
+            return [(True, 0, "不过滤") if meta_info else (False, 0, "")
+                    for meta_info in meta_infos]
+        matcher = self.get_rule_matcher(rulegroup)
+        if not matcher:
+            if rulegroup:
+                # 规则组不存在，与无规则的规则组一致处理
+                return [(True, 0, None) if meta_info else (False, 0, "")
+                        for meta_info in meta_infos]
+            return [(True, 0, "未配置过滤规则") if meta_info else (False, 0, "")
+                    for meta_info in meta_infos]
+        return matcher.match_batch(meta_infos)
 
     def is_rule_free(self, rulegroup=None):
         """
@@ -320,3 +270,141 @@ class Filter:
                 rule_name
             )
             return match_flag, order_seq, match_msg
+
+
+class FilterRuleMatcher(object):
+    """
+    预编译的单条过滤规则，包含/排除正则、大小范围及促销因子在初始化时一次性解析
+    """
+    __slots__ = ("name", "order_seq", "includes", "excludes", "size_range", "free_factors")
+
+    def __init__(self, rule_info):
+        self.name = rule_info.get("name")
+        self.order_seq = 100 - int(rule_info.get("pri"))
+        self.includes = self.__compile_patterns(rule_info.get("include"))
+        self.excludes = self.__compile_patterns(rule_info.get("exclude"))
+        self.size_range = self.__parse_size(rule_info.get("size"))
+        free = rule_info.get("free")
+        if free and len(free.split()) == 2:
+            ul_factor, dl_factor = free.split()
+            self.free_factors = (float(ul_factor), float(dl_factor))
+        else:
+            self.free_factors = None
+
+    @staticmethod
+    def __compile_patterns(patterns):
+        """
+        编译规则中的正则表达式，空行忽略
+        """
+        compiled = []
+        for pattern in patterns or []:
+            if not pattern:
+                continue
+            try:
+                compiled.append(re.compile(r'%s' % pattern.strip(), re.IGNORECASE))
+            except re.error as err:
+                log.warn(f"【Filter】过滤规则正则表达式有误，按普通文本处理：{pattern}，{str(err)}")
+                compiled.append(re.compile(re.escape(pattern.strip()), re.IGNORECASE))
+        return tuple(compiled)
+
+    @staticmethod
+    def __parse_size(sizes):
+        """
+        解析大小范围，单位GB，返回字节数范围
+        """
+        if not sizes:
+            return None
+        if sizes.find(',') != -1:
+            sizes = sizes.split(',')
+            if sizes[0].isdigit():
+                begin_size = int(sizes[0].strip())
+            else:
+                begin_size = 0
+            if sizes[1].isdigit():
+                end_size = int(sizes[1].strip())
+            else:
+                end_size = 0
+        else:
+            begin_size = 0
+            if sizes.isdigit():
+                end_size = int(sizes.strip())
+            else:
+                end_size = 0
+        return begin_size * 1024 ** 3, end_size * 1024 ** 3
+
+    def match(self, meta_info, title):
+        """
+        检查种子是否命中本条规则
+        :param meta_info: 识别的信息
+        :param title: 用于匹配的标题（含副标题）
+        """
+        # 必须包括的项
+        for include in self.includes:
+            if not include.search(title):
+                return False
+        # 不能包含的项，全部命中时排除
+        if self.excludes \
+                and all(exclude.search(title) for exclude in self.excludes):
+            return False
+        # 大小
+        if self.size_range and meta_info.size:
+            meta_info.size = StringUtils.num_filesize(meta_info.size)
+            begin_size, end_size = self.size_range
+            if meta_info.type == MediaType.MOVIE:
+                if not begin_size <= int(meta_info.size) <= end_size:
+                    return False
+            else:
+                if meta_info.total_episodes \
+                        and not begin_size <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size:
+                    return False
+        # 促销
+        if self.free_factors \
+                and meta_info.upload_volume_factor is not None \
+                and meta_info.download_volume_factor is not None:
+            ul_factor, dl_factor = self.free_factors
+            if ul_factor > meta_info.upload_volume_factor \
+                    or dl_factor < meta_info.download_volume_factor:
+                return False
+        return True
+
+
+class RuleGroupMatcher(object):
+    """
+    预编译的规则组匹配器，在Filter.init_config时构建，构建后不再修改
+    """
+    __slots__ = ("name", "rules")
+
+    def __init__(self, name, rules):
+        """
+        :param name: 规则组名称
+        :param rules: Filter.get_rules返回的规则列表，按优先级排序
+        """
+        self.name = name
+        self.rules = tuple(FilterRuleMatcher(rule_info) for rule_info in rules)
+
+    def match(self, meta_info):
+        """
+        检查种子是否匹配规则组
+        :param meta_info: 识别的信息
+        :return: 是否匹配，匹配的优先值，规则组名称
+        """
+        if not meta_info:
+            return False, 0, ""
+        if not self.rules:
+            return True, 0, self.name
+        if meta_info.subtitle:
+            title = "%s %s" % (meta_info.org_string, meta_info.subtitle)
+        else:
+            title = meta_info.org_string
+        for rule in self.rules:
+            if rule.match(meta_info, title):
+                return True, rule.order_seq, self.name
+        return False, 0, self.name
+
+    def match_batch(self, meta_infos):
+        """
+        批量检查种子是否匹配规则组
+        :param meta_infos: 识别的信息列表
+        :return: 每条记录的（是否匹配，匹配的优先值，规则组名称）列表
+        """
+        return [self.match(meta_info) for meta_info in meta_infos]
@@ -1,6 +1,7 @@
 from .chrome_helper import ChromeHelper
 from .indexer_helper import IndexerHelper, IndexerConf
 from .meta_helper import MetaHelper
+from .tmdb_cache_helper import TmdbCacheHelper
 from .progress_helper import ProgressHelper
 from .security_helper import SecurityHelper
 from .thread_helper import ThreadHelper
@@ -14,3 +15,5 @@ from .words_helper import WordsHelper
 from .submodule_helper import SubmoduleHelper
 from .cookiecloud_helper import CookieCloudHelper
 from .ffmpeg_helper import FfmpegHelper
+from .rss_helper import RssHelper
+from .brush_rule_helper import BrushRuleHelper
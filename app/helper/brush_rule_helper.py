@@ -0,0 +1,198 @@
+import re
+import sys
+from datetime import datetime
+
+import pytz
+
+import log
+from app.utils import ExceptionUtils
+from app.utils.types import BrushDeleteType
+from config import Config
+
+
+class BrushRuleHelper:
+    """
+    刷流选种和删种规则，不访问站点和下载器，刷流任务和离线回测共用
+    """
+
+    @staticmethod
+    def check_rss_rule(rss_rule, title, torrent_size, pubdate, now=None):
+        """
+        检查种子是否符合刷流过滤条件中不需要访问详情页面的部分
+        :param rss_rule: 过滤条件字典
+        :param title: 种子名称
+        :param torrent_size: 种子大小
+        :param pubdate: 发布时间
+        :param now: 当前时间，为空时取系统时间，回测时传入RSS快照的时间
+        :return: 是否命中
+        """
+        if not rss_rule:
+            return True
+        # 检查种子大小
+        try:
+            if rss_rule.get("size"):
+                rule_sizes = rss_rule.get("size").split("#")
+                if rule_sizes[0]:
+                    if len(rule_sizes) > 1 and rule_sizes[1]:
+                        min_max_size = rule_sizes[1].split(',')
+                        min_size = min_max_size[0]
+                        if len(min_max_size) > 1:
+                            max_size = min_max_size[1]
+                        else:
+                            max_size = 0
+                        if rule_sizes[0] == "gt" and float(torrent_size) < float(min_size) * 1024 ** 3:
+                            return False
+                        if rule_sizes[0] == "lt" and float(torrent_size) > float(min_size) * 1024 ** 3:
+                            return False
+                        if rule_sizes[0] == "bw" and not float(min_size) * 1024 ** 3 < float(torrent_size) < float(
+                                max_size) * 1024 ** 3:
+                            return False
+
+            # 检查包含规则
+            if rss_rule.get("include"):
+                if not re.search(r"%s" % rss_rule.get("include"), title):
+                    return False
+
+            # 检查排除规则
+            if rss_rule.get("exclude"):
+                if re.search(r"%s" % rss_rule.get("exclude"), title):
+                    return False
+
+            # 检查发布时间
+            if rss_rule.get("pubdate") and pubdate:
+                rule_pubdates = rss_rule.get("pubdate").split("#")
+                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
+                    localtz = pytz.timezone(Config().get_timezone())
+                    localnowtime = (now or datetime.now()).astimezone(localtz)
+                    localpubdate = pubdate.astimezone(localtz)
+                    log.debug('【Brush】发布时间：%s，当前时间：%s' % (localpubdate.isoformat(), localnowtime.isoformat()))
+                    if (localnowtime - localpubdate).seconds / 3600 > float(rule_pubdates[1]):
+                        log.debug("【Brush】发布时间不符合条件。")
+                        return False
+
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+
+        return True
+
+    @staticmethod
+    def check_torrent_attr_rule(rss_rule, title, torrent_attr):
+        """
+        检查种子详情页面中的促销、HR、做种人数是否符合刷流过滤条件
+        :param rss_rule: 过滤条件字典
+        :param title: 种子名称
+        :param torrent_attr: 种子属性，包含FREE 2XFREE HR PEER_COUNT等属性
+        :return: 是否命中
+        """
+        if not rss_rule:
+            return True
+        try:
+            torrent_peer_count = torrent_attr.get("peer_count")
+            log.debug("【Brush】%s 解析详情, %s" % (title, torrent_attr))
+
+            # 检查免费状态
+            if rss_rule.get("free") == "FREE":
+                if not torrent_attr.get("free"):
+                    log.debug("【Brush】不是一个FREE资源，跳过")
+                    return False
+            elif rss_rule.get("free") == "2XFREE":
+                if not torrent_attr.get("2xfree"):
+                    log.debug("【Brush】不是一个2XFREE资源，跳过")
+                    return False
+
+            # 检查HR状态
+            if rss_rule.get("hr"):
+                if torrent_attr.get("hr"):
+                    log.debug("【Brush】这是一个H&R资源，跳过")
+                    return False
+
+            # 检查做种人数
+            if rss_rule.get("peercount"):
+                # 兼容旧版本
+                peercount_str = rss_rule.get("peercount")
+                if not peercount_str:
+                    peercount_str = "#"
+                elif "#" not in peercount_str:
+                    peercount_str = "lt#" + peercount_str
+                else:
+                    pass
+                peer_counts = peercount_str.split("#")
+                if len(peer_counts) >= 2 and peer_counts[1]:
+                    min_max_count = peer_counts[1].split(',')
+                    min_count = int(min_max_count[0])
+                    if len(min_max_count) > 1:
+                        max_count = int(min_max_count[1])
+                    else:
+                        max_count = sys.maxsize
+                    if peer_counts[0] == "gt" and torrent_peer_count <= min_count:
+                        log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s threshold:%d" % (
+                            title, torrent_peer_count, peer_counts[0], min_count))
+                        return False
+                    if peer_counts[0] == "lt" and torrent_peer_count >= min_count:
+                        log.debug("【Brush】%s `判断做种数, 判断条件: peer_count:%d %s threshold:%d" % (
+                            title, torrent_peer_count, peer_counts[0], min_count))
+                        return False
+                    if peer_counts[0] == "bw" and not (min_count <= torrent_peer_count <= max_count):
+                        log.debug("【Brush】%s `判断做种数, 判断条件: left:%d %s peer_count:%d %s right:%d" % (
+                            title, min_count, peer_counts[0], torrent_peer_count, peer_counts[0], max_count))
+                        return False
+
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+
+        return True
+
+    @staticmethod
+    def check_remove_rule(remove_rule, seeding_time=None, ratio=None, uploaded=None, dltime=None, avg_upspeed=None, iatime=None):
+        """
+        检查是否符合删种规则
+        :param remove_rule: 删种规则
+        :param seeding_time: 做种时间
+        :param ratio: 分享率
+        :param uploaded: 上传量
+        :param dltime: 下载耗时
+        :param avg_upspeed: 上传平均速度
+        :param iatime: 未活动时间
+        """
+        if not remove_rule:
+            return False
+        try:
+            if remove_rule.get("time") and seeding_time:
+                rule_times = remove_rule.get("time").split("#")
+                if rule_times[0]:
+                    if len(rule_times) > 1 and rule_times[1]:
+                        if float(seeding_time) > float(rule_times[1]) * 3600:
+                            return True, BrushDeleteType.SEEDTIME
+            if remove_rule.get("ratio") and ratio:
+                rule_ratios = remove_rule.get("ratio").split("#")
+                if rule_ratios[0]:
+                    if len(rule_ratios) > 1 and rule_ratios[1]:
+                        if float(ratio) > float(rule_ratios[1]):
+                            return True, BrushDeleteType.RATIO
+            if remove_rule.get("uploadsize") and uploaded:
+                rule_uploadsizes = remove_rule.get("uploadsize").split("#")
+                if rule_uploadsizes[0]:
+                    if len(rule_uploadsizes) > 1 and rule_uploadsizes[1]:
+                        if float(uploaded) > float(rule_uploadsizes[1]) * 1024 ** 3:
+                            return True, BrushDeleteType.UPLOADSIZE
+            if remove_rule.get("dltime") and dltime:
+                rule_times = remove_rule.get("dltime").split("#")
+                if rule_times[0]:
+                    if len(rule_times) > 1 and rule_times[1]:
+                        if float(dltime) > float(rule_times[1]) * 3600:
+                            return True, BrushDeleteType.DLTIME
+            if remove_rule.get("avg_upspeed") and avg_upspeed:
+                rule_avg_upspeeds = remove_rule.get("avg_upspeed").split("#")
+                if rule_avg_upspeeds[0]:
+                    if len(rule_avg_upspeeds) > 1 and rule_avg_upspeeds[1]:
+                        if float(avg_upspeed) < float(rule_avg_upspeeds[1]) * 1024:
+                            return True, BrushDeleteType.AVGUPSPEED
+            if remove_rule.get("iatime") and iatime:
+                rule_times = remove_rule.get("iatime").split("#")
+                if rule_times[0]:
+                    if len(rule_times) > 1 and rule_times[1]:
+                        if float(iatime) > float(rule_times[1]) * 3600:
+                            return True, BrushDeleteType.IATIME
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+        return False, BrushDeleteType.NOTDELETE
@@ -2,6 +2,7 @@ import datetime
 import os.path
 import time
 import json
+import threading
 from enum import Enum
 from sqlalchemy import cast, func
 
@@ -9,60 +10,111 @@ from app.db import MainDb, DbPersist
 from app.db.models import *
 from app.utils import StringUtils
 from app.utils.types import MediaType, RmtMode
+from config import SEARCH_RESULT_EXPIRE
 
 
 class DbHelper:
     _db = MainDb()
+    # RSSTORRENTS中的下载链接，首次查询时加载，插入时同步加入，删除时重新加载
+    _rssd_enclosures = None
+    _rssd_lock = threading.Lock()
+    # 检索会话标识 -> 结果清除次数、最大ID、最后写入时间
+    _search_sessions = {}
+    _search_lock = threading.Lock()
 
-    @DbPersist(_db)
-    def insert_search_results(self, media_items: list, title=None, ident_flag=True):
+    @staticmethod
+    def get_search_session(in_from, user_name=None):
+        """
+        检索会话标识，按检索渠道和用户区分，不同用户的检索结果互不覆盖
+        :param in_from: 检索渠道
+        :param user_name: 用户名称
+        """
+        in_from = in_from.value if isinstance(in_from, Enum) else in_from
+        return f"{in_from or ''}|{user_name or ''}"
+
+    def insert_search_results(self, media_items: list, title=None, ident_flag=True, session=""):
         """
         将返回信息插入数据库
+        :param media_items: 检索结果
+        :param title: 未识别时使用的标题
+        :param ident_flag: 是否识别了媒体信息
+        :param session: 检索会话标识
         """
         if not media_items:
             return
+        max_id = self.__insert_search_results(media_items=media_items,
+                                              title=title,
+                                              ident_flag=ident_flag,
+                                              session=session)
+        if not max_id:
+            return
+        # 提交后再更新会话状态，避免读取方读到未提交的结果
+        expire_time = int(time.time()) - SEARCH_RESULT_EXPIRE
+        with DbHelper._search_lock:
+            for key in [key for key, state in DbHelper._search_sessions.items()
+                        if state.get("time") < expire_time and key != session]:
+                DbHelper._search_sessions.pop(key, None)
+            state = DbHelper._search_sessions.setdefault(session, {"generation": 0, "max_id": 0})
+            state["max_id"] = max(state.get("max_id"), max_id)
+            state["time"] = int(time.time())
+
+    @DbPersist(_db)
+    def __insert_search_results(self, media_items, title, ident_flag, session):
+        """
+        批量插入检索结果，同时清除过期的检索会话结果
+        :return: 插入的最大ID
+        """
+        now = int(time.time())
+        self._db.query(SEARCHRESULTINFO).filter(
+            (SEARCHRESULTINFO.CREATE_TIME < now - SEARCH_RESULT_EXPIRE)
+            | (SEARCHRESULTINFO.CREATE_TIME.is_(None))).delete(synchronize_session=False)
+        # 写事务串行执行，直接分配ID，插入后无需再回查
+        start_id = self._db.query(func.max(SEARCHRESULTINFO.ID)).scalar() or 0
         data_list = []
-        for media_item in media_items:
+        for index, media_item in enumerate(media_items):
             if media_item.type == MediaType.TV:
                 mtype = "TV"
             elif media_item.type == MediaType.MOVIE:
                 mtype = "MOV"
             else:
                 mtype = "ANI"
-            data_list.append(
-                SEARCHRESULTINFO(
-                    TORRENT_NAME=media_item.org_string,
-                    ENCLOSURE=media_item.enclosure,
-                    DESCRIPTION=media_item.description,
-                    TYPE=mtype if ident_flag else '',
-                    TITLE=media_item.title if ident_flag else title,
-                    YEAR=media_item.year if ident_flag else '',
-                    SEASON=media_item.get_season_string() if ident_flag else '',
-                    EPISODE=media_item.get_episode_string() if ident_flag else '',
-                    ES_STRING=media_item.get_season_episode_string() if ident_flag else '',
-                    VOTE=media_item.vote_average or "0",
-                    IMAGE=media_item.get_backdrop_image(default=False, original=True),
-                    POSTER=media_item.get_poster_image(),
-                    TMDBID=media_item.tmdb_id,
-                    OVERVIEW=media_item.overview,
-                    RES_TYPE=json.dumps({
-                        "respix": media_item.resource_pix,
-                        "restype": media_item.resource_type,
-                        "reseffect": media_item.resource_effect,
-                        "video_encode": media_item.video_encode
-                    }),
-                    RES_ORDER=media_item.res_order,
-                    SIZE=StringUtils.str_filesize(int(media_item.size)),
-                    SEEDERS=media_item.seeders,
-                    PEERS=media_item.peers,
-                    SITE=media_item.site,
-                    SITE_ORDER=media_item.site_order,
-                    PAGEURL=media_item.page_url,
-                    OTHERINFO=media_item.resource_team,
-                    UPLOAD_VOLUME_FACTOR=media_item.upload_volume_factor,
-                    DOWNLOAD_VOLUME_FACTOR=media_item.download_volume_factor
-                ))
-        self._db.insert(data_list)
+            data_list.append({
+                "ID": start_id + index + 1,
+                "TORRENT_NAME": media_item.org_string,
+                "ENCLOSURE": media_item.enclosure,
+                "DESCRIPTION": media_item.description,
+                "TYPE": mtype if ident_flag else '',
+                "TITLE": media_item.title if ident_flag else title,
+                "YEAR": media_item.year if ident_flag else '',
+                "SEASON": media_item.get_season_string() if ident_flag else '',
+                "EPISODE": media_item.get_episode_string() if ident_flag else '',
+                "ES_STRING": media_item.get_season_episode_string() if ident_flag else '',
+                "VOTE": media_item.vote_average or "0",
+                "IMAGE": media_item.get_backdrop_image(default=False, original=True),
+                "POSTER": media_item.get_poster_image(),
+                "TMDBID": media_item.tmdb_id,
+                "OVERVIEW": media_item.overview,
+                "RES_TYPE": json.dumps({
+                    "respix": media_item.resource_pix,
+                    "restype": media_item.resource_type,
+                    "reseffect": media_item.resource_effect,
+                    "video_encode": media_item.video_encode
+                }),
+                "RES_ORDER": media_item.res_order,
+                "SIZE": StringUtils.str_filesize(int(media_item.size)),
+                "SEEDERS": media_item.seeders,
+                "PEERS": media_item.peers,
+                "SITE": media_item.site,
+                "SITE_ORDER": media_item.site_order,
+                "PAGEURL": media_item.page_url,
+                "OTHERINFO": media_item.resource_team,
+                "UPLOAD_VOLUME_FACTOR": media_item.upload_volume_factor,
+                "DOWNLOAD_VOLUME_FACTOR": media_item.download_volume_factor,
+                "SESSION": session,
+                "CREATE_TIME": now
+            })
+        self._db.bulk_insert(SEARCHRESULTINFO, data_list)
+        return start_id + len(data_list)
 
     def get_search_result_by_id(self, dl_id):
         """
@@ -70,11 +122,35 @@ class DbHelper:
         """
         return self._db.query(SEARCHRESULTINFO).filter(SEARCHRESULTINFO.ID == dl_id).all()
 
-    def get_search_results(self, ):
+    def get_search_results(self, session="", min_id=0):
+        """
+        查询检索会话的检索结果，按写入顺序排列
+        :param session: 检索会话标识
+        :param min_id: 只查询ID大于该值的记录，用于增量读取
+        """
+        return self._db.query(SEARCHRESULTINFO).filter(SEARCHRESULTINFO.SESSION == session,
+                                                       SEARCHRESULTINFO.ID > min_id) \
+            .order_by(SEARCHRESULTINFO.ID).all()
+
+    def get_search_state(self, session=""):
         """
-        查询检索结果的所有记录
+        查询检索会话的状态，读取方据此判断结果是否有变化
+        :param session: 检索会话标识
+        :return: 清除次数，结果是否被清除过；最大ID，是否有新写入的结果
         """
-        return self._db.query(SEARCHRESULTINFO).all()
+        state = DbHelper._search_sessions.get(session)
+        if state is None:
+            # 重启后从数据库中恢复
+            max_id, create_time = self._db.query(func.max(SEARCHRESULTINFO.ID),
+                                                 func.max(SEARCHRESULTINFO.CREATE_TIME)).filter(
+                SEARCHRESULTINFO.SESSION == session).first()
+            if not max_id or create_time < int(time.time()) - SEARCH_RESULT_EXPIRE:
+                return 0, 0
+            with DbHelper._search_lock:
+                state = DbHelper._search_sessions.setdefault(session, {"generation": 0,
+                                                                       "max_id": max_id,
+                                                                       "time": create_time})
+        return state.get("generation"), state.get("max_id")
 
     def is_torrent_rssd(self, enclosure):
         """
@@ -82,10 +158,23 @@ class DbHelper:
         """
         if not enclosure:
             return True
-        if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
-            return True
-        else:
-            return False
+        return enclosure in self.__get_rssd_enclosures()
+
+    def __get_rssd_enclosures(self):
+        """
+        获取RSSTORRENTS中的全部下载链接
+        """
+        if DbHelper._rssd_enclosures is None:
+            with DbHelper._rssd_lock:
+                if DbHelper._rssd_enclosures is None:
+                    DbHelper._rssd_enclosures = set(
+                        enclosure for enclosure, in self._db.query(RSSTORRENTS.ENCLOSURE).all() if enclosure)
+        return DbHelper._rssd_enclosures
+
+    @staticmethod
+    def __add_rssd_enclosure(enclosure):
+        if enclosure and DbHelper._rssd_enclosures is not None:
+            DbHelper._rssd_enclosures.add(enclosure)
 
     def is_userrss_finished(self, torrent_name, enclosure):
         """
@@ -94,17 +183,26 @@ class DbHelper:
         if not torrent_name and not enclosure:
             return True
         if enclosure:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count()
+            return enclosure in self.__get_rssd_enclosures()
         else:
             ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
         return True if ret > 0 else False
 
-    @DbPersist(_db)
-    def delete_all_search_torrents(self, ):
+    def delete_search_results(self, session=""):
         """
-        删除所有搜索的记录
+        删除检索会话的检索结果
+        :param session: 检索会话标识
         """
-        self._db.query(SEARCHRESULTINFO).delete()
+        self.__delete_search_results(session)
+        with DbHelper._search_lock:
+            state = DbHelper._search_sessions.setdefault(session, {"generation": 0, "max_id": 0})
+            state["generation"] += 1
+            state["max_id"] = 0
+            state["time"] = int(time.time())
+
+    @DbPersist(_db)
+    def __delete_search_results(self, session):
+        self._db.query(SEARCHRESULTINFO).filter(SEARCHRESULTINFO.SESSION == session).delete()
 
     @DbPersist(_db)
     def insert_rss_torrents(self, media_info):
@@ -121,6 +219,7 @@ class DbHelper:
                 SEASON=media_info.get_season_string(),
                 EPISODE=media_info.get_episode_string()
             ))
+        self.__add_rssd_enclosure(media_info.enclosure)
 
     @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
@@ -132,6 +231,7 @@ class DbHelper:
                 TORRENT_NAME=title,
                 ENCLOSURE=enclosure
             ))
+        self.__add_rssd_enclosure(enclosure)
 
     @DbPersist(_db)
     def simple_delete_rss_torrents(self, title, enclosure):
@@ -143,6 +243,7 @@ class DbHelper:
                                                RSSTORRENTS.ENCLOSURE == enclosure).delete()
         else:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title).delete()
+        DbHelper._rssd_enclosures = None
 
     def is_douban_media_exists(self, media):
         """
@@ -468,6 +569,7 @@ class DbHelper:
         清空RSS历史记录
         """
         self._db.query(RSSTORRENTS).delete()
+        DbHelper._rssd_enclosures = None
 
     @DbPersist(_db)
     def truncate_rss_episodes(self, ):
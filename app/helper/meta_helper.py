@@ -1,10 +1,11 @@
 import os
 import pickle
-import random
+import sqlite3
 import time
 from enum import Enum
 from threading import RLock
 
+import log
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
 from config import Config
@@ -13,6 +14,8 @@ lock = RLock()
 
 CACHE_EXPIRE_TIMESTAMP_STR = "cache_expire_timestamp"
 EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 命中缓存时，剩余有效期低于该值才续期，避免每次命中都产生写入
+EXPIRE_REFRESH_THRESHOLD = 6 * 24 * 3600
 
 
 @singleton
@@ -24,11 +27,18 @@ class MetaHelper(object):
         "year": '',
         "type": MediaType
     }
+    缓存持久化在配置目录下的tmdb.db（SQLite WAL模式），内存中保留一份用于无锁读取，
+    新增、修改、续期的条目记录在待写入集合中，由save_meta_data按条目批量写入
     """
     _meta_data = {}
 
     _meta_path = None
     _tmdb_cache_expire = False
+    _db = None
+    # 待写入的KEY（新增或修改）
+    _dirty_keys = set()
+    # 待续期的KEY
+    _touched_keys = set()
 
     def __init__(self):
         self.init_config()
@@ -37,8 +47,88 @@ class MetaHelper(object):
         laboratory = Config().get_config('laboratory')
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
-        self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+        meta_path = os.path.join(Config().get_config_path(), 'tmdb.db')
+        if self._db and meta_path == self._meta_path:
+            return
+        with lock:
+            if self._db:
+                self.save_meta_data(force=True)
+                self._db.close()
+            self._meta_path = meta_path
+            self._db = self.__open_db(self._meta_path)
+            self.__import_legacy_data(os.path.join(Config().get_config_path(), 'tmdb.dat'))
+            self._meta_data = self.__load_meta_data()
+            self._dirty_keys = set()
+            self._touched_keys = set()
+
+    @staticmethod
+    def __open_db(path):
+        """
+        打开缓存数据库，不存在时创建
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS META_DATA ("
+                     "KEY TEXT PRIMARY KEY, "
+                     "TMDBID TEXT, "
+                     "EXPIRE INTEGER, "
+                     "DATA BLOB)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_META_DATA_TMDBID ON META_DATA (TMDBID)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_META_DATA_EXPIRE ON META_DATA (EXPIRE)")
+        return conn
+
+    def __import_legacy_data(self, path):
+        """
+        导入旧版本tmdb.dat缓存文件，导入后重命名为tmdb.dat.bak
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            self.__write_items([(k, v) for k, v in data.items() if str(v.get("id")) != '0'])
+            os.replace(path, "%s.bak" % path)
+            log.info(f"【Meta】已导入TMDB缓存文件 {path}，共 {len(data)} 条")
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def __load_meta_data(self):
+        """
+        从数据库中加载缓存
+        """
+        try:
+            return {key: pickle.loads(data)
+                    for key, data in self._db.execute("SELECT KEY, DATA FROM META_DATA")}
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return {}
+
+    def __write_items(self, items):
+        """
+        按条目写入缓存
+        :param items: [(key, info)]
+        """
+        if not items:
+            return
+        self.__executemany("INSERT OR REPLACE INTO META_DATA (KEY, TMDBID, EXPIRE, DATA) VALUES (?, ?, ?, ?)",
+                           [(key,
+                             str(info.get("id")),
+                             info.get(CACHE_EXPIRE_TIMESTAMP_STR),
+                             pickle.dumps(info, pickle.HIGHEST_PROTOCOL)) for key, info in items])
+
+    def __executemany(self, sql, params):
+        """
+        在一个事务中批量执行
+        """
+        with lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(sql, params)
+                self._db.execute("COMMIT")
+            except Exception as e:
+                self._db.execute("ROLLBACK")
+                ExceptionUtils.exception_traceback(e)
 
     def clear_meta_data(self):
         """
@@ -46,6 +136,9 @@ class MetaHelper(object):
         """
         with lock:
             self._meta_data = {}
+            self._dirty_keys = set()
+            self._touched_keys = set()
+            self._db.execute("DELETE FROM META_DATA")
 
     def get_meta_data_path(self):
         """
@@ -55,18 +148,19 @@ class MetaHelper(object):
 
     def get_meta_data_by_key(self, key):
         """
-        根据KEY值获取缓存值
+        根据KEY值获取缓存值，读取不加锁，续期只在内存中标记，由save_meta_data批量写入
         """
-        with lock:
-            info: dict = self._meta_data.get(key)
-            if info:
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire or int(time.time()) < expire:
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self.update_meta_data({key: info})
-                elif expire and self._tmdb_cache_expire:
-                    self.delete_meta_data(key)
-            return info or {}
+        info: dict = self._meta_data.get(key)
+        if info:
+            expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+            now = int(time.time())
+            if not expire or now < expire:
+                if not expire or expire - now < EXPIRE_REFRESH_THRESHOLD:
+                    info[CACHE_EXPIRE_TIMESTAMP_STR] = now + EXPIRE_TIMESTAMP
+                    self._touched_keys.add(key)
+            elif expire and self._tmdb_cache_expire:
+                self.delete_meta_data(key)
+        return info or {}
 
     def dump_meta_data(self, search, page, num):
         """
@@ -80,18 +174,30 @@ class MetaHelper(object):
             begin_pos = 0
         else:
             begin_pos = (page - 1) * num
-
+        # 先写入未保存的条目，保证分页数据完整
+        self.save_meta_data(force=True)
+        if search:
+            where = "WHERE KEY LIKE ? ESCAPE '\\'"
+            params = ["%%%s%%" % search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")]
+        else:
+            where = ""
+            params = []
         with lock:
-            search_metas = [(k, {
+            total = self._db.execute(f"SELECT COUNT(1) FROM META_DATA {where}", params).fetchone()[0]
+            rows = self._db.execute(f"SELECT KEY, DATA FROM META_DATA {where} ORDER BY rowid LIMIT ? OFFSET ?",
+                                    params + [num, begin_pos]).fetchall()
+        search_metas = []
+        for k, data in rows:
+            v = pickle.loads(data)
+            search_metas.append((k, {
                 "id": v.get("id"),
                 "title": v.get("title"),
                 "year": v.get("year"),
                 "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
                 "poster_path": v.get("poster_path"),
                 "backdrop_path": v.get("backdrop_path")
-            },  str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
-                for k, v in self._meta_data.items() if search.lower() in k.lower() and v.get("id") != 0]
-            return len(search_metas), search_metas[begin_pos: begin_pos + num]
+            }, str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", "")))
+        return total, search_metas
 
     def delete_meta_data(self, key):
         """
@@ -100,16 +206,22 @@ class MetaHelper(object):
         @return: 被删除的缓存内容
         """
         with lock:
+            self._dirty_keys.discard(key)
+            self._touched_keys.discard(key)
+            self._db.execute("DELETE FROM META_DATA WHERE KEY = ?", (key,))
             return self._meta_data.pop(key, None)
 
     def delete_meta_data_by_tmdbid(self, tmdbid):
         """
         清空对应TMDBID的所有缓存记录，以强制更新TMDB中最新的数据
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            keys = [key for key, in self._db.execute("SELECT KEY FROM META_DATA WHERE TMDBID = ?",
+                                                      (str(tmdbid),))]
+            keys += [key for key in self._dirty_keys
+                     if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid)]
+            for key in keys:
+                self.delete_meta_data(key)
 
     def delete_unknown_meta(self):
         """
@@ -118,7 +230,9 @@ class MetaHelper(object):
         for key in list(self._meta_data):
             if str(self._meta_data.get(key, {}).get("id")) == '0':
                 with lock:
-                    self._meta_data.pop(key)
+                    self._meta_data.pop(key, None)
+                    self._dirty_keys.discard(key)
+                    self._touched_keys.discard(key)
 
     def modify_meta_data(self, key, title):
         """
@@ -131,23 +245,9 @@ class MetaHelper(object):
             if self._meta_data.get(key):
                 self._meta_data[key]['title'] = title
                 self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                self._dirty_keys.add(key)
             return self._meta_data.get(key)
 
-    @staticmethod
-    def __load_meta_data(path):
-        """
-        从文件中加载缓存
-        """
-        try:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            return {}
-
     def update_meta_data(self, meta_data):
         """
         新增或更新缓存条目
@@ -159,56 +259,32 @@ class MetaHelper(object):
                 if not self._meta_data.get(key):
                     item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
                     self._meta_data[key] = item
+                    self._dirty_keys.add(key)
 
     def save_meta_data(self, force=False):
         """
-        保存缓存数据到文件
+        保存缓存数据到数据库，只写入有变化的条目
+        :param force: 为False时同时清理已过期的缓存（需开启tmdb_cache_expire）
         """
-        meta_data = self.__load_meta_data(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
-            return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
-
-    def _random_sample(self, new_meta_data):
-        """
-        采样分析是否需要保存
-        """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(new_meta_data.keys(), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            dirty_keys, self._dirty_keys = self._dirty_keys, set()
+            touched_keys, self._touched_keys = self._touched_keys - dirty_keys, set()
+            items = [(key, self._meta_data.get(key)) for key in dirty_keys
+                     if self._meta_data.get(key) and str(self._meta_data.get(key).get("id")) != '0']
+            self.__write_items(items)
+            if touched_keys:
+                self.__executemany("UPDATE META_DATA SET EXPIRE = ?, DATA = ? WHERE KEY = ?",
+                                   [(info.get(CACHE_EXPIRE_TIMESTAMP_STR),
+                                     pickle.dumps(info, pickle.HIGHEST_PROTOCOL),
+                                     key) for key, info in
+                                    [(key, self._meta_data.get(key)) for key in touched_keys]
+                                    if info])
+            if not force and self._tmdb_cache_expire:
+                now = int(time.time())
+                expired_keys = [key for key, in self._db.execute("SELECT KEY FROM META_DATA WHERE EXPIRE < ?",
+                                                                  (now,))]
+                for key in expired_keys:
+                    self.delete_meta_data(key)
 
     def get_cache_title(self, key):
         """
@@ -227,3 +303,4 @@ class MetaHelper(object):
         if not cache_media_info:
             return
         self._meta_data[key]['title'] = cn_title
+        self._dirty_keys.add(key)
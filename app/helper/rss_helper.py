@@ -0,0 +1,143 @@
+import datetime
+import json
+import threading
+import time
+
+from app.utils import StringUtils
+from app.utils.commons import singleton
+from config import RSS_FEED_STATE_EXPIRE, RSS_SEEN_RETENTION
+
+
+@singleton
+class RssHelper(object):
+    """
+    RSS增量获取状态，按使用方（RSS订阅、刷流任务、自定义订阅任务）和RSS地址分别记录：
+    ETag/Last-Modified用于条件请求，RSS未变化时站点返回304不再下载和解析；
+    已处理过的条目及最新发布时间（水位）用于只返回新增条目，
+    已处理条目保留当前RSS中的全部条目及发布时间在水位前RSS_SEEN_RETENTION内的条目；
+    使用方的处理条件（如订阅清单、选种规则）变化或状态过期时重新处理全部条目
+    """
+    # 使用方|RSS地址 -> 状态
+    _feeds = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_context(*args):
+        """
+        计算使用方处理条件的指纹
+        """
+        return StringUtils.md5_hash(json.dumps(args, sort_keys=True, default=str, ensure_ascii=False))
+
+    @staticmethod
+    def __get_key(consumer, url):
+        return f"{consumer}|{url}"
+
+    @staticmethod
+    def __get_item_key(item):
+        return item.get("enclosure") or item.get("link") or item.get("title")
+
+    @staticmethod
+    def __get_item_time(item):
+        pubdate = item.get("pubdate")
+        if isinstance(pubdate, datetime.datetime):
+            return pubdate.timestamp()
+        if isinstance(pubdate, (int, float)):
+            return pubdate
+        return None
+
+    def get_headers(self, consumer, url, context=None):
+        """
+        获取条件请求头，处理条件变化或状态过期时清除该RSS的状态
+        :param consumer: 使用方标识
+        :param url: RSS地址
+        :param context: 使用方处理条件的指纹
+        :return: If-None-Match/If-Modified-Since请求头
+        """
+        key = self.__get_key(consumer, url)
+        with self._lock:
+            state = self._feeds.get(key)
+            if not state \
+                    or state.get("context") != context \
+                    or time.time() - state.get("time") > RSS_FEED_STATE_EXPIRE:
+                self._feeds[key] = {
+                    "context": context,
+                    "time": time.time(),
+                    "etag": None,
+                    "last_modified": None,
+                    "watermark": None,
+                    "seen": None
+                }
+                return {}
+            headers = {}
+            if state.get("etag"):
+                headers["If-None-Match"] = state.get("etag")
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state.get("last_modified")
+            return headers
+
+    def update_headers(self, consumer, url, res):
+        """
+        记录RSS响应中的ETag/Last-Modified
+        """
+        if res is None:
+            return
+        state = self._feeds.get(self.__get_key(consumer, url))
+        if state is None:
+            return
+        state["etag"] = res.headers.get("ETag")
+        state["last_modified"] = res.headers.get("Last-Modified")
+
+    def filter_items(self, consumer, url, items):
+        """
+        过滤掉已处理过的条目，并更新水位和已处理条目
+        :param consumer: 使用方标识
+        :param url: RSS地址
+        :param items: RSS解析出的全部条目
+        :return: 新增的条目，首次获取时返回全部条目
+        """
+        state = self._feeds.get(self.__get_key(consumer, url))
+        if state is None:
+            return items
+        with self._lock:
+            seen = state.get("seen")
+            if seen is None:
+                new_items = items
+                seen = {}
+            else:
+                new_items = [item for item in items if self.__get_item_key(item) not in seen]
+            current = {}
+            for item in items:
+                current[self.__get_item_key(item)] = self.__get_item_time(item)
+            watermark = max([pubtime for pubtime in current.values() if pubtime] + [state.get("watermark") or 0])
+            # 当前RSS中的条目全部保留，已不在RSS中的条目按发布时间保留水位前一段时间内的
+            for key, pubtime in seen.items():
+                if key not in current and pubtime and pubtime >= watermark - RSS_SEEN_RETENTION:
+                    current[key] = pubtime
+            state["seen"] = current
+            state["watermark"] = watermark or None
+        return new_items
+
+    def forget(self, consumer, url, items):
+        """
+        将条目从已处理中移除，下次RSS有更新时重新处理，用于处理出错或未处理完的条目
+        """
+        state = self._feeds.get(self.__get_key(consumer, url))
+        if not state or not state.get("seen"):
+            return
+        with self._lock:
+            for item in items or []:
+                state["seen"].pop(self.__get_item_key(item), None)
+            # 有需要重新处理的条目时，不能再依赖条件请求
+            state["etag"] = None
+            state["last_modified"] = None
+
+    def reset(self, consumer=None):
+        """
+        清除使用方的全部RSS状态，不传时清除所有状态
+        """
+        with self._lock:
+            if not consumer:
+                self._feeds = {}
+            else:
+                for key in [key for key in self._feeds if key.startswith(f"{consumer}|")]:
+                    self._feeds.pop(key, None)
@@ -0,0 +1,177 @@
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import RLock
+
+from app.utils import ExceptionUtils
+from app.utils.commons import singleton
+from config import Config
+
+lock = RLock()
+
+# 内存中缓存的详情条数
+DEFAULT_CACHE_SIZE = 1000
+# 详情有效期（小时），过期后仍可返回旧数据并在后台刷新
+DEFAULT_CACHE_TTL = 24
+# 过期后允许返回旧数据的时长（小时），超过后必须重新查询
+DEFAULT_CACHE_STALE = 7 * 24
+
+
+@singleton
+class TmdbCacheHelper(object):
+    """
+    TMDB详情缓存，按（类型，TMDBID，语种，附加信息）缓存完整的详情数据，
+    内存中按LRU保留最近使用的条目，同时持久化到配置目录下的tmdb_detail.db
+    """
+    _db = None
+    _db_path = None
+    _memory = OrderedDict()
+    _max_size = DEFAULT_CACHE_SIZE
+    _ttl = DEFAULT_CACHE_TTL * 3600
+    _stale = DEFAULT_CACHE_STALE * 3600
+    # 正在后台刷新的key
+    _refreshing = set()
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        laboratory = Config().get_config('laboratory') or {}
+        self._max_size = self.__to_int(laboratory.get("tmdb_detail_cache_size"), DEFAULT_CACHE_SIZE)
+        self._ttl = self.__to_int(laboratory.get("tmdb_detail_cache_ttl"), DEFAULT_CACHE_TTL) * 3600
+        self._stale = self.__to_int(laboratory.get("tmdb_detail_cache_stale"), DEFAULT_CACHE_STALE) * 3600
+        db_path = os.path.join(Config().get_config_path(), 'tmdb_detail.db')
+        with lock:
+            if not self._db or db_path != self._db_path:
+                if self._db:
+                    self._db.close()
+                self._db_path = db_path
+                self._db = self.__open_db(db_path)
+                self._memory = OrderedDict()
+            self.__purge_expired()
+            while len(self._memory) > self._max_size:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def __to_int(value, default):
+        try:
+            return int(value) if value not in (None, "") else default
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def __open_db(path):
+        """
+        打开缓存数据库，不存在时创建
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS TMDB_DETAIL ("
+                     "KEY TEXT PRIMARY KEY, "
+                     "UPDATE_TIME INTEGER, "
+                     "DATA BLOB)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_TMDB_DETAIL_TIME ON TMDB_DETAIL (UPDATE_TIME)")
+        return conn
+
+    @staticmethod
+    def make_key(mtype, tmdbid, language, append_to_response):
+        """
+        生成缓存的key
+        :param mtype: 媒体类型
+        :param tmdbid: TMDB ID
+        :param language: 语种
+        :param append_to_response: 附加信息，顺序不影响key
+        """
+        mtype = mtype.value if hasattr(mtype, "value") else mtype
+        appends = ",".join(sorted(set(filter(None, (append_to_response or "").split(",")))))
+        return f"{mtype}|{tmdbid}|{language}|{appends}"
+
+    def get(self, key):
+        """
+        获取缓存的详情
+        :return: 详情数据（每次返回新的副本）, 是否已过有效期需要刷新；不存在或已超过可用时长时返回None, False
+        """
+        if not key:
+            return None, False
+        with lock:
+            item = self._memory.get(key)
+            if item:
+                self._memory.move_to_end(key)
+        if not item:
+            try:
+                with lock:
+                    row = self._db.execute("SELECT UPDATE_TIME, DATA FROM TMDB_DETAIL WHERE KEY = ?",
+                                           (key,)).fetchone()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                row = None
+            if not row:
+                return None, False
+            item = (row[0], row[1])
+            self.__put_memory(key, item)
+        update_time, data = item
+        age = int(time.time()) - update_time
+        if age > self._ttl + self._stale:
+            return None, False
+        return pickle.loads(data), age > self._ttl
+
+    def set(self, key, tmdb_info):
+        """
+        缓存详情数据
+        """
+        if not key or not tmdb_info:
+            return
+        item = (int(time.time()), pickle.dumps(tmdb_info, pickle.HIGHEST_PROTOCOL))
+        self.__put_memory(key, item)
+        try:
+            with lock:
+                self._db.execute("INSERT OR REPLACE INTO TMDB_DETAIL (KEY, UPDATE_TIME, DATA) VALUES (?, ?, ?)",
+                                 (key, item[0], item[1]))
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def start_refresh(self, key):
+        """
+        标记key开始后台刷新，已在刷新中时返回False，避免重复刷新
+        """
+        with lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key):
+        """
+        标记key后台刷新结束
+        """
+        with lock:
+            self._refreshing.discard(key)
+
+    def __put_memory(self, key, item):
+        with lock:
+            self._memory[key] = item
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_size:
+                self._memory.popitem(last=False)
+
+    def __purge_expired(self):
+        """
+        删除超过可用时长的缓存
+        """
+        try:
+            with lock:
+                self._db.execute("DELETE FROM TMDB_DETAIL WHERE UPDATE_TIME < ?",
+                                 (int(time.time()) - self._ttl - self._stale,))
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def clear(self):
+        """
+        清空详情缓存
+        """
+        with lock:
+            self._memory = OrderedDict()
+            self._db.execute("DELETE FROM TMDB_DETAIL")
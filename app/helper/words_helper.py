@@ -14,6 +14,18 @@ class WordsHelper:
     replaced_words_noregex_info = []
     replaced_offset_words_info = []
     offset_words_info = []
+    # 识别词版本，每次重新加载识别词时递增，用于识别结果缓存失效
+    _version = 0
+
+    # 编译后的识别词：屏蔽、替换、替换+集偏移、集偏移
+    _ignored_words = []
+    _ignored_words_noregex = []
+    _ignored_words_noregex_re = None
+    _replaced_words = []
+    _replaced_words_noregex = []
+    _replaced_words_noregex_re = None
+    _replaced_offset_words = []
+    _offset_words = []
 
     def __init__(self):
         self.init_config()
@@ -26,6 +38,89 @@ class WordsHelper:
         self.replaced_words_noregex_info = self.dbhelper.get_custom_words(enabled=1, wtype=2, regex=0)
         self.replaced_offset_words_info = self.dbhelper.get_custom_words(enabled=1, wtype=3, regex=1)
         self.offset_words_info = self.dbhelper.get_custom_words(enabled=1, wtype=4, regex=1)
+        self.compile_words()
+        self._version += 1
+
+    def get_version(self):
+        """
+        返回当前识别词版本
+        """
+        return self._version
+
+    def compile_words(self):
+        """
+        将识别词列表编译为匹配规则，每次加载识别词时只编译一次：
+        正则识别词预编译，非正则识别词合并为一个正则用于快速判断是否有命中，
+        格式有误的识别词记录错误信息，处理时不再重复编译
+        """
+        self._ignored_words = [
+            (info.REPLACED, self.__compile(info.REPLACED))
+            for info in self.ignored_words_info or []
+        ]
+        self._ignored_words_noregex = [info.REPLACED for info in self.ignored_words_noregex_info or []]
+        self._ignored_words_noregex_re = self.__compile_literals(self._ignored_words_noregex)
+        self._replaced_words = [
+            (f"{info.REPLACED}@{info.REPLACE}", self.__compile(info.REPLACED), r'%s' % info.REPLACE)
+            for info in self.replaced_words_info or []
+        ]
+        self._replaced_words_noregex = [
+            (f"{info.REPLACED}@{info.REPLACE}", info.REPLACED, info.REPLACE)
+            for info in self.replaced_words_noregex_info or []
+        ]
+        self._replaced_words_noregex_re = self.__compile_literals(
+            [replaced for _, replaced, _ in self._replaced_words_noregex])
+        self._replaced_offset_words = [
+            (f"{info.REPLACED}@{info.REPLACE}",
+             f"{info.FRONT}@{info.BACK}@{info.OFFSET}",
+             f"{info.REPLACED}@{info.REPLACE}@{info.FRONT}@{info.BACK}@{info.OFFSET}",
+             self.__compile(info.REPLACED),
+             r'%s' % info.REPLACE,
+             self.__compile_offset(info.FRONT, info.BACK, info.OFFSET))
+            for info in self.replaced_offset_words_info or []
+        ]
+        self._offset_words = [
+            (f"{info.FRONT}@{info.BACK}@{info.OFFSET}",
+             self.__compile_offset(info.FRONT, info.BACK, info.OFFSET))
+            for info in self.offset_words_info or []
+        ]
+
+    @staticmethod
+    def __compile(pattern):
+        """
+        编译正则识别词
+        :return: (正则, 错误信息)
+        """
+        try:
+            return re.compile(r'%s' % pattern), ""
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return None, str(err)
+
+    @staticmethod
+    def __compile_literals(words):
+        """
+        将非正则识别词合并为一个正则，用于判断标题中是否包含任一识别词，无法合并时返回None，逐个匹配
+        """
+        if not words or not all(isinstance(word, str) for word in words):
+            return None
+        try:
+            return re.compile("|".join(re.escape(word) for word in sorted(set(words), key=len, reverse=True)))
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return None
+
+    @classmethod
+    def __compile_offset(cls, front, back, offset):
+        """
+        编译集偏移识别词
+        :return: 前定位词, 后定位词, 偏移量, (前定位正则, 错误信息), (后定位正则, 错误信息), (集数正则, 错误信息)
+        """
+        return (front,
+                back,
+                offset,
+                cls.__compile(front) if front else (None, ""),
+                cls.__compile(back) if back else (None, ""),
+                cls.__compile(r'(?<=%s.*?)[0-9]+(?=.*?%s)' % (front, back)))
 
     def process(self, title):
         # 错误信息
@@ -36,23 +131,22 @@ class WordsHelper:
         used_replaced_words = []
         # 应用集偏移
         used_offset_words = []
+        if not title:
+            return title, msg, {"ignored": used_ignored_words,
+                                "replaced": used_replaced_words,
+                                "offset": used_offset_words}
         # 屏蔽
-        if self.ignored_words_info:
-            for ignored_word_info in self.ignored_words_info:
-                ignored = ignored_word_info.REPLACED
-                ignored_word = ignored
-                title, ignore_msg, ignore_flag = self.replace_regex(replaced=ignored,
-                                                                    replace="",
-                                                                    title=title)
-                if ignore_flag:
-                    used_ignored_words.append(ignored_word)
-                elif ignore_msg:
-                    msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
-        if self.ignored_words_noregex_info:
-            for ignored_word_noregex_info in self.ignored_words_noregex_info:
-                ignored = ignored_word_noregex_info.REPLACED
-                ignored_word = ignored
-                title, ignore_msg, ignore_flag = self.replace_noregex(replaced=ignored,
+        for ignored_word, (ignored_re, compile_msg) in self._ignored_words:
+            title, ignore_msg, ignore_flag = self.__sub(ignored_re, compile_msg, "", title)
+            if ignore_flag:
+                used_ignored_words.append(ignored_word)
+            elif ignore_msg:
+                msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
+        # 所有非正则屏蔽词都不在标题中时跳过逐个匹配
+        if self._ignored_words_noregex \
+                and (not self._ignored_words_noregex_re or self._ignored_words_noregex_re.search(title)):
+            for ignored_word in self._ignored_words_noregex:
+                title, ignore_msg, ignore_flag = self.replace_noregex(replaced=ignored_word,
                                                                       replace="",
                                                                       title=title)
                 if ignore_flag:
@@ -60,23 +154,15 @@ class WordsHelper:
                 elif ignore_msg:
                     msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
         # 替换
-        if self.replaced_words_info:
-            for replaced_word_info in self.replaced_words_info:
-                replaced = replaced_word_info.REPLACED
-                replace = replaced_word_info.REPLACE
-                replaced_word = f"{replaced}@{replace}"
-                title, replace_msg, replace_flag = self.replace_regex(replaced=replaced,
-                                                                      replace=replace,
-                                                                      title=title)
-                if replace_flag:
-                    used_replaced_words.append(replaced_word)
-                elif replace_msg:
-                    msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
-        if self.replaced_words_noregex_info:
-            for replaced_word_noregex_info in self.replaced_words_noregex_info:
-                replaced = replaced_word_noregex_info.REPLACED
-                replace = replaced_word_noregex_info.REPLACE
-                replaced_word = f"{replaced}@{replace}"
+        for replaced_word, (replaced_re, compile_msg), replace in self._replaced_words:
+            title, replace_msg, replace_flag = self.__sub(replaced_re, compile_msg, replace, title)
+            if replace_flag:
+                used_replaced_words.append(replaced_word)
+            elif replace_msg:
+                msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
+        if self._replaced_words_noregex \
+                and (not self._replaced_words_noregex_re or self._replaced_words_noregex_re.search(title)):
+            for replaced_word, replaced, replace in self._replaced_words_noregex:
                 title, replace_msg, replace_flag = self.replace_noregex(replaced=replaced,
                                                                         replace=replace,
                                                                         title=title)
@@ -85,52 +171,69 @@ class WordsHelper:
                 elif replace_msg:
                     msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
         # 替换+集偏移
-        if self.replaced_offset_words_info:
-            for replaced_offset_word_info in self.replaced_offset_words_info:
-                replaced = replaced_offset_word_info.REPLACED
-                replace = replaced_offset_word_info.REPLACE
-                front = replaced_offset_word_info.FRONT
-                back = replaced_offset_word_info.BACK
-                offset = replaced_offset_word_info.OFFSET
-                replaced_word = f"{replaced}@{replace}"
-                offset_word = f"{front}@{back}@{offset}"
-                replaced_offset_word = f"{replaced}@{replace}@{front}@{back}@{offset}"
-                # 替换
-                title_replace, replace_msg, replace_flag = self.replace_regex(replaced=replaced,
-                                                                              replace=replace,
-                                                                              title=title)
-                # 替换应用成功进行集数偏移
-                if replace_flag:
-                    title_offset, offset_msg, offset_flag = self.episode_offset(front=front,
-                                                                                back=back,
-                                                                                offset=offset,
-                                                                                title=title_replace)
-                    # 集数偏移应用成功
-                    if offset_flag:
-                        used_replaced_words.append(replaced_word)
-                        used_offset_words.append(offset_word)
-                        title = title_offset
-                    elif offset_msg:
-                        msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
-                elif replace_msg:
-                    msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
-        # 集数偏移
-        if self.offset_words_info:
-            for offset_word_info in self.offset_words_info:
-                front = offset_word_info.FRONT
-                back = offset_word_info.BACK
-                offset = offset_word_info.OFFSET
-                offset_word = f"{front}@{back}@{offset}"
-                title, offset_msg, offset_flag = self.episode_offset(front, back, offset, title)
+        for replaced_word, offset_word, replaced_offset_word, (replaced_re, compile_msg), replace, offset_info \
+                in self._replaced_offset_words:
+            # 替换
+            title_replace, replace_msg, replace_flag = self.__sub(replaced_re, compile_msg, replace, title)
+            # 替换应用成功进行集数偏移
+            if replace_flag:
+                title_offset, offset_msg, offset_flag = self.__offset(offset_info, title_replace)
+                # 集数偏移应用成功
                 if offset_flag:
+                    used_replaced_words.append(replaced_word)
                     used_offset_words.append(offset_word)
+                    title = title_offset
                 elif offset_msg:
-                    msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
+                    msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
+            elif replace_msg:
+                msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
+        # 集数偏移
+        for offset_word, offset_info in self._offset_words:
+            title, offset_msg, offset_flag = self.__offset(offset_info, title)
+            if offset_flag:
+                used_offset_words.append(offset_word)
+            elif offset_msg:
+                msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
 
         return title, msg, {"ignored": used_ignored_words,
                             "replaced": used_replaced_words,
                             "offset": used_offset_words}
 
+    @staticmethod
+    def __sub(compiled, compile_msg, replace, title):
+        """
+        使用预编译的正则替换
+        """
+        if not compiled:
+            return title, compile_msg, False
+        try:
+            if not compiled.search(title):
+                return title, "", False
+            return compiled.sub(replace, title), "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
+
+    @classmethod
+    def __offset(cls, offset_info, title):
+        """
+        使用预编译的定位正则进行集数偏移
+        """
+        front, back, offset, (front_re, front_msg), (back_re, back_msg), (episode_re, episode_msg) = offset_info
+        if back:
+            if not back_re:
+                return title, back_msg, False
+            if not back_re.search(title):
+                return title, "", False
+        if front:
+            if not front_re:
+                return title, front_msg, False
+            if not front_re.search(title):
+                return title, "", False
+        if not episode_re:
+            return title, episode_msg, False
+        return cls.episode_offset(front, back, offset, title, episode_re=episode_re)
+
     @staticmethod
     def replace_regex(replaced, replace, title):
         msg = ""
@@ -160,15 +263,16 @@ class WordsHelper:
             return title, msg, False
 
     @staticmethod
-    def episode_offset(front, back, offset, title):
+    def episode_offset(front, back, offset, title, episode_re=None):
         msg = ""
         try:
-            if back and not re.findall(r'%s' % back, title):
-                return title, msg, False
-            if front and not re.findall(r'%s' % front, title):
-                return title, msg, False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9]+(?=.*?%s)' % (front, back))
-            episode_nums_str = re.findall(offset_word_info_re, title)
+            if not episode_re:
+                if back and not re.findall(r'%s' % back, title):
+                    return title, msg, False
+                if front and not re.findall(r'%s' % front, title):
+                    return title, msg, False
+                episode_re = re.compile(r'(?<=%s.*?)[0-9]+(?=.*?%s)' % (front, back))
+            episode_nums_str = re.findall(episode_re, title)
             if not episode_nums_str:
                 return title, msg, False
             episode_nums_offset_int = []
@@ -1,5 +1,4 @@
 import datetime
-import xml.dom.minidom
 from abc import ABCMeta, abstractmethod
 
 import log
@@ -7,7 +6,7 @@ from app.filter import Filter
 from app.helper import ProgressHelper
 from app.media import Media
 from app.media.meta import MetaInfo
-from app.utils import DomUtils, RequestUtils, StringUtils, ExceptionUtils
+from app.utils import FeedParser, RequestUtils, StringUtils, ExceptionUtils
 from app.utils.types import MediaType, SearchType
 
 
@@ -58,20 +57,17 @@ class _IIndexClient(metaclass=ABCMeta):
         """
         if not indexer or not key_word:
             return None
-        if filter_args is None:
-            filter_args = {}
+        filter_args = self.prepare_filter_args(indexer, filter_args)
         # 不在设定搜索范围的站点过滤掉
-        if filter_args.get("site") and indexer.name not in filter_args.get("site"):
+        if filter_args is None:
             return []
         # 计算耗时
         start_time = datetime.datetime.now()
         log.info(f"【{self.index_type}】开始检索Indexer：{indexer.name} ...")
-        # 特殊符号处理
-        search_word = StringUtils.handler_special_chars(text=key_word,
-                                                        replace_word=" ",
-                                                        allow_space=True)
-        api_url = f"{indexer.domain}?apikey={self.api_key}&t=search&q={search_word}"
-        result_array = self.__parse_torznabxml(api_url)
+        query = self.get_search_query(indexer, key_word, match_media)
+        if not query:
+            return []
+        result_array = self.search_by_query(indexer, query)
         if len(result_array) == 0:
             log.warn(f"【{self.index_type}】{indexer.name} 未检索到数据")
             self.progress.update(ptype='search', text=f"{indexer.name} 未检索到数据")
@@ -85,6 +81,46 @@ class _IIndexClient(metaclass=ABCMeta):
                                               match_media=match_media,
                                               start_time=start_time)
 
+    def prepare_filter_args(self, indexer, filter_args: dict):
+        """
+        检查站点是否在检索范围内，并生成该站点使用的过滤条件
+        :return: 过滤条件，站点不在检索范围内时返回None
+        """
+        if filter_args is None:
+            filter_args = {}
+        if filter_args.get("site") and indexer.name not in filter_args.get("site"):
+            return None
+        return filter_args
+
+    def get_search_query(self, indexer, key_word, match_media=None):
+        """
+        生成站点检索请求，请求相同时检索结果可在多个检索任务间共用
+        :return: (检索词, 媒体类型, IMDBID)，无法检索时返回None
+        """
+        # 特殊符号处理
+        search_word = StringUtils.handler_special_chars(text=key_word,
+                                                        replace_word=" ",
+                                                        allow_space=True)
+        if not search_word:
+            return None
+        return search_word, None, None
+
+    def can_batch_search(self, indexer):
+        """
+        站点是否支持一次请求检索多个关键字
+        """
+        return False
+
+    def search_by_query(self, indexer, query):
+        """
+        按检索请求检索站点，返回未经过滤的种子信息列表
+        :param indexer: 站点
+        :param query: get_search_query生成的检索请求，支持批量检索的站点检索词可为列表
+        """
+        search_word, _, _ = query
+        api_url = f"{indexer.domain}?apikey={self.api_key}&t=search&q={search_word}"
+        return self.__parse_torznabxml(api_url)
+
     @staticmethod
     def __parse_torznabxml(url):
         """
@@ -101,69 +137,55 @@ class _IIndexClient(metaclass=ABCMeta):
             return []
         if not ret:
             return []
-        xmls = ret.text
+        return _IIndexClient.parse_torznab_content(ret.text)
+
+    @staticmethod
+    def parse_torznab_content(xmls):
+        """
+        解析torznab报文中的种子信息
+        :param xmls: torznab报文
+        :return: 解析出来的种子信息列表
+        """
         if not xmls:
             return []
 
         torrents = []
         try:
-            # 解析XML
-            dom_tree = xml.dom.minidom.parseString(xmls)
-            root_node = dom_tree.documentElement
-            items = root_node.getElementsByTagName("item")
-            for item in items:
+            # 流式解析XML
+            for item in FeedParser.parse(xmls):
                 try:
                     # indexer id
-                    indexer_id = DomUtils.tag_value(item, "jackettindexer", "id",
-                                                    default=DomUtils.tag_value(item, "prowlarrindexer", "id", ""))
+                    indexer_id = item.indexer_id or ""
                     # indexer
-                    indexer = DomUtils.tag_value(item, "jackettindexer",
-                                                 default=DomUtils.tag_value(item, "prowlarrindexer", default=""))
+                    indexer = item.indexer or ""
 
                     # 标题
-                    title = DomUtils.tag_value(item, "title", default="")
+                    title = item.title or ""
                     if not title:
                         continue
                     # 种子链接
-                    enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+                    enclosure = item.enclosure or ""
                     if not enclosure:
                         continue
                     # 描述
-                    description = DomUtils.tag_value(item, "description", default="")
+                    description = item.description or ""
                     # 种子大小
-                    size = DomUtils.tag_value(item, "size", default=0)
+                    size = item.size or 0
                     # 种子页面
-                    page_url = DomUtils.tag_value(item, "comments", default="")
+                    page_url = item.comments or ""
 
                     # 做种数
-                    seeders = 0
+                    seeders = item.attrs.get("seeders", 0)
                     # 下载数
-                    peers = 0
-                    # 是否免费
-                    freeleech = False
+                    peers = item.attrs.get("peers", 0)
                     # 下载因子
-                    downloadvolumefactor = 1.0
+                    downloadvolumefactor = item.attrs.get("downloadvolumefactor", 1.0)
+                    # 是否免费
+                    freeleech = float(downloadvolumefactor) == 0
                     # 上传因子
-                    uploadvolumefactor = 1.0
+                    uploadvolumefactor = item.attrs.get("uploadvolumefactor", 1.0)
                     # imdbid
-                    imdbid = ""
-
-                    torznab_attrs = item.getElementsByTagName("torznab:attr")
-                    for torznab_attr in torznab_attrs:
-                        name = torznab_attr.getAttribute('name')
-                        value = torznab_attr.getAttribute('value')
-                        if name == "seeders":
-                            seeders = value
-                        if name == "peers":
-                            peers = value
-                        if name == "downloadvolumefactor":
-                            downloadvolumefactor = value
-                            if float(downloadvolumefactor) == 0:
-                                freeleech = True
-                        if name == "uploadvolumefactor":
-                            uploadvolumefactor = value
-                        if name == "imdbid":
-                            imdbid = value
+                    imdbid = item.attrs.get("imdbid", "")
 
                     tmp_dict = {'indexer_id': indexer_id,
                                 'indexer': indexer,
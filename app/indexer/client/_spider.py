@@ -1,6 +1,7 @@
 import copy
 import datetime
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
 from jinja2 import Template
@@ -10,10 +11,15 @@ import feapder
 import log
 from app.utils import StringUtils, SystemUtils
 from app.utils.exception_utils import ExceptionUtils
+from app.utils.rate_limiter import SiteRateLimiter
 from app.utils.types import MediaType
-from config import Config
+from config import Config, INDEXER_SPIDER_MAX_WORKERS
 from feapder.utils.tools import urlencode
 
+# 所有站点检索共用的爬虫线程池
+_SPIDER_EXECUTOR = ThreadPoolExecutor(max_workers=INDEXER_SPIDER_MAX_WORKERS,
+                                      thread_name_prefix="TorrentSpider")
+
 
 class TorrentSpider(feapder.AirSpider):
     _webdriver_path = SystemUtils.get_webdriver_path()
@@ -122,6 +128,38 @@ class TorrentSpider(feapder.AirSpider):
         self.result_num = Config().get_config('pt').get('site_search_result_num') or 100
         self.torrents_info_array = []
 
+    def submit(self):
+        """
+        在共用线程池中执行检索，不启动爬虫自身的线程
+        :return: Future，检索完成时返回种子信息列表
+        """
+        return _SPIDER_EXECUTOR.submit(self.__crawl)
+
+    def __crawl(self):
+        """
+        依次下载并解析检索请求
+        """
+        try:
+            for request in self.start_requests():
+                request = self.download_midware(request)
+                # 按站点限速，站点熔断时不再请求
+                if not SiteRateLimiter().acquire(request.url):
+                    log.warn(f"【Spider】{self.indexername} 暂停访问中，跳过检索")
+                    break
+                try:
+                    response = request.get_response()
+                except Exception:
+                    SiteRateLimiter().failure(request.url)
+                    raise
+                SiteRateLimiter().report(request.url, response.status_code if response is not None else None)
+                self.parse(request, response)
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            log.warn(f"【Spider】{self.indexername} 请求失败：{str(err)}")
+        finally:
+            self.is_complete = True
+        return self.torrents_info_array
+
     def start_requests(self):
         """
         开始请求
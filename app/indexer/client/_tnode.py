@@ -40,7 +40,8 @@ class TNodeSpider(object):
         res = RequestUtils(headers=self._ua,
                            cookies=self._cookie,
                            proxies=self._proxy,
-                           timeout=15).get_res(url=self._domain)
+                           timeout=15,
+                           rate_limit=True).get_res(url=self._domain)
         if res and res.status_code == 200:
             csrf_token = re.search(r'<meta name="x-csrf-token" content="(.+?)">', res.text)
             if csrf_token:
@@ -73,7 +74,8 @@ class TNodeSpider(object):
             },
             cookies=self._cookie,
             proxies=self._proxy,
-            timeout=30
+            timeout=30,
+            rate_limit=True
         ).post_res(url=self._searchurl, json=params)
         torrents = []
         if res and res.status_code == 200:
@@ -1,6 +1,6 @@
 import copy
 import datetime
-import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 
 import log
 from app.helper import IndexerHelper, IndexerConf, ProgressHelper, ChromeHelper
@@ -121,10 +121,39 @@ class BuiltinIndexer(_IIndexClient):
         """
         if not indexer or not key_word:
             return None
+        _filter_args = self.prepare_filter_args(indexer, filter_args)
+        # 不是配置的索引站点或不在设定搜索范围的站点过滤掉
+        if _filter_args is None:
+            return []
+        # 计算耗时
+        start_time = datetime.datetime.now()
+        log.info(f"【{self.index_type}】开始检索Indexer：{indexer.name} ...")
+        query = self.get_search_query(indexer, key_word, match_media)
+        if not query:
+            return []
+        result_array = self.search_by_query(indexer, query)
+        if len(result_array) == 0:
+            log.warn(f"【{self.index_type}】{indexer.name} 未检索到数据")
+            self.progress.update(ptype='search', text=f"{indexer.name} 未检索到数据")
+            return []
+        else:
+            log.warn(f"【{self.index_type}】{indexer.name} 返回数据：{len(result_array)}")
+            return self.filter_search_results(result_array=result_array,
+                                              order_seq=order_seq,
+                                              indexer=indexer,
+                                              filter_args=_filter_args,
+                                              match_media=match_media,
+                                              start_time=start_time)
+
+    def prepare_filter_args(self, indexer, filter_args: dict):
+        """
+        检查站点是否在检索范围内，并生成该站点使用的过滤条件
+        :return: 过滤条件，站点不在检索范围内时返回None
+        """
         # 不是配置的索引站点过滤掉
         indexer_sites = Config().get_config("pt").get("indexer_sites") or []
         if indexer_sites and indexer.id not in indexer_sites:
-            return []
+            return None
         # fix 共用同一个dict时会导致某个站点的更新全局全效
         if filter_args is None:
             _filter_args = {}
@@ -132,50 +161,62 @@ class BuiltinIndexer(_IIndexClient):
             _filter_args = copy.deepcopy(filter_args)
         # 不在设定搜索范围的站点过滤掉
         if _filter_args.get("site") and indexer.name not in _filter_args.get("site"):
-            return []
+            return None
         # 搜索条件没有过滤规则时，使用站点的过滤规则
         if not _filter_args.get("rule") and indexer.rule:
             _filter_args.update({"rule": indexer.rule})
-        # 计算耗时
-        start_time = datetime.datetime.now()
-        log.info(f"【{self.index_type}】开始检索Indexer：{indexer.name} ...")
+        return _filter_args
+
+    def get_search_query(self, indexer, key_word, match_media=None):
+        """
+        生成站点检索请求，请求相同时检索结果可在多个检索任务间共用
+        :return: (检索词, 媒体类型, IMDBID)，无法检索时返回None
+        """
         # 特殊符号处理
         search_word = StringUtils.handler_special_chars(text=key_word,
                                                         replace_word=" ",
                                                         allow_space=True)
+        if not search_word:
+            return None
         # 避免对英文站搜索中文
         if indexer.language == "en" and StringUtils.is_chinese(search_word):
             log.warn(f"【{self.index_type}】{indexer.name} 无法使用中文名搜索")
-            return []
+            return None
+        mtype = match_media.type if match_media else None
+        # 只有Rarbg按IMDBID检索
+        imdb_id = match_media.imdb_id if match_media and indexer.parser == "Rarbg" else None
+        return search_word, mtype, imdb_id
+
+    def can_batch_search(self, indexer):
+        """
+        站点是否支持一次请求检索多个关键字，只有通用爬虫解析且站点配置了批量检索的支持
+        """
+        return bool(indexer.batch) and indexer.parser not in ["Rarbg", "TNodeSpider", "RenderSpider"]
+
+    def search_by_query(self, indexer, query):
+        """
+        按检索请求检索站点，返回未经过滤的种子信息列表
+        :param indexer: 站点
+        :param query: get_search_query生成的检索请求，支持批量检索的站点检索词可为列表
+        """
+        search_word, mtype, imdb_id = query
         result_array = []
         try:
             if indexer.parser == "Rarbg":
-                imdb_id = match_media.imdb_id if match_media else None
                 result_array = Rarbg().search(keyword=search_word, indexer=indexer, imdb_id=imdb_id)
             elif indexer.parser == "TNodeSpider":
                 result_array = TNodeSpider(indexer=indexer).search(keyword=search_word)
             elif indexer.parser == "RenderSpider":
                 result_array = RenderSpider().search(keyword=search_word,
                                                      indexer=indexer,
-                                                     mtype=match_media.type if match_media else None)
+                                                     mtype=mtype)
             else:
                 result_array = self.__spider_search(keyword=search_word,
                                                     indexer=indexer,
-                                                    mtype=match_media.type if match_media else None)
+                                                    mtype=mtype)
         except Exception as err:
             print(str(err))
-        if len(result_array) == 0:
-            log.warn(f"【{self.index_type}】{indexer.name} 未检索到数据")
-            self.progress.update(ptype='search', text=f"{indexer.name} 未检索到数据")
-            return []
-        else:
-            log.warn(f"【{self.index_type}】{indexer.name} 返回数据：{len(result_array)}")
-            return self.filter_search_results(result_array=result_array,
-                                              order_seq=order_seq,
-                                              indexer=indexer,
-                                              filter_args=_filter_args,
-                                              match_media=match_media,
-                                              start_time=start_time)
+        return result_array or []
 
     def list(self, index_id, page=0, keyword=None):
         """
@@ -206,15 +247,13 @@ class BuiltinIndexer(_IIndexClient):
                         keyword=keyword,
                         page=page,
                         mtype=mtype)
-        spider.start()
-        # 循环判断是否获取到数据
-        sleep_count = 0
-        while not spider.is_complete:
-            sleep_count += 1
-            time.sleep(1)
-            if sleep_count > timeout:
-                break
+        # 等待检索完成，站点返回后立即结束等待
+        try:
+            result_array = spider.submit().result(timeout=timeout)
+        except FuturesTimeoutError:
+            log.warn(f"【Spider】{indexer.name} 检索超时")
+            result_array = spider.torrents_info_array
         # 返回数据
-        result_array = spider.torrents_info_array.copy()
+        result_array = result_array.copy()
         spider.torrents_info_array.clear()
         return result_array
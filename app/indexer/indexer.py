@@ -1,5 +1,7 @@
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, TimeoutError as FuturesTimeoutError
+from threading import Event, Lock
 
 import log
 from app.conf import ModuleConf
@@ -8,7 +10,8 @@ from app.indexer.client import BuiltinIndexer
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.commons import singleton
 from app.utils.types import SearchType, IndexerType
-from config import Config
+from config import Config, INDEXER_SEARCH_MAX_WORKERS, INDEXER_SEARCH_TIMEOUT, INDEXER_BATCH_MAX_WORKERS, \
+    INDEXER_BATCH_SITE_WORKERS, INDEXER_BATCH_KEYWORDS, INDEXER_BATCH_PAGE_SIZE, INDEXER_BATCH_SEARCH_TIMEOUT
 
 
 @singleton
@@ -17,8 +20,16 @@ class Indexer(object):
     _client = None
     _client_type = None
     progress = None
+    # 交互检索共用的线程池
+    _executor = None
+    # 批量检索共用的线程池
+    _batch_executor = None
 
     def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=INDEXER_SEARCH_MAX_WORKERS,
+                                            thread_name_prefix="IndexerSearch")
+        self._batch_executor = ThreadPoolExecutor(max_workers=INDEXER_BATCH_MAX_WORKERS,
+                                                  thread_name_prefix="IndexerBatchSearch")
         self._indexer_schemas = SubmoduleHelper.import_submodules(
             'app.indexer.client',
             filter_func=lambda _, obj: hasattr(obj, 'schema')
@@ -117,7 +128,8 @@ class Indexer(object):
                           key_word: [str, list],
                           filter_args: dict,
                           match_media=None,
-                          in_from: SearchType = None):
+                          in_from: SearchType = None,
+                          callback=None):
         """
         根据关键字调用 Index API 检索
         :param key_word: 检索的关键字，不能为空
@@ -126,49 +138,249 @@ class Indexer(object):
                             sp_state: 为UL DL，* 代表不关心，
         :param match_media: 需要匹配的媒体信息
         :param in_from: 搜索渠道
+        :param callback: 每个站点检索完成时回调，参数为站点和该站点的有效资源列表
         :return: 命中的资源媒体信息列表
         """
+        ret_array = []
+        for indexer, result in self.search_by_keyword_iter(key_word=key_word,
+                                                           filter_args=filter_args,
+                                                           match_media=match_media,
+                                                           in_from=in_from):
+            if callback:
+                callback(indexer, result)
+            ret_array.extend(result)
+        return ret_array
+
+    def search_by_keyword_iter(self,
+                               key_word: [str, list],
+                               filter_args: dict,
+                               match_media=None,
+                               in_from: SearchType = None,
+                               timeout=INDEXER_SEARCH_TIMEOUT):
+        """
+        根据关键字并行检索所有站点，每个站点检索完成后立即返回该站点的结果
+        :param key_word: 检索的关键字，不能为空
+        :param filter_args: 过滤条件，同search_by_keyword
+        :param match_media: 需要匹配的媒体信息
+        :param in_from: 搜索渠道
+        :param timeout: 等待所有站点返回的最长时间（秒），超时未返回的站点将被取消
+        :return: 生成器，依次返回（站点, 该站点的有效资源列表）
+        """
         if not key_word:
-            return []
+            return
 
         indexers = self.get_indexers()
         if not indexers:
             log.error(f"【{self._client_type.value}】没有有效的索引器配置！")
-            return []
+            return
         # 计算耗时
         start_time = datetime.datetime.now()
         if filter_args and filter_args.get("site"):
             log.info(f"【{self._client_type.value}】开始检索 %s，站点：%s ..." % (key_word, filter_args.get("site")))
             self.progress.update(ptype='search', text="开始检索 %s，站点：%s ..." % (key_word, filter_args.get("site")))
         else:
-            log.info(f"【{self._client_type.value}】开始并行检索 %s，线程数：%s ..." % (key_word, len(indexers)))
-            self.progress.update(ptype='search', text="开始并行检索 %s，线程数：%s ..." % (key_word, len(indexers)))
+            log.info(f"【{self._client_type.value}】开始并行检索 %s，站点数：%s ..." % (key_word, len(indexers)))
+            self.progress.update(ptype='search', text="开始并行检索 %s，站点数：%s ..." % (key_word, len(indexers)))
         # 多线程
-        executor = ThreadPoolExecutor(max_workers=len(indexers))
-        all_task = []
+        all_task = {}
         for index in indexers:
             order_seq = 100 - int(index.pri)
-            task = executor.submit(self._client.search,
-                                   order_seq,
-                                   index,
-                                   key_word,
-                                   filter_args,
-                                   match_media,
-                                   in_from)
-            all_task.append(task)
-        ret_array = []
+            task = self._executor.submit(self._client.search,
+                                         order_seq,
+                                         index,
+                                         key_word,
+                                         filter_args,
+                                         match_media,
+                                         in_from)
+            all_task[task] = index
+        total_count = 0
         finish_count = 0
-        for future in as_completed(all_task):
-            result = future.result()
-            finish_count += 1
-            self.progress.update(ptype='search', value=round(100 * (finish_count / len(all_task))))
-            if result:
-                ret_array = ret_array + result
+        try:
+            for future in as_completed(all_task, timeout=timeout):
+                finish_count += 1
+                try:
+                    result = future.result() or []
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    result = []
+                total_count += len(result)
+                self.progress.update(ptype='search',
+                                     value=round(100 * (finish_count / len(all_task))),
+                                     text="%s 检索完成，已完成站点：%s/%s，有效资源数：%s"
+                                          % (all_task[future].name, finish_count, len(all_task), total_count))
+                yield all_task[future], result
+        except FuturesTimeoutError:
+            timeout_sites = [index.name for task, index in all_task.items() if not task.done()]
+            log.warn(f"【{self._client_type.value}】以下站点检索超时，已忽略：%s" % "，".join(timeout_sites))
+        finally:
+            # 取消尚未开始或未返回的任务
+            for task in all_task:
+                task.cancel()
         # 计算耗时
         end_time = datetime.datetime.now()
         log.info(f"【{self._client_type.value}】所有站点检索完成，有效资源数：%s，总耗时 %s 秒"
-                 % (len(ret_array), (end_time - start_time).seconds))
+                 % (total_count, (end_time - start_time).seconds))
         self.progress.update(ptype='search', text="所有站点检索完成，有效资源数：%s，总耗时 %s 秒"
-                                                  % (len(ret_array), (end_time - start_time).seconds),
+                                                  % (total_count, (end_time - start_time).seconds),
                              value=100)
-        return ret_array
+
+    def batch_search(self, search_tasks: list, timeout=INDEXER_BATCH_SEARCH_TIMEOUT):
+        """
+        批量检索，多个检索任务中相同站点的相同检索请求只请求一次，支持多关键字检索的站点合并请求，
+        每个站点按并发上限依次执行请求，请求完成后按各检索任务的过滤条件和媒体信息分别匹配，
+        使用单独的线程池，不影响同时进行的交互检索
+        :param search_tasks: [(检索的关键字, 过滤条件, 匹配的媒体信息)]，过滤条件同search_by_keyword
+        :param timeout: 等待所有请求完成的最长时间（秒），超时后尚未开始的请求不再执行
+        :return: 与search_tasks顺序对应的命中资源列表
+        """
+        results = [[] for _ in search_tasks]
+        if not search_tasks:
+            return results
+        indexers = self.get_indexers()
+        if not indexers:
+            log.error(f"【{self._client_type.value}】没有有效的索引器配置！")
+            return results
+        # 计算耗时
+        start_time = datetime.datetime.now()
+        # 按站点汇总检索请求：{站点ID: {检索请求: [(任务序号, 过滤条件, 媒体信息)]}}
+        site_queries = {}
+        query_count = 0
+        for task_index, (key_word, filter_args, match_media) in enumerate(search_tasks):
+            if not key_word:
+                continue
+            for index in indexers:
+                _filter_args = self._client.prepare_filter_args(index, filter_args)
+                if _filter_args is None:
+                    continue
+                query = self._client.get_search_query(index, key_word, match_media)
+                if not query:
+                    continue
+                site_queries.setdefault(index.id, {}).setdefault(query, []).append(
+                    (task_index, _filter_args, match_media))
+                query_count += 1
+        # 各站点待执行的请求队列
+        site_requests = {}
+        for index in indexers:
+            if site_queries.get(index.id) and index.id not in site_requests:
+                site_requests[index.id] = (index, deque(self.__merge_queries(index, site_queries.get(index.id))))
+        request_count = sum([len(requests) for _, requests in site_requests.values()])
+        log.info(f"【{self._client_type.value}】开始批量检索 {len(search_tasks)} 个任务，"
+                 f"站点请求 {query_count} 个，去重合并后 {request_count} 个，站点数：{len(site_requests)} ...")
+        self.progress.update(ptype='search', text="开始批量检索 %s 个任务，站点请求数：%s ..."
+                                                  % (len(search_tasks), request_count))
+        if not request_count:
+            return results
+
+        result_lock = Lock()
+        stop_event = Event()
+        # 已完成的请求数、总请求数，合并请求拆分后总请求数增加
+        finish_count = [0, request_count]
+
+        def search_site(indexer, requests):
+            """
+            依次执行一个站点的请求，多个线程共用同一个请求队列
+            """
+            order_seq = 100 - int(indexer.pri)
+            while not stop_event.is_set():
+                try:
+                    query, targets, parts = requests.popleft()
+                except IndexError:
+                    break
+                request_start = datetime.datetime.now()
+                log.info(f"【{self._client_type.value}】开始检索Indexer：{indexer.name} {query[0]} ...")
+                try:
+                    result_array = self._client.search_by_query(indexer, query)
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    result_array = []
+                if parts and self.__is_full_page(indexer, result_array):
+                    # 合并请求的结果满页，热门资源可能挤掉其它关键字的结果，拆分为单关键字请求重新检索
+                    log.info(f"【{self._client_type.value}】{indexer.name} 合并检索结果已满一页，"
+                             f"拆分为 {len(parts)} 个请求重新检索")
+                    for part_query, part_targets in reversed(parts):
+                        requests.appendleft((part_query, part_targets, None))
+                    with result_lock:
+                        finish_count[1] += len(parts) - 1
+                    continue
+                if not result_array:
+                    log.warn(f"【{self._client_type.value}】{indexer.name} {query[0]} 未检索到数据")
+                for task_index, task_filter_args, task_media in targets if result_array else []:
+                    try:
+                        ret_array = self._client.filter_search_results(result_array=result_array,
+                                                                       order_seq=order_seq,
+                                                                       indexer=indexer,
+                                                                       filter_args=task_filter_args,
+                                                                       match_media=task_media,
+                                                                       start_time=request_start)
+                    except Exception as err:
+                        ExceptionUtils.exception_traceback(err)
+                        continue
+                    with result_lock:
+                        results[task_index].extend(ret_array)
+                with result_lock:
+                    finish_count[0] += 1
+                    self.progress.update(ptype='search',
+                                         value=round(100 * (finish_count[0] / finish_count[1])),
+                                         text="%s 检索完成，已完成请求：%s/%s"
+                                              % (indexer.name, finish_count[0], finish_count[1]))
+
+        # 每个站点按并发上限启动检索线程，总并发受批量检索线程池限制，不占用交互检索的线程
+        all_task = []
+        for index, requests in site_requests.values():
+            for _ in range(min(INDEXER_BATCH_SITE_WORKERS, len(requests))):
+                all_task.append(self._batch_executor.submit(search_site, index, requests))
+        _, not_done = wait(all_task, timeout=timeout)
+        if not_done:
+            stop_event.set()
+            for task in not_done:
+                task.cancel()
+            log.warn(f"【{self._client_type.value}】批量检索超时，已完成请求：%s/%s" % (finish_count[0], finish_count[1]))
+        with result_lock:
+            results = [list(result) for result in results]
+        # 计算耗时
+        end_time = datetime.datetime.now()
+        total_count = sum([len(result) for result in results])
+        log.info(f"【{self._client_type.value}】批量检索完成，有效资源数：%s，总耗时 %s 秒"
+                 % (total_count, (end_time - start_time).seconds))
+        self.progress.update(ptype='search', text="批量检索完成，有效资源数：%s，总耗时 %s 秒"
+                                                  % (total_count, (end_time - start_time).seconds),
+                             value=100)
+        return results
+
+    def __merge_queries(self, indexer, queries: dict):
+        """
+        合并站点的检索请求，支持多关键字检索的站点将媒体类型相同的请求按关键字数合并为一个请求
+        :param queries: {检索请求: [(任务序号, 过滤条件, 媒体信息)]}
+        :return: [(检索请求, [(任务序号, 过滤条件, 媒体信息)], 合并前的[(检索请求, [(任务序号, 过滤条件, 媒体信息)])])]，
+                 未合并的请求最后一项为None
+        """
+        if len(queries) < 2 or not self._client.can_batch_search(indexer):
+            return [(query, targets, None) for query, targets in queries.items()]
+        groups = {}
+        for query, targets in queries.items():
+            search_word, mtype, imdb_id = query
+            groups.setdefault((mtype, imdb_id), []).append((query, targets))
+        requests = []
+        for (mtype, imdb_id), items in groups.items():
+            for i in range(0, len(items), INDEXER_BATCH_KEYWORDS):
+                chunk = items[i:i + INDEXER_BATCH_KEYWORDS]
+                if len(chunk) == 1:
+                    query, targets = chunk[0]
+                    requests.append((query, targets, None))
+                else:
+                    requests.append((([query[0] for query, _ in chunk], mtype, imdb_id),
+                                     [target for _, targets in chunk for target in targets],
+                                     chunk))
+        return requests
+
+    @staticmethod
+    def __is_full_page(indexer, result_array):
+        """
+        检索结果是否已满一页，满页时可能还有未返回的结果
+        """
+        if not result_array:
+            return False
+        batch = getattr(indexer, "batch", None) or {}
+        page_size = int(batch.get("page_size") or INDEXER_BATCH_PAGE_SIZE)
+        result_num = int(Config().get_config('pt').get('site_search_result_num') or 100)
+        return len(result_array) >= min(page_size, result_num)
@@ -3,3 +3,4 @@ from .media import Media
 from .scraper import Scraper
 from .douban import DouBan
 from .bangumi import Bangumi
+from .library_index import LibraryIndex, LibraryMonitorHandler
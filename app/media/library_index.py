@@ -0,0 +1,337 @@
+import os
+import sqlite3
+import time
+from threading import RLock
+
+from watchdog.events import FileSystemEventHandler
+
+import log
+from app.media.meta import MetaInfo
+from app.utils import ExceptionUtils, PathUtils
+from app.utils.commons import singleton
+from config import RMT_MEDIAEXT, Config
+
+lock = RLock()
+
+
+class LibraryMonitorHandler(FileSystemEventHandler):
+    """
+    媒体库目录监控响应类，文件变化时更新媒体库索引
+    """
+
+    def __init__(self, monpath, index, **kwargs):
+        super(LibraryMonitorHandler, self).__init__(**kwargs)
+        self._watch_path = monpath
+        self.index = index
+
+    def on_created(self, event):
+        self.index.update_path(event.src_path)
+
+    def on_moved(self, event):
+        self.index.update_path(event.src_path)
+        self.index.update_path(event.dest_path)
+
+    def on_deleted(self, event):
+        self.index.update_path(event.src_path)
+
+
+@singleton
+class LibraryIndex(object):
+    """
+    媒体库文件索引，记录电影、电视剧、动漫目录下的媒体文件及剧集文件的识别结果（名称、季、集），
+    内存中按文件所在的各级目录建立索引，同时持久化到配置目录下的library.db，
+    由转移、目录监控实时更新，并定时全量校对，查询媒体是否存在时不再需要遍历和识别文件
+    """
+    _db = None
+    _db_path = None
+    # 媒体库根目录
+    _roots = []
+    # 需要识别季集的根目录（电视剧、动漫）
+    _episode_roots = []
+    # 已完成全量扫描的根目录
+    _scanned_roots = set()
+    # 文件路径 -> (名称, 季列表, 集列表)，未识别时为None
+    _files = {}
+    # 目录 -> 目录下（含子目录）的文件路径集合
+    _dirs = {}
+    # 全量校对过程中发生变化的文件，校对时不删除
+    _scanning = False
+    _changed_paths = set()
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        media = Config().get_config('media') or {}
+        movie_paths = self.__get_paths(media.get('movie_path'))
+        episode_paths = self.__get_paths(media.get('tv_path')) + self.__get_paths(media.get('anime_path'))
+        db_path = os.path.join(Config().get_config_path(), 'library.db')
+        with lock:
+            self._roots = list(dict.fromkeys(movie_paths + episode_paths))
+            self._episode_roots = list(dict.fromkeys(episode_paths))
+            if not self._db or db_path != self._db_path:
+                if self._db:
+                    self._db.close()
+                self._db_path = db_path
+                self._db = self.__open_db(db_path)
+                self.__load_index()
+
+    @staticmethod
+    def __get_paths(paths):
+        if not paths:
+            return []
+        if not isinstance(paths, list):
+            paths = [paths]
+        return [os.path.normpath(path) for path in paths if path]
+
+    @staticmethod
+    def __open_db(path):
+        """
+        打开索引数据库，不存在时创建
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS LIBRARY_FILES ("
+                     "PATH TEXT PRIMARY KEY, "
+                     "NAME TEXT, "
+                     "SEASONS TEXT, "
+                     "EPISODES TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS LIBRARY_ROOTS ("
+                     "PATH TEXT PRIMARY KEY, "
+                     "SCAN_TIME INTEGER)")
+        return conn
+
+    def __load_index(self):
+        """
+        从数据库中加载索引
+        """
+        self._files = {}
+        self._dirs = {}
+        try:
+            self._scanned_roots = set(path for path, in self._db.execute("SELECT PATH FROM LIBRARY_ROOTS"))
+            for path, name, seasons, episodes in self._db.execute(
+                    "SELECT PATH, NAME, SEASONS, EPISODES FROM LIBRARY_FILES"):
+                if seasons is None:
+                    info = None
+                else:
+                    info = (name, self.__str_to_list(seasons), self.__str_to_list(episodes))
+                self.__put_file(path, info)
+            if self._files:
+                log.info(f"【Library】已加载媒体库索引，共 {len(self._files)} 个文件")
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self._scanned_roots = set()
+
+    @staticmethod
+    def __list_to_str(values):
+        return ",".join([str(value) for value in values or []])
+
+    @staticmethod
+    def __str_to_list(value):
+        return [int(item) for item in value.split(",") if item] if value else []
+
+    def __get_root(self, path, roots=None):
+        """
+        查询路径所属的根目录
+        """
+        for root in roots or self._roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+        return None
+
+    def __is_media_file(self, path):
+        if PathUtils.is_invalid_path(path):
+            return False
+        if os.path.splitext(path)[-1].lower() not in RMT_MEDIAEXT:
+            return False
+        return self.__get_root(path) is not None
+
+    def __parse_file(self, path):
+        """
+        识别文件名中的名称和季集，只处理电视剧、动漫目录下的文件
+        """
+        if not self.__get_root(path, self._episode_roots):
+            return None
+        meta_info = MetaInfo(os.path.basename(path))
+        return meta_info.get_name(), meta_info.get_season_list(), meta_info.get_episode_list()
+
+    def __put_file(self, path, info):
+        """
+        将文件登记到内存索引及其所属根目录下的各级目录
+        """
+        self._files[path] = info
+        root = self.__get_root(path)
+        parent = os.path.dirname(path)
+        while parent:
+            self._dirs.setdefault(parent, set()).add(path)
+            if not root or parent == root or os.path.dirname(parent) == parent:
+                break
+            parent = os.path.dirname(parent)
+
+    def __pop_file(self, path):
+        """
+        从内存索引中移除文件
+        """
+        if path not in self._files:
+            return False
+        self._files.pop(path, None)
+        parent = os.path.dirname(path)
+        while parent:
+            files = self._dirs.get(parent)
+            if files is None:
+                break
+            files.discard(path)
+            if not files:
+                self._dirs.pop(parent, None)
+            if os.path.dirname(parent) == parent:
+                break
+            parent = os.path.dirname(parent)
+        return True
+
+    def __save_changes(self, added, removed):
+        """
+        在一个事务中写入新增和删除的文件
+        :param added: [(path, info)]
+        :param removed: [path]
+        """
+        if not added and not removed:
+            return
+        with lock:
+            self._db.execute("BEGIN")
+            try:
+                if removed:
+                    self._db.executemany("DELETE FROM LIBRARY_FILES WHERE PATH = ?",
+                                         [(path,) for path in removed])
+                if added:
+                    self._db.executemany("INSERT OR REPLACE INTO LIBRARY_FILES (PATH, NAME, SEASONS, EPISODES) "
+                                         "VALUES (?, ?, ?, ?)",
+                                         [(path,
+                                           info[0] if info else None,
+                                           self.__list_to_str(info[1]) if info else None,
+                                           self.__list_to_str(info[2]) if info else None)
+                                          for path, info in added])
+                self._db.execute("COMMIT")
+            except Exception as e:
+                self._db.execute("ROLLBACK")
+                ExceptionUtils.exception_traceback(e)
+
+    def get_library_paths(self):
+        """
+        返回所有媒体库根目录
+        """
+        return list(self._roots)
+
+    def get_media_files(self, path):
+        """
+        查询目录下（含子目录）的媒体文件及识别结果
+        :param path: 目录
+        :return: {文件路径: (名称, 季列表, 集列表)}，目录所属根目录未完成扫描时返回None，由调用方自行遍历
+        """
+        if not path:
+            return None
+        path = os.path.normpath(path)
+        root = self.__get_root(path)
+        if not root or root not in self._scanned_roots:
+            return None
+        with lock:
+            files = list(self._dirs.get(path) or [])
+            ret_files = {}
+            for file in files:
+                info = self._files.get(file)
+                if info is None and self.__get_root(file, self._episode_roots):
+                    info = self.__parse_file(file)
+                    self._files[file] = info
+                    self.__save_changes([(file, info)], [])
+                ret_files[file] = info
+            return ret_files
+
+    def update_path(self, path):
+        """
+        文件或目录发生变化时更新索引，路径存在时登记，不存在时移除
+        """
+        if not path:
+            return
+        path = os.path.normpath(path)
+        if not self.__get_root(path):
+            return
+        try:
+            added = []
+            removed = []
+            if os.path.isdir(path):
+                for file in PathUtils.get_dir_files(path, RMT_MEDIAEXT):
+                    file = os.path.normpath(file)
+                    if file not in self._files and self.__is_media_file(file):
+                        added.append((file, self.__parse_file(file)))
+            elif os.path.isfile(path):
+                if self.__is_media_file(path):
+                    added.append((path, self.__parse_file(path)))
+            else:
+                with lock:
+                    removed = [file for file in (self._dirs.get(path) or [])]
+                    if path in self._files:
+                        removed.append(path)
+            with lock:
+                for file, info in added:
+                    self.__put_file(file, info)
+                for file in removed:
+                    self.__pop_file(file)
+                if self._scanning:
+                    self._changed_paths.update([file for file, _ in added] + removed)
+            self.__save_changes(added, removed)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def reconcile(self):
+        """
+        全量扫描媒体库目录校对索引，已登记的文件不重复识别
+        """
+        if self._scanning:
+            return
+        with lock:
+            self._scanning = True
+            self._changed_paths = set()
+        try:
+            start_time = time.time()
+            for root in self._roots:
+                if not os.path.exists(root):
+                    continue
+                seen = set()
+                added = []
+                for file in PathUtils.get_dir_files(root, RMT_MEDIAEXT):
+                    file = os.path.normpath(file)
+                    seen.add(file)
+                    if file not in self._files:
+                        added.append((file, self.__parse_file(file)))
+                with lock:
+                    removed = [file for file in (self._dirs.get(root) or [])
+                               if file not in seen and file not in self._changed_paths
+                               and self.__get_root(file) == root]
+                    for file, info in added:
+                        self.__put_file(file, info)
+                    for file in removed:
+                        self.__pop_file(file)
+                    self.__save_changes(added, removed)
+                    self._db.execute("INSERT OR REPLACE INTO LIBRARY_ROOTS (PATH, SCAN_TIME) VALUES (?, ?)",
+                                     (root, int(time.time())))
+                    self._scanned_roots.add(root)
+                if added or removed:
+                    log.info(f"【Library】{root} 索引已更新，新增 {len(added)} 个，移除 {len(removed)} 个文件")
+            # 清理已不在媒体库目录下的文件
+            with lock:
+                outside = [file for file in self._files if not self.__get_root(file)]
+                for file in outside:
+                    self.__pop_file(file)
+                self.__save_changes([], outside)
+                for root in self._scanned_roots - set(self._roots):
+                    self._db.execute("DELETE FROM LIBRARY_ROOTS WHERE PATH = ?", (root,))
+                self._scanned_roots &= set(self._roots)
+            log.info(f"【Library】媒体库索引校对完成，共 {len(self._files)} 个文件，"
+                     f"耗时 {round(time.time() - start_time, 1)} 秒")
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            log.error(f"【Library】媒体库索引校对出错：{str(e)}")
+        finally:
+            with lock:
+                self._scanning = False
+                self._changed_paths = set()
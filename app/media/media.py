@@ -2,6 +2,7 @@ import difflib
 import os
 import random
 import re
+import threading
 import traceback
 from functools import lru_cache
 
@@ -9,7 +10,7 @@ import zhconv
 from lxml import etree
 
 import log
-from app.helper import MetaHelper
+from app.helper import MetaHelper, TmdbCacheHelper, ThreadHelper
 from app.media.meta.metainfo import MetaInfo
 from app.media.tmdbv3api import TMDb, Search, Movie, TV, Person, Find, TMDbException, Discover, Trending, Episode, Genre
 from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, cacheman
@@ -32,9 +33,12 @@ class Media:
     discover = None
     genre = None
     meta = None
+    tmdbcache = None
     _rmt_match_mode = None
     _search_keyword = None
     _search_tmdbweb = None
+    # TMDB语种及详情查询锁，所有实例共用
+    _tmdb_lock = threading.RLock()
 
     def __init__(self):
         self.init_config()
@@ -64,6 +68,7 @@ class Media:
                 self.discover = Discover()
                 self.genre = Genre()
                 self.meta = MetaHelper()
+                self.tmdbcache = TmdbCacheHelper()
             rmt_match_mode = app.get('rmt_match_mode', 'normal')
             if rmt_match_mode:
                 rmt_match_mode = rmt_match_mode.upper()
@@ -480,7 +485,8 @@ class Media:
                       tmdbid,
                       language=None,
                       append_to_response=None,
-                      chinese=True):
+                      chinese=True,
+                      cache=True):
         """
         给定TMDB号，查询一条媒体信息
         :param mtype: 类型：电影、电视剧、动漫，为空时都查（此时用不上年份）
@@ -488,14 +494,46 @@ class Media:
         :param language: 语种
         :param append_to_response: 附加信息
         :param chinese: 是否转换中文标题
+        :param cache: 是否使用详情缓存，为False时强制查询TMDB并更新缓存
         """
         if not self.tmdb:
             log.error("【Meta】TMDB API Key 未设置！")
             return None
-        if language:
-            self.tmdb.language = language
-        else:
-            self.tmdb.language = 'zh-CN'
+        refresh = False
+        # 语种保存在全局环境变量中，设置语种到查询完成期间加锁，避免后台刷新切换语种后缓存错误语种的详情
+        with self._tmdb_lock:
+            if language:
+                self.tmdb.language = language
+            else:
+                self.tmdb.language = 'zh-CN'
+            cache_key = self.tmdbcache.make_key(mtype=MediaType.MOVIE if mtype == MediaType.MOVIE else MediaType.TV,
+                                                tmdbid=tmdbid,
+                                                language=self.tmdb.language,
+                                                append_to_response=append_to_response)
+            tmdb_info, stale = self.tmdbcache.get(cache_key) if cache else (None, False)
+            if tmdb_info:
+                # 先返回过期数据，后台刷新
+                refresh = stale and self.tmdbcache.start_refresh(cache_key)
+            else:
+                tmdb_info = self.__get_tmdb_detail(mtype, tmdbid, append_to_response)
+                if tmdb_info:
+                    self.tmdbcache.set(cache_key, tmdb_info)
+            if tmdb_info:
+                # 转换genreid
+                tmdb_info['genre_ids'] = self.__get_genre_ids_from_detail(tmdb_info.get('genres'))
+                # 转换中文标题
+                if chinese:
+                    tmdb_info = self.__update_tmdbinfo_cn_title(tmdb_info)
+            language = self.tmdb.language
+        if refresh:
+            ThreadHelper().start_thread(self.__refresh_tmdb_detail,
+                                        (mtype, tmdbid, language, append_to_response, cache_key))
+        return tmdb_info
+
+    def __get_tmdb_detail(self, mtype: MediaType, tmdbid, append_to_response=None):
+        """
+        查询TMDB详情并标记媒体类型
+        """
         if mtype == MediaType.MOVIE:
             tmdb_info = self.__get_tmdb_movie_detail(tmdbid, append_to_response)
             if tmdb_info:
@@ -504,15 +542,21 @@ class Media:
             tmdb_info = self.__get_tmdb_tv_detail(tmdbid, append_to_response)
             if tmdb_info:
                 tmdb_info['media_type'] = MediaType.TV
-        if tmdb_info:
-            # 转换genreid
-            tmdb_info['genre_ids'] = self.__get_genre_ids_from_detail(tmdb_info.get('genres'))
-            # 转换中文标题
-            if chinese:
-                tmdb_info = self.__update_tmdbinfo_cn_title(tmdb_info)
-
         return tmdb_info
 
+    def __refresh_tmdb_detail(self, mtype, tmdbid, language, append_to_response, cache_key):
+        """
+        后台刷新过期的TMDB详情缓存
+        """
+        try:
+            with self._tmdb_lock:
+                self.tmdb.language = language
+                tmdb_info = self.__get_tmdb_detail(mtype, tmdbid, append_to_response)
+                if tmdb_info:
+                    self.tmdbcache.set(cache_key, tmdb_info)
+        finally:
+            self.tmdbcache.finish_refresh(cache_key)
+
     def __update_tmdbinfo_cn_title(self, tmdb_info):
         """
         更新TMDB信息中的中文名称
@@ -703,7 +747,8 @@ class Media:
                 file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
                                                      tmdbid=file_media_info.get("id"),
                                                      chinese=chinese,
-                                                     append_to_response=append_to_response)
+                                                     append_to_response=append_to_response,
+                                                     cache=cache)
             # 保存到缓存
             if file_media_info is not None:
                 self.__insert_media_cache(media_key=media_key,
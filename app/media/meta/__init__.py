@@ -1,4 +1,4 @@
-from .metainfo import MetaInfo
+from .metainfo import MetaInfo, MetaInfoCache
 from .metaanime import MetaAnime
 from ._base import MetaBase
 from .metavideo import MetaVideo
@@ -1,12 +1,122 @@
+import copy
 import os.path
+from collections import OrderedDict
+from threading import RLock
+
 import regex as re
 
 import log
 from app.helper import WordsHelper
 from app.media.meta.metaanime import MetaAnime
 from app.media.meta.metavideo import MetaVideo
+from app.media.meta.release_groups import ReleaseGroupsMatcher
+from app.utils.commons import singleton
 from app.utils.types import MediaType
-from config import RMT_MEDIAEXT
+from config import RMT_MEDIAEXT, Config
+
+lock = RLock()
+
+# 默认缓存的识别结果条数
+DEFAULT_CACHE_SIZE = 5000
+
+
+@singleton
+class MetaInfoCache(object):
+    """
+    名称识别结果缓存，按（标题，副标题，指定类型，识别词版本，制作组版本）缓存识别结果，
+    LRU保留最近使用的条目，每次返回独立的副本，调用方修改副本不影响缓存
+    """
+    _cache = OrderedDict()
+    _max_size = DEFAULT_CACHE_SIZE
+    _hits = 0
+    _misses = 0
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        laboratory = Config().get_config('laboratory') or {}
+        try:
+            self._max_size = int(laboratory.get("metainfo_cache_size"))
+        except (TypeError, ValueError):
+            self._max_size = DEFAULT_CACHE_SIZE
+        with lock:
+            while len(self._cache) > max(self._max_size, 0):
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def make_key(title, subtitle, mtype):
+        """
+        生成缓存的key，自定义识别词或制作组变化后旧的key不再命中
+        """
+        return (title,
+                subtitle,
+                mtype.value if isinstance(mtype, MediaType) else mtype,
+                WordsHelper().get_version(),
+                ReleaseGroupsMatcher().get_version())
+
+    def get(self, key):
+        """
+        查询缓存的识别结果
+        :return: 识别结果的副本，未命中时返回None
+        """
+        if self._max_size <= 0:
+            return None
+        with lock:
+            meta_info = self._cache.get(key)
+            if meta_info is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+        return self.__clone(meta_info)
+
+    def set(self, key, meta_info):
+        """
+        缓存识别结果，缓存的是副本，调用方后续修改不影响缓存
+        """
+        if self._max_size <= 0 or not meta_info:
+            return
+        meta_info = self.__clone(meta_info)
+        with lock:
+            self._cache[key] = meta_info
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def __clone(meta_info):
+        """
+        复制识别结果，列表、字典等可变属性同时复制一份
+        """
+        meta_info = copy.copy(meta_info)
+        for name, value in vars(meta_info).items():
+            if isinstance(value, (list, dict, set)):
+                setattr(meta_info, name, copy.copy(value))
+        return meta_info
+
+    def get_stats(self):
+        """
+        返回缓存统计信息
+        """
+        with lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "max_size": self._max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0
+            }
+
+    def clear(self):
+        """
+        清空缓存及统计
+        """
+        with lock:
+            self._cache = OrderedDict()
+            self._hits = 0
+            self._misses = 0
 
 
 def MetaInfo(title, subtitle=None, mtype=None):
@@ -17,6 +127,12 @@ def MetaInfo(title, subtitle=None, mtype=None):
     :param mtype: 指定识别类型，为空则自动识别类型
     :return: MetaAnime、MetaVideo
     """
+    cache = MetaInfoCache()
+    # 版本号需在识别前获取，识别过程中识别词变化时结果不会以新版本缓存
+    cache_key = cache.make_key(title, subtitle, mtype)
+    meta_info = cache.get(cache_key)
+    if meta_info is not None:
+        return meta_info
 
     # 应用自定义识别词
     title, msg, used_info = WordsHelper().process(title)
@@ -42,6 +158,10 @@ def MetaInfo(title, subtitle=None, mtype=None):
     meta_info.replaced_words = used_info.get("replaced")
     meta_info.offset_words = used_info.get("offset")
 
+    # 识别词有误时不缓存，保证每次都输出告警
+    if not msg:
+        cache.set(cache_key, meta_info)
+
     return meta_info
 
 
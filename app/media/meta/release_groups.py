@@ -1,13 +1,22 @@
 import re
+
+from app.utils.commons import singleton
 from config import Config
 
 
+@singleton
 class ReleaseGroupsMatcher(object):
     """
     识别制作组、字幕组
     """
     __config = None
     __release_groups = None
+    __groups_re = None
+    __prefilter_re = None
+    # 按搜索指定的制作组缓存的正则
+    __team_res = {}
+    # 配置版本，每次重新加载配置时递增
+    _version = 0
     RELEASE_GROUPS = {
         "0ff": ['FF(?:(?:A|WE)B|CD|E(?:DU|B)|TV)'],
         "1pt": [],
@@ -72,6 +81,9 @@ class ReleaseGroupsMatcher(object):
     }
 
     def __init__(self):
+        self.init_config()
+
+    def init_config(self):
         self.__config = Config()
         release_groups = []
         for site_groups in self.RELEASE_GROUPS.values():
@@ -87,6 +99,104 @@ class ReleaseGroupsMatcher(object):
             self.__release_groups = f"{'|'.join(release_groups)}|{custom_release_groups}"
         else:
             self.__release_groups = '|'.join(release_groups)
+        self.__team_res = {}
+        self.__groups_re, self.__prefilter_re = self.__compile(self.__release_groups)
+        self._version += 1
+
+    def get_version(self):
+        """
+        返回当前制作组配置版本，用于识别结果缓存失效
+        """
+        return self._version
+
+    @classmethod
+    def __compile(cls, groups):
+        """
+        编译制作组正则，同时生成按首字符快速排除的预过滤正则，无法确定首字符时不做预过滤
+        :return: 制作组正则, 预过滤正则
+        """
+        groups_re = re.compile(r"(?<=[-@\[￡【])(?:%s)(?=[@.\s\]\[】])" % groups, re.I)
+        first_chars = cls.__first_chars(groups)
+        if not first_chars:
+            return groups_re, None
+        prefilter_re = re.compile(r"(?<=[-@\[￡【])[%s]" % "".join(sorted(re.escape(c) for c in first_chars)), re.I)
+        return groups_re, prefilter_re
+
+    @classmethod
+    def __split_alternatives(cls, pattern):
+        """
+        按最外层的|拆分正则
+        """
+        alternatives = []
+        depth = 0
+        start = 0
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "\\":
+                i += 2
+                continue
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "|" and depth == 0:
+                alternatives.append(pattern[start:i])
+                start = i + 1
+            i += 1
+        alternatives.append(pattern[start:])
+        return alternatives
+
+    @classmethod
+    def __first_chars(cls, pattern):
+        """
+        计算正则所有可能的首字符，含有无法确定首字符的写法时返回None
+        """
+        first_chars = set()
+        for alternative in cls.__split_alternatives(pattern):
+            if not alternative:
+                return None
+            char = alternative[0]
+            if char == "(":
+                depth = 0
+                end = None
+                i = 0
+                while i < len(alternative):
+                    c = alternative[i]
+                    if c == "\\":
+                        # 跳过转义字符
+                        i += 2
+                        continue
+                    if c == "(":
+                        depth += 1
+                    elif c == ")":
+                        depth -= 1
+                        if depth == 0:
+                            end = i
+                            break
+                    i += 1
+                if end is None:
+                    return None
+                inner = alternative[1:end]
+                if not inner.startswith("?:") or alternative[end + 1:end + 2] in ["?", "*", "{"]:
+                    return None
+                inner_alternatives = cls.__split_alternatives(inner[2:])
+                if "" in inner_alternatives:
+                    # 分组可为空时，首字符也可能是分组后面的字符
+                    rest_chars = cls.__first_chars(alternative[end + 1:])
+                    inner_alternatives = [alt for alt in inner_alternatives if alt]
+                    if rest_chars is None:
+                        return None
+                    first_chars.update(rest_chars)
+                inner_chars = cls.__first_chars("|".join(inner_alternatives))
+                if inner_chars is None:
+                    return None
+                first_chars.update(inner_chars)
+            elif char in "\\[].^$*+?{}|)" or alternative[1:2] in ["?", "*", "{"]:
+                return None
+            else:
+                first_chars.add(char.lower())
+        return first_chars
 
     def match(self, title=None, groups=None):
         """
@@ -97,7 +207,14 @@ class ReleaseGroupsMatcher(object):
         if not title:
             return ""
         if not groups:
-            groups = self.__release_groups
+            groups_re, prefilter_re = self.__groups_re, self.__prefilter_re
+        else:
+            if groups not in self.__team_res:
+                if len(self.__team_res) >= 200:
+                    self.__team_res = {}
+                self.__team_res[groups] = self.__compile(groups)
+            groups_re, prefilter_re = self.__team_res[groups]
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【])(?:%s)(?=[@.\s\]\[】])" % groups, re.I)
+        if prefilter_re and not prefilter_re.search(title):
+            return ""
         return '@'.join(re.findall(groups_re, title))
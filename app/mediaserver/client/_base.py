@@ -93,10 +93,20 @@ class _IMediaClient(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def get_items(self, parent):
+    def get_items(self, parent, since=None):
         """
-        获取媒体库中的所有媒体
-        :param parent: 上一级的ID
+        获取媒体库中的所有媒体，连接出错时抛出异常
+        :param parent: 媒体库ID
+        :param since: 只获取该时间之后有变化的媒体，为空时获取全部
+        """
+        pass
+
+    @abstractmethod
+    def get_sync_item(self, item_id):
+        """
+        获取单个媒体的同步数据，剧集同时返回各季的集号
+        :param item_id: 媒体ID
+        :return: 同步数据字典，不存在或不是电影、剧集时返回空字典
         """
         pass
 
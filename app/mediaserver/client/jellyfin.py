@@ -1,7 +1,8 @@
 import re
+from datetime import timezone
 
 import log
-from config import Config
+from config import Config, MEDIASYNC_PAGE_SIZE
 from app.mediaserver.client._base import _IMediaClient
 from app.utils.types import MediaServerType
 from app.utils import RequestUtils, SystemUtils, ExceptionUtils
@@ -381,41 +382,131 @@ class Jellyfin(_IMediaClient):
             ExceptionUtils.exception_traceback(e)
             return {}
 
-    def get_items(self, parent):
+    def __get_paged_items(self, parent, item_types, fields=None, since=None):
+        """
+        分页获取媒体库下（含子目录）指定类型的项目，连接出错时抛出异常
+        :param parent: 上一级的ID
+        :param item_types: 项目类型，逗号分隔
+        :param fields: 需要额外返回的字段，逗号分隔
+        :param since: 只获取该时间（datetime）之后有变化的项目
+        """
+        req_url = "%sUsers/%s/Items?parentId=%s&recursive=true&includeItemTypes=%s&api_key=%s" % (
+            self._host, self._user, parent, item_types, self._apikey)
+        if fields:
+            req_url += "&fields=%s" % fields
+        if since:
+            req_url += "&minDateLastSaved=%s" % since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        start_index = 0
+        while True:
+            res = RequestUtils().get_res("%s&startIndex=%s&limit=%s" % (req_url, start_index, MEDIASYNC_PAGE_SIZE))
+            if not res or res.status_code != 200:
+                raise IOError(f"Users/Items 返回状态：{res.status_code if res is not None else '无返回'}")
+            results = res.json().get("Items") or []
+            for result in results:
+                if result:
+                    yield result
+            start_index += len(results)
+            if not results or start_index >= (res.json().get("TotalRecordCount") or 0):
+                break
+
+    @staticmethod
+    def __get_seasons(episodes):
+        """
+        按季汇总集号
+        :param episodes: 集的列表
+        :return: {季号: [集号]}
+        """
+        seasons = {}
+        for episode in episodes:
+            if episode.get("ParentIndexNumber") is None or episode.get("IndexNumber") is None:
+                continue
+            episode_set = seasons.setdefault(int(episode.get("ParentIndexNumber")), set())
+            episode_end = episode.get("IndexNumberEnd") or episode.get("IndexNumber")
+            episode_set.update(range(int(episode.get("IndexNumber")), int(episode_end) + 1))
+        return {season: sorted(episode_set) for season, episode_set in seasons.items()}
+
+    def get_series_episodes(self, item_id):
         """
-        获取媒体服务器所有媒体库列表
+        获取剧集所有季的集号
+        :param item_id: 剧集ID
+        :return: {季号: [集号]}，连接出错时返回None
         """
-        if not parent:
-            yield {}
         if not self._host or not self._apikey:
-            yield {}
-        req_url = "%sUsers/%s/Items?parentId=%s&api_key=%s" % (self._host, self._user, parent, self._apikey)
+            return None
+        req_url = "%sShows/%s/Episodes?userId=%s&isMissing=false&api_key=%s" % (
+            self._host, item_id, self._user, self._apikey)
         try:
             res = RequestUtils().get_res(req_url)
-            if res and res.status_code == 200:
-                results = res.json().get("Items") or []
-                for result in results:
-                    if not result:
+            if not res or res.status_code != 200:
+                return None
+            return self.__get_seasons(res.json().get("Items") or [])
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            log.error(f"【{self.server_type}】连接Shows/Id/Episodes出错：" + str(e))
+            return None
+
+    @staticmethod
+    def __build_sync_item(item_info, seasons=None):
+        """
+        组装单个媒体的同步数据
+        """
+        sync_item = {"id": item_info.get("Id"),
+                     "library": item_info.get("ParentId"),
+                     "type": item_info.get("Type"),
+                     "title": item_info.get("Name"),
+                     "originalTitle": item_info.get("OriginalTitle"),
+                     "year": item_info.get("ProductionYear"),
+                     "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
+                     "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
+                     "path": item_info.get("Path"),
+                     "json": str(item_info)}
+        if item_info.get("Type") == "Series":
+            sync_item["seasons"] = seasons
+        return sync_item
+
+    def get_sync_item(self, item_id):
+        """
+        获取单个媒体的同步数据，剧集同时返回各季的集号
+        """
+        item_info = self.get_iteminfo(item_id)
+        if not item_info or item_info.get("Type") not in ["Movie", "Series"]:
+            return {}
+        seasons = self.get_series_episodes(item_id) if item_info.get("Type") == "Series" else None
+        return self.__build_sync_item(item_info, seasons)
+
+    def get_items(self, parent, since=None):
+        """
+        获取媒体库中的所有电影、剧集，分页查询，连接出错时抛出异常，避免不完整的数据覆盖已同步的数据
+        :param parent: 媒体库ID
+        :param since: 只获取该时间（datetime）之后有变化的电影、剧集，剧集有新增的集时也会返回
+        """
+        if not parent:
+            return
+        if not self._host or not self._apikey:
+            return
+        try:
+            if since:
+                synced_ids = set()
+                for result in self.__get_paged_items(parent, "Movie,Series,Episode", since=since):
+                    item_id = result.get("SeriesId") if result.get("Type") == "Episode" else result.get("Id")
+                    if not item_id or item_id in synced_ids:
                         continue
-                    if result.get("Type") in ["Movie", "Series"]:
-                        item_info = self.get_iteminfo(result.get("Id"))
-                        yield {"id": result.get("Id"),
-                               "library": item_info.get("ParentId"),
-                               "type": item_info.get("Type"),
-                               "title": item_info.get("Name"),
-                               "originalTitle": item_info.get("OriginalTitle"),
-                               "year": item_info.get("ProductionYear"),
-                               "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
-                               "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
-                               "path": item_info.get("Path"),
-                               "json": str(item_info)}
-                    elif "Folder" in result.get("Type"):
-                        for item in self.get_items(result.get("Id")):
-                            yield item
+                    synced_ids.add(item_id)
+                    sync_item = self.get_sync_item(item_id)
+                    if sync_item:
+                        yield sync_item
+            else:
+                # 一次性获取媒体库所有集，按剧集汇总
+                series_episodes = {}
+                for episode in self.__get_paged_items(parent, "Episode"):
+                    series_episodes.setdefault(episode.get("SeriesId"), []).append(episode)
+                for result in self.__get_paged_items(parent, "Movie,Series",
+                                                     fields="ProviderIds,Path,OriginalTitle,ParentId"):
+                    yield self.__build_sync_item(result, self.__get_seasons(series_episodes.get(result.get("Id")) or []))
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             log.error(f"【{self.server_type}】连接Users/Items出错：" + str(e))
-        yield {}
+            raise
 
     def get_playing_sessions(self):
         """
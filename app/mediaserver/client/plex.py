@@ -185,29 +185,62 @@ class Plex(_IMediaClient):
             libraries.append({"id": library.key, "name": library.title})
         return libraries
 
-    def get_items(self, parent):
+    @staticmethod
+    def __get_sync_item(item):
+        """
+        组装单个媒体的同步数据，剧集同时返回各季的集号
+        """
+        sync_item = {"id": item.key,
+                     "library": item.librarySectionID,
+                     "type": item.type,
+                     "title": item.title,
+                     "year": item.year,
+                     "json": str(item.__dict__)}
+        if item.type == "show":
+            seasons = {}
+            for episode in item.episodes():
+                if episode.seasonNumber is None or episode.index is None:
+                    continue
+                seasons.setdefault(int(episode.seasonNumber), set()).add(int(episode.index))
+            sync_item["seasons"] = {season: sorted(episodes) for season, episodes in seasons.items()}
+        return sync_item
+
+    def get_sync_item(self, item_id):
+        """
+        获取单个媒体的同步数据，剧集同时返回各季的集号
+        """
+        if not self._plex or not item_id:
+            return {}
+        try:
+            item = self._plex.fetchItem(item_id)
+            if item and item.type in ["movie", "show"]:
+                return self.__get_sync_item(item)
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+        return {}
+
+    def get_items(self, parent, since=None):
         """
-        获取媒体服务器所有媒体库列表
+        获取媒体库中的所有电影、剧集，连接出错时抛出异常，避免不完整的数据覆盖已同步的数据
+        :param parent: 媒体库ID
+        :param since: 只获取该时间（datetime）之后有变化的媒体
         """
         if not parent:
-            yield {}
+            return
         if not self._plex:
-            yield {}
+            return
         try:
             section = self._plex.library.sectionByID(parent)
             if section:
                 for item in section.all():
                     if not item:
                         continue
-                    yield {"id": item.key,
-                           "library": item.librarySectionID,
-                           "type": item.type,
-                           "title": item.title,
-                           "year": item.year,
-                           "json": str(item.__dict__)}
+                    if since and item.updatedAt and item.updatedAt < since:
+                        continue
+                    yield self.__get_sync_item(item)
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
-        yield {}
+            raise
 
     def get_playing_sessions(self):
         """
@@ -1,3 +1,4 @@
+import datetime
 import threading
 
 import log
@@ -7,7 +8,7 @@ from app.helper import ProgressHelper, SubmoduleHelper
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaServerType
-from config import Config
+from config import Config, MEDIASYNC_DELTA_OVERLAP, MEDIASYNC_BATCH_SIZE
 
 lock = threading.Lock()
 server_lock = threading.Lock()
@@ -20,6 +21,8 @@ class MediaServer:
     _server = None
     mediadb = None
     progress = None
+    # 是否使用同步数据检查媒体是否存在
+    _exists_check = False
 
     def __init__(self):
         self._mediaserver_schemas = SubmoduleHelper.import_submodules(
@@ -36,6 +39,7 @@ class MediaServer:
         _type = Config().get_config('media').get('media_server') or 'emby'
         self._server_type = ModuleConf.MEDIASERVER_DICT.get(_type)
         self._server = None
+        self._exists_check = True if Config().get_config('media').get('mediasync_exists_check') else False
 
     def __build_class(self, ctype, conf):
         for mediaserver_schema in self._mediaserver_schemas:
@@ -119,6 +123,15 @@ class MediaServer:
         """
         if not self.server:
             return None
+        if self.__use_sync_data():
+            exists_episodes = self.mediadb.get_tv_episodes(server_type=self._server_type.value,
+                                                           title=meta_info.title,
+                                                           year=meta_info.year,
+                                                           tmdbid=meta_info.tmdb_id,
+                                                           season=season_number)
+            if exists_episodes is not None:
+                total_episodes = [episode for episode in range(1, episode_count + 1)]
+                return list(set(total_episodes).difference(set(exists_episodes)))
         return self.server.get_no_exists_episodes(meta_info,
                                                   season_number,
                                                   episode_count)
@@ -132,8 +145,20 @@ class MediaServer:
         """
         if not self.server:
             return None
+        if self.__use_sync_data():
+            return self.mediadb.get_movies(server_type=self._server_type.value,
+                                           title=title,
+                                           year=year)
         return self.server.get_movies(title, year)
 
+    def __use_sync_data(self):
+        """
+        是否使用本地同步数据检查媒体是否存在，需开启且至少完成过一次同步
+        """
+        if not self._exists_check:
+            return False
+        return True if self.mediadb.get_statistics(server_type=self._server_type.value) else False
+
     def refresh_library_by_items(self, items):
         """
         按类型、名称、年份来刷新媒体库
@@ -151,14 +176,15 @@ class MediaServer:
             return []
         return self.server.get_libraries()
 
-    def get_items(self, parent):
+    def get_items(self, parent, since=None):
         """
         获取媒体库中的所有媒体
         :param parent: 上一级的ID
+        :param since: 只获取该时间之后有变化的媒体
         """
         if not self.server:
             return []
-        return self.server.get_items(parent)
+        return self.server.get_items(parent, since=since)
 
     def sync_mediaserver(self):
         """
@@ -177,16 +203,21 @@ class MediaServer:
             total_count = 0
             movie_count = 0
             tv_count = 0
-            # 清空登记薄
-            self.mediadb.empty()
-            for library in self.get_libraries():
-                # 获取媒体库所有项目
-                self.progress.update(ptype="mediasync",
-                                     text="正在获取 %s 数据..." % (library.get("name")))
-                for item in self.get_items(library.get("id")):
-                    if not item:
-                        continue
-                    if self.mediadb.insert(self._server_type.value, item):
+            # 写入影子表，完成后整体替换，同步过程中原有数据仍可查询
+            if not self.mediadb.create_sync_table():
+                self.progress.end("mediasync")
+                log.error("【MediaServer】媒体库数据同步失败：无法创建同步表")
+                return
+            try:
+                for library in self.get_libraries():
+                    # 获取媒体库所有项目
+                    self.progress.update(ptype="mediasync",
+                                         text="正在获取 %s 数据..." % (library.get("name")))
+                    items = []
+                    for item in self.get_items(library.get("id")):
+                        if not item:
+                            continue
+                        items.append(item)
                         total_count += 1
                         if item.get("type") in ['Movie', 'movie']:
                             movie_count += 1
@@ -196,6 +227,23 @@ class MediaServer:
                                              text="正在同步 %s，已完成：%s / %s ..." % (
                                                  library.get("name"), total_count, total_media_count),
                                              value=round(100 * total_count / total_media_count, 1))
+                        if len(items) >= MEDIASYNC_BATCH_SIZE:
+                            if not self.mediadb.insert_sync_items(self._server_type.value, items):
+                                raise IOError("写入同步表出错")
+                            items = []
+                    if items and not self.mediadb.insert_sync_items(self._server_type.value, items):
+                        raise IOError("写入同步表出错")
+                if not self.mediadb.swap_sync_table():
+                    raise IOError("替换同步数据出错")
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self.mediadb.drop_sync_table()
+                self.progress.update(ptype="mediasync",
+                                     value=100,
+                                     text="媒体库数据同步失败：%s，已保留原有数据" % str(e))
+                self.progress.end("mediasync")
+                log.error("【MediaServer】媒体库数据同步失败：%s，已保留原有数据" % str(e))
+                return
             # 更新总体同步情况
             self.mediadb.statistics(server_type=self._server_type.value,
                                     total_count=total_count,
@@ -208,6 +256,59 @@ class MediaServer:
             self.progress.end("mediasync")
             log.info("【MediaServer】媒体库数据同步完成，同步数量：%s" % total_count)
 
+    def sync_mediaserver_delta(self):
+        """
+        增量同步上次同步之后有变化的媒体，未同步过时进行全量同步；已删除的媒体由全量同步清理
+        """
+        if not self.server:
+            return
+        status = self.mediadb.get_statistics(server_type=self._server_type.value)
+        if not status or not status.UPDATE_TIME:
+            self.sync_mediaserver()
+            return
+        try:
+            since = datetime.datetime.strptime(status.UPDATE_TIME, '%Y-%m-%d %H:%M:%S') \
+                - datetime.timedelta(minutes=MEDIASYNC_DELTA_OVERLAP)
+        except ValueError:
+            self.sync_mediaserver()
+            return
+        with lock:
+            update_count = 0
+            try:
+                for library in self.get_libraries():
+                    for item in self.get_items(library.get("id"), since=since):
+                        if not item:
+                            continue
+                        if self.mediadb.insert(self._server_type.value, item):
+                            update_count += 1
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【MediaServer】媒体库数据增量同步失败：%s" % str(e))
+                return
+            self.mediadb.statistics(server_type=self._server_type.value,
+                                    total_count=self.mediadb.count(self._server_type.value),
+                                    movie_count=self.mediadb.count(self._server_type.value, ['Movie', 'movie']),
+                                    tv_count=self.mediadb.count(self._server_type.value, ['Series', 'show']))
+            if update_count:
+                log.info("【MediaServer】媒体库数据增量同步完成，更新数量：%s" % update_count)
+
+    def sync_mediaserver_item(self, item_id):
+        """
+        同步单个媒体到本地数据库，媒体服务器中已不存在时删除，用于Webhook事件实时更新
+        :param item_id: 电影或剧集的ID
+        """
+        if not self.server or not item_id:
+            return
+        # 未进行过全量同步时不处理
+        if not self.mediadb.get_statistics(server_type=self._server_type.value):
+            return
+        item = self.server.get_sync_item(item_id)
+        if item:
+            self.mediadb.insert(self._server_type.value, item)
+            log.info("【MediaServer】已同步媒体：%s" % item.get("title"))
+        else:
+            self.mediadb.delete(self._server_type.value, item_id)
+
     def check_item_exists(self, title, year=None, tmdbid=None):
         """
         检查媒体库是否已存在某项目，非实时同步数据，仅用于展示
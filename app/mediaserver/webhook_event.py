@@ -68,7 +68,7 @@ class WebhookEvent:
                 eventItem['item_path'] = message.get('Item', {}).get('Path')
                 eventItem['item_id'] = message.get('Item', {}).get('Id')
                 eventItem['tmdb_id'] = message.get('Item', {}).get('ProviderIds', {}).get('Tmdb')
-                if len(message.get('Item', {}).get('Overview')) > 100:
+                if message.get('Item', {}).get('Overview') and len(message.get('Item', {}).get('Overview')) > 100:
                     eventItem['overview'] = str(message.get('Item', {}).get('Overview'))[:100] + "..."
                 else:
                     eventItem['overview'] = message.get('Item', {}).get('Overview')
@@ -89,6 +89,15 @@ class WebhookEvent:
         event_info = self.__parse_plex_msg(message)
         if event_info.get("event") in ["media.play", "media.stop"]:
             self.send_webhook_message(event_info, 'plex')
+        elif event_info.get("event") == "library.new":
+            # 更新同步数据，剧集按整部剧更新
+            metadata = message.get('Metadata', {})
+            if metadata.get('type') == 'episode':
+                rating_key = metadata.get('grandparentRatingKey')
+            else:
+                rating_key = metadata.get('ratingKey')
+            if rating_key:
+                self.mediaserver.sync_mediaserver_item(f"/library/metadata/{rating_key}")
 
     def jellyfin_action(self, message):
         """
@@ -97,6 +106,12 @@ class WebhookEvent:
         event_info = self.__parse_jellyfin_msg(message)
         if event_info.get("event") in ["PlaybackStart", "PlaybackStop"]:
             self.send_webhook_message(event_info, 'jellyfin')
+        elif event_info.get("event") in ["ItemAdded", "ItemDeleted"]:
+            # 更新同步数据，剧集按整部剧更新
+            if message.get('ItemType') == 'Episode':
+                self.mediaserver.sync_mediaserver_item(message.get('SeriesId'))
+            else:
+                self.mediaserver.sync_mediaserver_item(message.get('ItemId'))
 
     def emby_action(self, message):
         """
@@ -105,6 +120,9 @@ class WebhookEvent:
         event_info = self.__parse_emby_msg(message)
         if event_info.get("event") == "system.webhooktest":
             return
+        elif event_info.get("event") in ["library.new", "library.deleted"]:
+            # 更新同步数据，剧集按整部剧更新
+            self.mediaserver.sync_mediaserver_item(event_info.get('item_id'))
         elif event_info.get("event") in ["playback.start",
                                          "playback.stop",
                                          "user.authenticated",
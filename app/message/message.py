@@ -1,6 +1,7 @@
 import json
 import re
 from enum import Enum
+from urllib.parse import quote
 
 import log
 from app.conf import ModuleConf
@@ -122,7 +123,7 @@ class Message(object):
         if self._domain:
             if url:
                 if not url.startswith("http"):
-                    url = "%s?next=%s" % (self._domain, url)
+                    url = "%s?next=%s" % (self._domain, quote(url, safe=""))
             else:
                 url = self._domain
         else:
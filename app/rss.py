@@ -1,17 +1,19 @@
 import re
-import xml.dom.minidom
+import time
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
 import log
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import DbHelper
+from app.helper import DbHelper, RssHelper
 from app.media import Media
 from app.media.meta import MetaInfo
 from app.sites import Sites
 from app.subscribe import Subscribe
-from app.utils import DomUtils, RequestUtils, StringUtils, ExceptionUtils, RssTitleUtils, Torrent
+from app.utils import FeedParser, RequestUtils, StringUtils, ExceptionUtils, RssTitleUtils, Torrent
 from app.utils.types import MediaType, SearchType
+from config import Config, RSS_SITE_MAX_WORKERS
 
 lock = Lock()
 
@@ -24,6 +26,8 @@ class Rss:
     searcher = None
     dbhelper = None
     subscribe = None
+    # 各站点RSS并行处理共用的线程池
+    _executor = ThreadPoolExecutor(max_workers=RSS_SITE_MAX_WORKERS, thread_name_prefix="RssSite")
 
     def __init__(self):
         self.media = Media()
@@ -89,11 +93,8 @@ class Rss:
             else:
                 check_sites = list(set(check_sites))
 
-            # 匹配到的资源列表
-            rss_download_torrents = []
-            # 缺失的资源详情
-            rss_no_exists = {}
-            # 遍历站点资源
+            # 并行处理各站点RSS
+            rss_sites = []
             for site_info in self._sites:
                 if not site_info:
                     continue
@@ -103,278 +104,360 @@ class Rss:
                 if check_sites and site_name not in check_sites:
                     continue
                 # 站点rss链接
-                rss_url = site_info.get("rssurl")
-                if not rss_url:
+                if not site_info.get("rssurl"):
                     log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
                     continue
-                site_cookie = site_info.get("cookie")
-                site_ua = site_info.get("ua")
-                # 是否解析种子详情
-                site_parse = site_info.get("parse")
-                # 是否使用代理
-                site_proxy = site_info.get("proxy")
-                # 使用的规则
-                site_fliter_rule = site_info.get("rule")
-                # 开始下载RSS
-                log.info(f"【Rss】正在处理：{site_name}")
-                if site_info.get("pri"):
-                    site_order = 100 - int(site_info.get("pri"))
-                else:
-                    site_order = 0
-                rss_acticles = self.parse_rssxml(rss_url)
-                if not rss_acticles:
-                    log.warn(f"【Rss】{site_name} 未下载到数据")
+                rss_sites.append(site_info)
+            start_time = time.time()
+            site_tasks = [self._executor.submit(self.__process_site, site_info, rss_movies, rss_tvs)
+                          for site_info in rss_sites]
+            # 匹配到的资源列表
+            rss_download_torrents = []
+            # 缺失的资源详情
+            rss_no_exists = {}
+            # 站点耗时
+            site_costs = []
+            # 按站点优先级顺序合并结果，与逐个站点处理时一致
+            for site_info, site_task in zip(rss_sites, site_tasks):
+                try:
+                    site_torrents, site_no_exists, site_cost = site_task.result()
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    log.error(f"【Rss】{site_info.get('name')} 处理RSS发生错误：{str(e)}")
+                    continue
+                for media_info in site_torrents:
+                    if media_info not in rss_download_torrents:
+                        rss_download_torrents.append(media_info)
+                rss_no_exists.update(site_no_exists)
+                site_costs.append(site_cost)
+            log.info("【Rss】所有RSS处理结束，共 %s 个有效资源，耗时 %s 秒"
+                     % (len(rss_download_torrents), round(time.time() - start_time, 1)))
+            if site_costs:
+                site_costs.sort(key=lambda x: x.get("total"), reverse=True)
+                log.info("【Rss】站点耗时：%s" % "，".join(
+                    "%s %s秒（获取 %s秒，处理 %s 条 %s秒）" % (cost.get("site"),
+                                                     cost.get("total"),
+                                                     cost.get("fetch"),
+                                                     cost.get("count"),
+                                                     cost.get("process"))
+                    for cost in site_costs))
+            # 开始择优下载
+            self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
+                                      rss_no_exists=rss_no_exists)
+
+    def __process_site(self, site_info, rss_movies, rss_tvs):
+        """
+        下载并处理单个站点的RSS，识别并匹配订阅
+        :return: 匹配到的资源列表, 缺失的资源详情, 耗时信息
+        """
+        # 匹配到的资源列表
+        rss_download_torrents = []
+        # 缺失的资源详情
+        rss_no_exists = {}
+        # 站点名称
+        site_name = site_info.get("name")
+        # 站点rss链接
+        rss_url = site_info.get("rssurl")
+        site_cookie = site_info.get("cookie")
+        site_ua = site_info.get("ua")
+        # 是否解析种子详情
+        site_parse = site_info.get("parse")
+        # 是否使用代理
+        site_proxy = site_info.get("proxy")
+        # 使用的规则
+        site_fliter_rule = site_info.get("rule")
+        # 开始下载RSS
+        log.info(f"【Rss】正在处理：{site_name}")
+        if site_info.get("pri"):
+            site_order = 100 - int(site_info.get("pri"))
+        else:
+            site_order = 0
+        site_cost = {"site": site_name, "fetch": 0, "process": 0, "total": 0, "count": 0}
+        start_time = time.time()
+        # 订阅清单、站点设置或过滤规则变化时重新处理全部条目
+        rss_context = RssHelper().get_context(rss_movies, rss_tvs, site_info, self.filter.get_rule_infos())
+        rss_acticles = self.parse_rssxml(url=rss_url, consumer="rss", context=rss_context)
+        site_cost["fetch"] = site_cost["total"] = round(time.time() - start_time, 1)
+        if rss_acticles is None:
+            log.info(f"【Rss】{site_name} 没有新的数据")
+            return rss_download_torrents, rss_no_exists, site_cost
+        elif not rss_acticles:
+            log.warn(f"【Rss】{site_name} 未下载到数据")
+            return rss_download_torrents, rss_no_exists, site_cost
+        else:
+            log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
+        # 处理RSS结果
+        res_num = 0
+        for article in rss_acticles:
+            try:
+                # 种子名
+                title = article.get('title')
+                # 种子链接
+                enclosure = article.get('enclosure')
+                # 种子页面
+                page_url = article.get('link')
+                # 种子大小
+                size = article.get('size')
+                # 开始处理
+                log.info(f"【Rss】开始处理：{title}")
+                # 检查这个种子是不是下过了
+                if self.dbhelper.is_torrent_rssd(enclosure):
+                    log.info(f"【Rss】{title} 已成功订阅过")
                     continue
+                # 识别种子名称，开始检索TMDB
+                media_info = MetaInfo(title=title)
+                cache_info = self.media.get_cache_info(media_info)
+                if cache_info.get("id"):
+                    # 使用缓存信息
+                    media_info.tmdb_id = cache_info.get("id")
+                    media_info.type = cache_info.get("type")
+                    media_info.title = cache_info.get("title")
+                    media_info.year = cache_info.get("year")
                 else:
-                    log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
-                # 处理RSS结果
-                res_num = 0
-                for article in rss_acticles:
-                    try:
-                        # 种子名
-                        title = article.get('title')
-                        # 种子链接
-                        enclosure = article.get('enclosure')
-                        # 种子页面
-                        page_url = article.get('link')
-                        # 种子大小
-                        size = article.get('size')
-                        # 开始处理
-                        log.info(f"【Rss】开始处理：{title}")
-                        # 检查这个种子是不是下过了
-                        if self.dbhelper.is_torrent_rssd(enclosure):
-                            log.info(f"【Rss】{title} 已成功订阅过")
-                            continue
-                        # 识别种子名称，开始检索TMDB
-                        media_info = MetaInfo(title=title)
-                        cache_info = self.media.get_cache_info(media_info)
-                        if cache_info.get("id"):
-                            # 使用缓存信息
-                            media_info.tmdb_id = cache_info.get("id")
-                            media_info.type = cache_info.get("type")
-                            media_info.title = cache_info.get("title")
-                            media_info.year = cache_info.get("year")
-                        else:
-                            # 重新查询TMDB
-                            media_info = self.media.get_media_info(title=title)
-                            if not media_info:
-                                log.warn(f"【Rss】{title} 无法识别出媒体信息！")
-                                continue
-                            elif not media_info.tmdb_info:
-                                log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
-                        # 大小及种子页面
-                        media_info.set_torrent_info(size=size,
-                                                    page_url=page_url,
-                                                    site=site_name,
-                                                    site_order=site_order,
-                                                    enclosure=enclosure)
-                        # 检查种子是否匹配订阅，返回匹配到的订阅ID、是否洗版、总集数、上传因子、下载因子
-                        match_flag, match_msg, match_info = self.check_torrent_rss(
-                            media_info=media_info,
-                            rss_movies=rss_movies,
-                            rss_tvs=rss_tvs,
-                            site_filter_rule=site_fliter_rule,
-                            site_cookie=site_cookie,
-                            site_parse=site_parse,
-                            site_ua=site_ua,
-                            site_proxy=site_proxy)
-                        for msg in match_msg:
-                            log.info(f"【Rss】{msg}")
+                    # 重新查询TMDB
+                    media_info = self.media.get_media_info(title=title)
+                    if not media_info:
+                        log.warn(f"【Rss】{title} 无法识别出媒体信息！")
+                        # 识别失败可能是TMDB暂时不可用，下次重新处理
+                        RssHelper().forget(consumer="rss", url=rss_url, items=[article])
+                        continue
+                    elif not media_info.tmdb_info:
+                        log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
+                        RssHelper().forget(consumer="rss", url=rss_url, items=[article])
+                # 大小及种子页面
+                media_info.set_torrent_info(size=size,
+                                            page_url=page_url,
+                                            site=site_name,
+                                            site_order=site_order,
+                                            enclosure=enclosure)
+                # 检查种子是否匹配订阅，返回匹配到的订阅ID、是否洗版、总集数、上传因子、下载因子
+                match_flag, match_msg, match_info = self.check_torrent_rss(
+                    media_info=media_info,
+                    rss_movies=rss_movies,
+                    rss_tvs=rss_tvs,
+                    site_filter_rule=site_fliter_rule,
+                    site_cookie=site_cookie,
+                    site_parse=site_parse,
+                    site_ua=site_ua,
+                    site_proxy=site_proxy)
+                for msg in match_msg:
+                    log.info(f"【Rss】{msg}")
 
-                        # 未匹配
-                        if not match_flag:
-                            continue
+                # 未匹配
+                if not match_flag:
+                    continue
 
-                        # 非模糊匹配命中，检查本地情况，检查删除订阅
-                        if not match_info.get("fuzzy_match"):
-                            # 匹配到订阅，如没有TMDB信息则重新查询
-                            if not media_info.tmdb_info and media_info.tmdb_id:
-                                media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
-                                                                                  tmdbid=media_info.tmdb_id))
-                            if not media_info.tmdb_info:
-                                continue
-                            # 非洗版时检查本地是否存在
-                            if not match_info.get("over_edition"):
-                                if media_info.type == MediaType.MOVIE:
-                                    exist_flag, rss_no_exists, _ = self.downloader.check_exists_medias(
-                                        meta_info=media_info,
-                                        no_exists=rss_no_exists
-                                    )
-                                else:
-                                    # 从登记薄中获取缺失剧集
-                                    season = 1
-                                    if match_info.get("season"):
-                                        season = int(str(match_info.get("season")).replace("S", ""))
-                                    # 设定的总集数
-                                    total_ep = match_info.get("total")
-                                    # 设定的开始集数
-                                    current_ep = match_info.get("current_ep")
-                                    # 表登记的缺失集数
-                                    episodes = self.subscribe.get_subscribe_tv_episodes(match_info.get("id"))
-                                    if episodes is None:
-                                        episodes = []
-                                        if current_ep:
-                                            episodes = list(range(int(current_ep), int(total_ep) + 1))
-                                        rss_no_exists[media_info.tmdb_id] = [
-                                            {
-                                                "season": season,
-                                                "episodes": episodes,
-                                                "total_episodes": total_ep
-                                            }
-                                        ]
-                                    else:
-                                        rss_no_exists[media_info.tmdb_id] = [
-                                            {
-                                                "season": season,
-                                                "episodes": episodes,
-                                                "total_episodes": total_ep
-                                            }
-                                        ]
-                                    # 检查本地媒体库情况
-                                    exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
-                                        meta_info=media_info,
-                                        total_ep={season: total_ep}
-                                    )
-                                    # 取交集做为缺失集
-                                    rss_no_exists = Torrent.get_intersection_episodes(target=rss_no_exists,
-                                                                                      source=library_no_exists,
-                                                                                      title=media_info.tmdb_id)
-                                    if rss_no_exists.get(media_info.tmdb_id):
-                                        log.info("【Rss】%s 订阅缺失季集：%s" % (
-                                            media_info.get_title_string(),
-                                            rss_no_exists.get(media_info.tmdb_id)
-                                        ))
-                                # 本地已存在
-                                if exist_flag:
-                                    continue
-                            # 洗版模式
-                            else:
-                                # 洗版时季集不完整的资源不要
-                                if media_info.type != MediaType.MOVIE \
-                                        and media_info.get_episode_list():
-                                    log.info(
-                                        f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
-                                        f"正在洗版，过滤掉季集不完整的资源：{title}"
-                                    )
-                                    continue
-                                if not self.subscribe.check_subscribe_over_edition(
-                                        rtype=media_info.type,
-                                        rssid=match_info.get("id"),
-                                        res_order=match_info.get("res_order")):
-                                    log.info(
-                                        f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
-                                        f"正在洗版，跳过低优先级或同优先级资源：{title}"
-                                    )
-                                    continue
-                        # 模糊匹配
+                # 非模糊匹配命中，检查本地情况，检查删除订阅
+                if not match_info.get("fuzzy_match"):
+                    # 匹配到订阅，如没有TMDB信息则重新查询
+                    if not media_info.tmdb_info and media_info.tmdb_id:
+                        media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
+                                                                          tmdbid=media_info.tmdb_id))
+                    if not media_info.tmdb_info:
+                        RssHelper().forget(consumer="rss", url=rss_url, items=[article])
+                        continue
+                    # 非洗版时检查本地是否存在
+                    if not match_info.get("over_edition"):
+                        if media_info.type == MediaType.MOVIE:
+                            exist_flag, rss_no_exists, _ = self.downloader.check_exists_medias(
+                                meta_info=media_info,
+                                no_exists=rss_no_exists
+                            )
                         else:
-                            # 不做处理，直接下载
-                            pass
+                            # 从登记薄中获取缺失剧集
+                            season = 1
+                            if match_info.get("season"):
+                                season = int(str(match_info.get("season")).replace("S", ""))
+                            # 设定的总集数
+                            total_ep = match_info.get("total")
+                            # 设定的开始集数
+                            current_ep = match_info.get("current_ep")
+                            # 表登记的缺失集数
+                            episodes = self.subscribe.get_subscribe_tv_episodes(match_info.get("id"))
+                            if episodes is None:
+                                episodes = []
+                                if current_ep:
+                                    episodes = list(range(int(current_ep), int(total_ep) + 1))
+                                rss_no_exists[media_info.tmdb_id] = [
+                                    {
+                                        "season": season,
+                                        "episodes": episodes,
+                                        "total_episodes": total_ep
+                                    }
+                                ]
+                            else:
+                                rss_no_exists[media_info.tmdb_id] = [
+                                    {
+                                        "season": season,
+                                        "episodes": episodes,
+                                        "total_episodes": total_ep
+                                    }
+                                ]
+                            # 检查本地媒体库情况
+                            exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
+                                meta_info=media_info,
+                                total_ep={season: total_ep}
+                            )
+                            # 取交集做为缺失集
+                            rss_no_exists = Torrent.get_intersection_episodes(target=rss_no_exists,
+                                                                              source=library_no_exists,
+                                                                              title=media_info.tmdb_id)
+                            if rss_no_exists.get(media_info.tmdb_id):
+                                log.info("【Rss】%s 订阅缺失季集：%s" % (
+                                    media_info.get_title_string(),
+                                    rss_no_exists.get(media_info.tmdb_id)
+                                ))
+                        # 本地已存在
+                        if exist_flag:
+                            continue
+                    # 洗版模式
+                    else:
+                        # 洗版时季集不完整的资源不要
+                        if media_info.type != MediaType.MOVIE \
+                                and media_info.get_episode_list():
+                            log.info(
+                                f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
+                                f"正在洗版，过滤掉季集不完整的资源：{title}"
+                            )
+                            continue
+                        if not self.subscribe.check_subscribe_over_edition(
+                                rtype=media_info.type,
+                                rssid=match_info.get("id"),
+                                res_order=match_info.get("res_order")):
+                            log.info(
+                                f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
+                                f"正在洗版，跳过低优先级或同优先级资源：{title}"
+                            )
+                            continue
+                # 模糊匹配
+                else:
+                    # 不做处理，直接下载
+                    pass
 
-                        # 设置种子信息
-                        media_info.set_torrent_info(res_order=match_info.get("res_order"),
-                                                    filter_rule=match_info.get("filter_rule"),
-                                                    over_edition=match_info.get("over_edition"),
-                                                    download_volume_factor=match_info.get("download_volume_factor"),
-                                                    upload_volume_factor=match_info.get("upload_volume_factor"),
-                                                    rssid=match_info.get("id"))
-                        # 设置下载参数
-                        media_info.set_download_info(download_setting=match_info.get("download_setting"),
-                                                     save_path=match_info.get("save_path"))
-                        # 插入数据库历史记录
-                        self.dbhelper.insert_rss_torrents(media_info)
-                        # 加入下载列表
-                        if media_info not in rss_download_torrents:
-                            rss_download_torrents.append(media_info)
-                            res_num = res_num + 1
-                    except Exception as e:
-                        ExceptionUtils.exception_traceback(e)
-                        log.error("【Rss】处理RSS发生错误：%s" % str(e))
-                        continue
-                log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
-            log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
-            # 开始择优下载
-            self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
-                                      rss_no_exists=rss_no_exists)
+                # 设置种子信息
+                media_info.set_torrent_info(res_order=match_info.get("res_order"),
+                                            filter_rule=match_info.get("filter_rule"),
+                                            over_edition=match_info.get("over_edition"),
+                                            download_volume_factor=match_info.get("download_volume_factor"),
+                                            upload_volume_factor=match_info.get("upload_volume_factor"),
+                                            rssid=match_info.get("id"))
+                # 设置下载参数
+                media_info.set_download_info(download_setting=match_info.get("download_setting"),
+                                             save_path=match_info.get("save_path"))
+                # 插入数据库历史记录
+                self.dbhelper.insert_rss_torrents(media_info)
+                # 加入下载列表
+                if media_info not in rss_download_torrents:
+                    rss_download_torrents.append(media_info)
+                    res_num = res_num + 1
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                RssHelper().forget(consumer="rss", url=rss_url, items=[article])
+                continue
+        log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
+        site_cost.update({
+            "count": len(rss_acticles),
+            "process": round(time.time() - start_time - site_cost.get("fetch"), 1),
+            "total": round(time.time() - start_time, 1)
+        })
+        return rss_download_torrents, rss_no_exists, site_cost
 
     @staticmethod
-    def parse_rssxml(url):
+    def parse_rssxml(url, consumer=None, context=None):
         """
         解析RSS订阅URL，获取RSS中的种子信息
         :param url: RSS地址
-        :return: 种子信息列表
+        :param consumer: 增量获取时的使用方标识，为空时获取全部条目
+        :param context: 增量获取时使用方处理条件的指纹，变化时重新获取全部条目
+        :return: 种子信息列表，增量获取时RSS未变化或没有新增条目返回None
         """
-        _special_title_sites = {
-            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
-        }
-
-        # 开始处理
-        ret_array = []
         if not url:
             return []
-        site_domain = StringUtils.get_url_domain(url)
+        rss_helper = RssHelper()
         try:
-            ret = RequestUtils().get_res(url)
+            if consumer:
+                headers = {"User-Agent": Config().get_ua()}
+                headers.update(rss_helper.get_headers(consumer=consumer, url=url, context=context))
+                ret = RequestUtils(headers=headers, rate_limit=True).get_res(url)
+            else:
+                ret = RequestUtils(rate_limit=True).get_res(url)
             if not ret:
                 return []
+            if consumer:
+                if ret.status_code == 304:
+                    return None
             ret.encoding = ret.apparent_encoding
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
             log.console(str(e2))
             return []
-        if ret:
-            ret_xml = ret.text
-            try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
-                    try:
-                        # 标题
-                        title = DomUtils.tag_value(item, "title", default="")
-                        if not title:
-                            continue
-                        # 标题特殊处理
-                        if site_domain and site_domain in _special_title_sites:
-                            title = _special_title_sites.get(site_domain)(title)
-                        # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
-                        # 种子页面
-                        link = DomUtils.tag_value(item, "link", default="")
-                        # 种子链接
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
-                        if not enclosure and not link:
-                            continue
-                        # 部分RSS只有link没有enclosure
-                        if not enclosure and link:
-                            enclosure = link
-                            link = None
-                        # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
-                        if size and str(size).isdigit():
-                            size = int(size)
-                        else:
-                            size = 0
-                        # 发布日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
-                        if pubdate:
-                            # 转换为时间
-                            pubdate = StringUtils.get_time_stamp(pubdate)
-                        # 返回对象
-                        tmp_dict = {'title': title,
-                                    'enclosure': enclosure,
-                                    'size': size,
-                                    'description': description,
-                                    'link': link,
-                                    'pubdate': pubdate}
-                        ret_array.append(tmp_dict)
-                    except Exception as e1:
-                        ExceptionUtils.exception_traceback(e1)
+        ret_array = Rss.parse_rss_content(ret.text, site_domain=StringUtils.get_url_domain(url))
+        if consumer:
+            rss_helper.update_headers(consumer=consumer, url=url, res=ret)
+            return rss_helper.filter_items(consumer=consumer, url=url, items=ret_array) or None
+        return ret_array
+
+    @staticmethod
+    def parse_rss_content(content, site_domain=None):
+        """
+        解析RSS报文，获取RSS中的种子信息
+        :param content: RSS报文
+        :param site_domain: 站点域名，用于标题特殊处理
+        :return: 种子信息列表，报文格式错误时返回错误之前的条目
+        """
+        _special_title_sites = {
+            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
+        }
+
+        ret_array = []
+        try:
+            # 流式解析XML
+            for item in FeedParser.parse(content):
+                try:
+                    # 标题
+                    title = item.title or ""
+                    if not title:
                         continue
-            except Exception as e2:
-                ExceptionUtils.exception_traceback(e2)
-                return ret_array
+                    # 标题特殊处理
+                    if site_domain and site_domain in _special_title_sites:
+                        title = _special_title_sites.get(site_domain)(title)
+                    # 描述
+                    description = item.description or ""
+                    # 种子页面
+                    link = item.link or ""
+                    # 种子链接
+                    enclosure = item.enclosure or ""
+                    if not enclosure and not link:
+                        continue
+                    # 部分RSS只有link没有enclosure
+                    if not enclosure and link:
+                        enclosure = link
+                        link = None
+                    # 大小
+                    size = item.enclosure_length or 0
+                    if size and str(size).isdigit():
+                        size = int(size)
+                    else:
+                        size = 0
+                    # 发布日期
+                    pubdate = item.pubdate or ""
+                    if pubdate:
+                        # 转换为时间
+                        pubdate = StringUtils.get_time_stamp(pubdate)
+                    # 返回对象
+                    tmp_dict = {'title': title,
+                                'enclosure': enclosure,
+                                'size': size,
+                                'description': description,
+                                'link': link,
+                                'pubdate': pubdate}
+                    ret_array.append(tmp_dict)
+                except Exception as e1:
+                    ExceptionUtils.exception_traceback(e1)
+                    continue
+        except Exception as e2:
+            ExceptionUtils.exception_traceback(e2)
         return ret_array
 
     def check_torrent_rss(self,
@@ -9,7 +9,7 @@ from lxml import etree
 import log
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import DbHelper
+from app.helper import DbHelper, RssHelper
 from app.media import Media
 from app.media.meta import MetaInfo
 from app.message import Message
@@ -169,7 +169,10 @@ class RssChecker(object):
         taskinfo = self.get_rsstask_info(taskid)
         if not taskinfo:
             return
-        rss_result = self.__parse_userrss_result(taskinfo)
+        rss_result = self.__parse_userrss_result(taskinfo, incremental=True)
+        if rss_result is None:
+            log.info("【RssChecker】%s 没有新的数据" % taskinfo.get("name"))
+            return
         if len(rss_result) == 0:
             log.warn("【RssChecker】%s 未下载到数据" % taskinfo.get("name"))
             return
@@ -224,9 +227,12 @@ class RssChecker(object):
                                                                    mtype=mediatype)
                             if not media_info:
                                 log.warn("【RssChecker】%s 识别媒体信息出错！" % title)
+                                # 识别失败可能是TMDB暂时不可用，下次重新处理
+                                self.__forget_rss_items(taskinfo, [res])
                                 continue
                             if not media_info.tmdb_info:
                                 log.info("【RssChecker】%s 识别为 %s 未匹配到媒体信息" % (title, media_info.get_name()))
+                                self.__forget_rss_items(taskinfo, [res])
                                 continue
                         # 检查是否已存在
                         if media_info.type == MediaType.MOVIE:
@@ -315,6 +321,7 @@ class RssChecker(object):
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
                 log.error("【RssChecker】处理RSS发生错误：%s - %s" % (str(e), traceback.format_exc()))
+                self.__forget_rss_items(taskinfo, [res])
                 continue
         log.info("【RssChecker】%s 处理结束，匹配到 %s 个有效资源" % (taskinfo.get("name"), res_num))
         # 添加下载
@@ -338,6 +345,8 @@ class RssChecker(object):
                 else:
                     log.error("【RssChecker】添加下载任务 %s 失败：%s" % (
                         media.get_title_string(), ret_msg or "请检查下载任务是否已存在"))
+                    # 下载失败的下次重新处理
+                    self.__forget_rss_items(taskinfo, [{"enclosure": media.enclosure}])
                     if ret_msg:
                         self.message.send_download_fail_message(media, ret_msg)
         # 添加订阅
@@ -368,9 +377,19 @@ class RssChecker(object):
         if counter:
             self.dbhelper.update_userrss_task_info(taskid, counter)
 
-    def __parse_userrss_result(self, taskinfo):
+    @staticmethod
+    def __forget_rss_items(taskinfo, items):
+        """
+        增量获取时，将需要重新处理的条目从已处理中移除
+        """
+        RssHelper().forget(consumer="userrss%s" % taskinfo.get("id"),
+                           url=taskinfo.get("address"),
+                           items=items)
+
+    def __parse_userrss_result(self, taskinfo, incremental=False):
         """
         获取RSS链接数据，根据PARSER进行解析获取返回结果
+        :param incremental: 是否增量获取，是则RSS未变化或没有新增条目时返回None
         """
         rss_parser = self.get_userrss_parser(taskinfo.get("parser"))
         if not rss_parser:
@@ -400,11 +419,27 @@ class RssChecker(object):
                 log.error("【RssChecker】任务 %s 的解析配置附加参数不合法" % taskinfo.get("name"))
                 return []
             rss_url = "%s?%s" % (rss_url, param_url) if rss_url.find("?") == -1 else "%s&%s" % (rss_url, param_url)
-        # 请求数据
+        # 请求数据，增量获取时按任务记录状态，任务或解析配置变化时重新处理全部条目
+        rss_helper = RssHelper()
+        rss_consumer = "userrss%s" % taskinfo.get("id")
         try:
-            ret = RequestUtils().get_res(rss_url)
+            if incremental:
+                # 处理次数和更新时间每次处理后都会变化，不计入处理条件，过滤规则组内容变化时重新处理
+                rss_context = rss_helper.get_context(
+                    {key: value for key, value in taskinfo.items() if key not in ["update_time", "counter"]},
+                    rss_parser,
+                    self.filter.get_rule_infos())
+                headers = {"User-Agent": Config().get_ua()}
+                headers.update(rss_helper.get_headers(consumer=rss_consumer,
+                                                      url=taskinfo.get("address"),
+                                                      context=rss_context))
+                ret = RequestUtils(headers=headers).get_res(rss_url)
+            else:
+                ret = RequestUtils().get_res(rss_url)
             if not ret:
                 return []
+            if incremental and ret.status_code == 304:
+                return None
             ret.encoding = ret.apparent_encoding
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
@@ -458,6 +493,10 @@ class RssChecker(object):
                     if value:
                         rss_item.update({key: value[0]})
                 rss_result.append(rss_item)
+        if incremental:
+            rss_helper.update_headers(consumer=rss_consumer, url=taskinfo.get("address"), res=ret)
+            return rss_helper.filter_items(consumer=rss_consumer, url=taskinfo.get("address"), items=rss_result) \
+                or None
         return rss_result
 
     def get_userrss_parser(self, pid=None):
@@ -606,6 +645,9 @@ class RssChecker(object):
             elif flag == "set_unfinish":
                 for article in articles:
                     self.dbhelper.simple_delete_rss_torrents(article.get("title"), article.get("enclosure"))
+                # 设置为未处理的报文下次需要重新处理
+                for task in self._rss_tasks:
+                    self.__forget_rss_items(task, articles)
             else:
                 return False
             return True
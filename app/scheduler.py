@@ -10,6 +10,7 @@ import log
 from app.doubansync import DoubanSync
 from app.downloader import Downloader
 from app.helper import MetaHelper
+from app.media import LibraryIndex
 from app.mediaserver import MediaServer
 from app.rss import Rss
 from app.sites import Sites
@@ -19,7 +20,8 @@ from app.utils import ExceptionUtils
 from app.utils.commons import singleton
 from config import PT_TRANSFER_INTERVAL, METAINFO_SAVE_INTERVAL, \
     SYNC_TRANSFER_INTERVAL, RSS_CHECK_INTERVAL, REFRESH_PT_DATA_INTERVAL, \
-    RSS_REFRESH_TMDB_INTERVAL, META_DELETE_UNKNOWN_INTERVAL, REFRESH_WALLPAPER_INTERVAL, Config
+    RSS_REFRESH_TMDB_INTERVAL, META_DELETE_UNKNOWN_INTERVAL, REFRESH_WALLPAPER_INTERVAL, \
+    LIBRARY_INDEX_RECONCILE_INTERVAL, MEDIASYNC_DELTA_INTERVAL, Config
 from web.backend.wallpaper import get_login_wallpaper
 
 
@@ -172,6 +174,10 @@ class Scheduler:
                             mediasync_interval = 0
                 if mediasync_interval:
                     self.SCHEDULER.add_job(MediaServer().sync_mediaserver, 'interval', hours=mediasync_interval)
+                    # 两次全量同步之间进行增量同步
+                    self.SCHEDULER.add_job(MediaServer().sync_mediaserver_delta,
+                                           'interval',
+                                           minutes=MEDIASYNC_DELTA_INTERVAL)
                     log.info("媒体库同步服务启动")
 
         # 元数据定时保存
@@ -195,6 +201,12 @@ class Scheduler:
         # 定时清除未识别的缓存
         self.SCHEDULER.add_job(MetaHelper().delete_unknown_meta, 'interval', hours=META_DELETE_UNKNOWN_INTERVAL)
 
+        # 媒体库索引定时校对，启动时先执行一次
+        self.SCHEDULER.add_job(LibraryIndex().reconcile,
+                               'interval',
+                               hours=LIBRARY_INDEX_RECONCILE_INTERVAL,
+                               next_run_time=datetime.datetime.now())
+
         # 定时刷新壁纸
         self.SCHEDULER.add_job(get_login_wallpaper,
                                'interval',
@@ -35,13 +35,15 @@ class Searcher:
                       key_word: [str, list],
                       filter_args: dict,
                       match_media=None,
-                      in_from: SearchType = None):
+                      in_from: SearchType = None,
+                      callback=None):
         """
         根据关键字调用索引器检查媒体
         :param key_word: 检索的关键字，不能为空
         :param filter_args: 过滤条件
         :param match_media: 区配的媒体信息
         :param in_from: 搜索渠道
+        :param callback: 每个站点检索完成时回调，参数为站点和该站点的有效资源列表
         :return: 命中的资源媒体信息列表
         """
         if not key_word:
@@ -51,7 +53,8 @@ class Searcher:
         return self.indexer.search_by_keyword(key_word=key_word,
                                               filter_args=filter_args,
                                               match_media=match_media,
-                                              in_from=in_from)
+                                              in_from=in_from,
+                                              callback=callback)
 
     def search_one_media(self, media_info,
                          in_from: SearchType,
@@ -76,6 +79,71 @@ class Searcher:
             return None, {}, 0, 0
         # 进度计数重置
         self.progress.start('search')
+        first_search_name, second_search_name, filter_args = self.get_search_args(media_info=media_info,
+                                                                                  sites=sites,
+                                                                                  filters=filters)
+        # 开始搜索
+        log.info("【Searcher】开始检索 %s ..." % first_search_name)
+        media_list = self.search_medias(key_word=first_search_name,
+                                        filter_args=filter_args,
+                                        match_media=media_info,
+                                        in_from=in_from)
+        # 使用名称重新搜索
+        if len(media_list) == 0 \
+                and second_search_name \
+                and second_search_name != first_search_name:
+            log.info("【Searcher】%s 未检索到资源,尝试通过 %s 重新检索 ..." % (first_search_name, second_search_name))
+            media_list = self.search_medias(key_word=second_search_name,
+                                            filter_args=filter_args,
+                                            match_media=media_info,
+                                            in_from=in_from)
+        return self.download_search_results(media_info=media_info,
+                                            media_list=media_list,
+                                            in_from=in_from,
+                                            no_exists=no_exists,
+                                            user_name=user_name)
+
+    def batch_search_medias(self, search_items: list, in_from: SearchType):
+        """
+        批量检索多个媒体，各媒体相同站点的相同检索请求只请求一次，
+        未检索到资源的媒体再使用第二检索名称批量检索一次
+        :param search_items: [(已识别的媒体信息, 检索哪些站点, 过滤条件)]
+        :param in_from: 搜索渠道
+        :return: 与search_items顺序对应的命中资源列表
+        """
+        if not search_items or not self.indexer:
+            return [[] for _ in search_items or []]
+        # 进度计数重置
+        self.progress.start('search')
+        search_args = [self.get_search_args(media_info=media_info, sites=sites, filters=filters)
+                       for media_info, sites, filters in search_items]
+        log.info("【Searcher】开始批量检索 %s 个媒体 ..." % len(search_items))
+        media_lists = self.indexer.batch_search(
+            search_tasks=[(first_search_name, filter_args, media_info)
+                          for (media_info, _, _), (first_search_name, _, filter_args)
+                          in zip(search_items, search_args)])
+        # 使用名称重新搜索
+        retry_indexes = [i for i, (first_search_name, second_search_name, _) in enumerate(search_args)
+                         if not media_lists[i]
+                         and second_search_name
+                         and second_search_name != first_search_name]
+        if retry_indexes:
+            log.info("【Searcher】%s 个媒体未检索到资源，尝试通过第二检索名称重新检索 ..." % len(retry_indexes))
+            retry_lists = self.indexer.batch_search(
+                search_tasks=[(search_args[i][1], search_args[i][2], search_items[i][0]) for i in retry_indexes])
+            for i, media_list in zip(retry_indexes, retry_lists):
+                media_lists[i] = media_list
+        return media_lists
+
+    @staticmethod
+    def get_search_args(media_info, sites: list = None, filters: dict = None):
+        """
+        生成媒体的检索名称和过滤条件
+        :param media_info: 已识别的媒体信息
+        :param sites: 检索哪些站点
+        :param filters: 过滤条件，为空则不过滤
+        :return: 第一检索名称, 第二检索名称, 过滤条件
+        """
         # 查找的季
         if media_info.begin_season is None:
             search_season = None
@@ -128,29 +196,30 @@ class Searcher:
                 first_search_name = search_cn_name
                 if search_en_name:
                     second_search_name = search_en_name
-        # 开始搜索
-        log.info("【Searcher】开始检索 %s ..." % first_search_name)
-        media_list = self.search_medias(key_word=first_search_name,
-                                        filter_args=filter_args,
-                                        match_media=media_info,
-                                        in_from=in_from)
-        # 使用名称重新搜索
-        if len(media_list) == 0 \
-                and second_search_name \
-                and second_search_name != first_search_name:
-            log.info("【Searcher】%s 未检索到资源,尝试通过 %s 重新检索 ..." % (first_search_name, second_search_name))
-            media_list = self.search_medias(key_word=second_search_name,
-                                            filter_args=filter_args,
-                                            match_media=media_info,
-                                            in_from=in_from)
+        return first_search_name, second_search_name, filter_args
 
+    def download_search_results(self, media_info,
+                                media_list: list,
+                                in_from: SearchType,
+                                no_exists: dict,
+                                user_name=None):
+        """
+        从检索结果中择优下载
+        :param media_info: 已识别的媒体信息
+        :param media_list: 检索命中的资源列表
+        :param in_from: 搜索渠道
+        :param no_exists: 缺失的剧集清单
+        :param user_name: 用户名
+        :return: 同search_one_media
+        """
         if len(media_list) == 0:
-            log.info("【Searcher】%s 未搜索到任何资源" % second_search_name)
+            log.info("【Searcher】%s 未搜索到任何资源" % media_info.get_title_string())
             return None, no_exists, 0, 0
         else:
             if in_from in self.message.get_search_types():
-                # 保存搜索记录
-                self.dbhelper.delete_all_search_torrents()
+                # 保存搜索记录，按渠道和用户区分检索会话
+                session = self.dbhelper.get_search_session(in_from, user_name)
+                self.dbhelper.delete_search_results(session=session)
                 # 搜索结果排序
                 media_list = sorted(media_list, key=lambda x: "%s%s%s%s" % (str(x.title).ljust(100, ' '),
                                                                             str(x.res_order).rjust(3, '0'),
@@ -158,7 +227,7 @@ class Searcher:
                                                                             str(x.seeders).rjust(10, '0')),
                                     reverse=True)
                 # 插入数据库
-                self.dbhelper.insert_search_results(media_list)
+                self.dbhelper.insert_search_results(media_list, session=session)
                 # 微信未开自动下载时返回
                 if not self._search_auto:
                     return None, no_exists, len(media_list), None
@@ -49,7 +49,8 @@ class SiteUserInfoFactory(object):
             res = RequestUtils(cookies=site_cookie,
                                session=session,
                                headers=ua,
-                               proxies=proxies
+                               proxies=proxies,
+                               rate_limit=True
                                ).get_res(url=url)
             if res and res.status_code == 200:
                 if "charset=utf-8" in res.text or "charset=UTF-8" in res.text:
@@ -67,7 +68,8 @@ class SiteUserInfoFactory(object):
                     res = RequestUtils(cookies=site_cookie,
                                        session=session,
                                        headers=ua,
-                                       proxies=proxies
+                                       proxies=proxies,
+                                       rate_limit=True
                                        ).get_res(url=tmp_url)
                     if res and res.status_code == 200:
                         if "charset=utf-8" in res.text or "charset=UTF-8" in res.text:
@@ -86,7 +88,8 @@ class SiteUserInfoFactory(object):
                     res = RequestUtils(cookies=site_cookie,
                                        session=session,
                                        headers=ua,
-                                       proxies=proxies
+                                       proxies=proxies,
+                                       rate_limit=True
                                        ).get_res(url=url + "/index.php")
                     if res and res.status_code == 200:
                         if "charset=utf-8" in res.text or "charset=UTF-8" in res.text:
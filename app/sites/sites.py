@@ -1,12 +1,14 @@
 import json
-import random
 import re
 import time
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import lru_cache
 from multiprocessing.dummy import Pool as ThreadPool
-from threading import Lock
+from threading import Lock, Event
+from urllib.parse import urlparse, parse_qs
 
 from lxml import etree
 from selenium.webdriver.common.by import By
@@ -18,9 +20,9 @@ from app.helper import ChromeHelper, SiteHelper, DbHelper
 from app.message import Message
 from app.sites.site_user_info_factory import SiteUserInfoFactory
 from app.conf import SiteConf
-from app.utils import RequestUtils, StringUtils, ExceptionUtils
+from app.utils import RequestUtils, StringUtils, ExceptionUtils, SiteRateLimiter, TorrentAttrCache
 from app.utils.commons import singleton
-from config import Config
+from config import Config, BRUSH_PREFETCH_MAX_WORKERS, BRUSH_PREFETCH_SITE_WORKERS
 
 lock = Lock()
 
@@ -39,6 +41,13 @@ class Sites:
     _brush_sites = []
     _statistic_sites = []
     _signin_sites = []
+    # 并发获取种子详情页面的线程池
+    _attr_executor = ThreadPoolExecutor(max_workers=BRUSH_PREFETCH_MAX_WORKERS, thread_name_prefix="TorrentAttr")
+    # 站点域名 -> 待获取的详情页面队列
+    _attr_queues = {}
+    # 站点域名 -> 已提交的获取线程数，不超过BRUSH_PREFETCH_SITE_WORKERS
+    _attr_workers = {}
+    _attr_lock = Lock()
     _last_update_time = None
 
     _MAX_CONCURRENCY = 10
@@ -659,6 +668,9 @@ class Sites:
     def __get_site_page_html(url, cookie, ua, render=False, proxy=False):
         chrome = ChromeHelper(headless=True)
         if render and chrome.get_status():
+            # 按站点限速，站点熔断时不再请求
+            if not SiteRateLimiter().acquire(url):
+                return ""
             # 开渲染
             if chrome.visit(url=url, cookie=cookie, ua=ua):
                 # 等待页面加载完成
@@ -668,7 +680,8 @@ class Sites:
             res = RequestUtils(
                 cookies=cookie,
                 headers=ua,
-                proxies=Config().get_proxies() if proxy else None
+                proxies=Config().get_proxies() if proxy else None,
+                rate_limit=True
             ).get_res(url=url)
             if res and res.status_code == 200:
                 res.encoding = res.apparent_encoding
@@ -705,6 +718,10 @@ class Sites:
         xpath_strs = self.get_grapsite_conf(torrent_url)
         if not xpath_strs:
             return ret_attr
+        cache_key = self.__get_torrent_attr_key(torrent_url)
+        cache_attr = TorrentAttrCache.get(cache_key)
+        if cache_attr:
+            return dict(cache_attr)
         html_text = self.__get_site_page_html(url=torrent_url,
                                               cookie=cookie,
                                               ua=ua,
@@ -737,12 +754,71 @@ class Sites:
                         if m.isdigit():
                             peer_count_digit_str = peer_count_digit_str + m
                     ret_attr["peer_count"] = int(peer_count_digit_str) if len(peer_count_digit_str) > 0 else 0
+            TorrentAttrCache.set(cache_key, dict(ret_attr))
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
-        # 随机休眼后再返回
-        time.sleep(round(random.uniform(1, 5), 1))
         return ret_attr
 
+    def prefetch_torrent_attrs(self, torrent_urls, cookie, ua=None, proxy=False):
+        """
+        并发获取种子详情页面并缓存种子属性，每个站点同时获取的页面数不超过BRUSH_PREFETCH_SITE_WORKERS，
+        之后的check_torrent_attr直接使用缓存
+        :param torrent_urls: 种子详情页面列表
+        :param cookie: 站点的Cookie
+        :param ua: 站点的ua
+        :param proxy: 是否使用代理
+        """
+        torrent_urls = [url for url in dict.fromkeys(torrent_urls or [])
+                        if url
+                        and self.get_grapsite_conf(url)
+                        and not TorrentAttrCache.get(self.__get_torrent_attr_key(url))]
+        if not torrent_urls:
+            return
+
+        start_time = time.time()
+        # 按站点排队，每个站点提交的获取线程数不超过上限，避免单个站点的大量页面占满线程池
+        events = []
+        with self._attr_lock:
+            for url in torrent_urls:
+                event = Event()
+                events.append(event)
+                domain = SiteRateLimiter().get_domain(url)
+                self._attr_queues.setdefault(domain, deque()).append((url, cookie, ua, proxy, event))
+            for domain, queue in self._attr_queues.items():
+                while queue and self._attr_workers.get(domain, 0) < min(BRUSH_PREFETCH_SITE_WORKERS, len(queue)):
+                    self._attr_workers[domain] = self._attr_workers.get(domain, 0) + 1
+                    self._attr_executor.submit(self.__fetch_torrent_attrs, domain)
+        for event in events:
+            event.wait()
+        log.debug(f"【Sites】预取 {len(torrent_urls)} 个种子详情页面，耗时 {round(time.time() - start_time, 1)} 秒")
+
+    def __fetch_torrent_attrs(self, domain):
+        """
+        依次获取一个站点队列中的详情页面，队列为空时退出
+        """
+        while True:
+            with self._attr_lock:
+                queue = self._attr_queues.get(domain)
+                if not queue:
+                    self._attr_workers[domain] -= 1
+                    return
+                url, cookie, ua, proxy, event = queue.popleft()
+            try:
+                self.check_torrent_attr(torrent_url=url, cookie=cookie, ua=ua, proxy=proxy)
+            finally:
+                event.set()
+
+    @staticmethod
+    def __get_torrent_attr_key(torrent_url):
+        """
+        种子属性缓存的键：站点域名及种子ID，详情页面中没有种子ID时使用完整地址
+        """
+        url = urlparse(torrent_url)
+        torrent_id = parse_qs(url.query).get("id")
+        if torrent_id:
+            return f"{url.netloc.lower()}|{torrent_id[0]}"
+        return torrent_url
+
     @staticmethod
     def is_public_site(url):
         """
@@ -203,8 +203,8 @@ class _ISiteUserInfo(metaclass=ABCMeta):
             if fav_link:
                 self._favicon_url = urljoin(self._base_url, fav_link[0])
 
-        res = RequestUtils(cookies=self._site_cookie, session=self._session, timeout=60, headers=self._ua).get_res(
-            url=self._favicon_url)
+        res = RequestUtils(cookies=self._site_cookie, session=self._session, timeout=60, rate_limit=True,
+                           headers=self._ua).get_res(url=self._favicon_url)
         if res:
             self.site_favicon = base64.b64encode(res.content).decode()
 
@@ -233,11 +233,11 @@ class _ISiteUserInfo(metaclass=ABCMeta):
                 req_headers.update(self._addition_headers)
 
         if params:
-            res = RequestUtils(cookies=self._site_cookie, session=self._session, timeout=60,
+            res = RequestUtils(cookies=self._site_cookie, session=self._session, timeout=60, rate_limit=True,
                                headers=req_headers).post_res(
                 url=url, params=params)
         else:
-            res = RequestUtils(cookies=self._site_cookie, session=self._session, timeout=60,
+            res = RequestUtils(cookies=self._site_cookie, session=self._session, timeout=60, rate_limit=True,
                                headers=req_headers).get_res(
                 url=url)
         if res is not None and res.status_code in (200, 500):
@@ -542,7 +542,7 @@ class Subscribe:
         """
         if tmdbid and not str(tmdbid).startswith("DB:"):
             media_info = MetaInfo(title="%s %s".strip() % (name, year))
-            tmdb_info = self.media.get_tmdb_info(mtype=mtype, tmdbid=tmdbid)
+            tmdb_info = self.media.get_tmdb_info(mtype=mtype, tmdbid=tmdbid, cache=cache)
             media_info.set_tmdb_info(tmdb_info)
         else:
             media_info = self.media.get_media_info(title="%s %s" % (name, year), mtype=mtype, strict=True, cache=cache)
@@ -579,6 +579,8 @@ class Subscribe:
             rss_movies = self.get_subscribe_movies(state=state)
         if rss_movies:
             log.info("【Subscribe】共有 %s 个电影订阅需要检索" % len(rss_movies))
+        # 待检索的订阅
+        search_items = []
         for rid, rss_info in rss_movies.items():
             # 跳过模糊匹配的
             if rss_info.get("fuzzy_match"):
@@ -620,7 +622,7 @@ class Subscribe:
                 # 将当前的优先级传入搜索
                 media_info.res_order = self.dbhelper.get_rss_overedition_order(rtype=media_info.type,
                                                                                rssid=rssid)
-            # 开始检索
+            # 加入批量检索
             filter_dict = {
                 "restype": rss_info.get('filter_restype'),
                 "pix": rss_info.get('filter_pix'),
@@ -628,12 +630,20 @@ class Subscribe:
                 "rule": rss_info.get('filter_rule'),
                 "site": rss_info.get("search_sites")
             }
-            search_result, _, _, _ = self.searcher.search_one_media(
+            search_items.append((rssid, over_edition, media_info, no_exists, rss_info.get("search_sites"), filter_dict))
+        if not search_items:
+            return
+        # 所有订阅一起检索，相同站点的相同请求只检索一次
+        media_lists = self.searcher.batch_search_medias(
+            search_items=[(media_info, sites, filter_dict)
+                          for _, _, media_info, _, sites, filter_dict in search_items],
+            in_from=SearchType.RSS)
+        for (rssid, over_edition, media_info, no_exists, _, _), media_list in zip(search_items, media_lists):
+            search_result, _, _, _ = self.searcher.download_search_results(
                 media_info=media_info,
+                media_list=media_list,
                 in_from=SearchType.RSS,
-                no_exists=no_exists,
-                sites=rss_info.get("search_sites"),
-                filters=filter_dict)
+                no_exists=no_exists)
             if search_result:
                 # 洗版
                 if over_edition:
@@ -657,7 +667,8 @@ class Subscribe:
             rss_tvs = self.get_subscribe_tvs(state=state)
         if rss_tvs:
             log.info("【Subscribe】共有 %s 个电视剧订阅需要检索" % len(rss_tvs))
-        rss_no_exists = {}
+        # 待检索的订阅
+        search_items = []
         for rid, rss_info in rss_tvs.items():
             # 跳过模糊匹配的
             if rss_info.get("fuzzy_match"):
@@ -692,7 +703,8 @@ class Subscribe:
             current_ep = rss_info.get("current_ep")
             # 自定义搜索词
             media_info.keyword = keyword
-            # 表中记录的剩余订阅集数
+            # 表中记录的剩余订阅集数，每个订阅使用独立的缺失清单
+            rss_no_exists = {}
             episodes = self.get_subscribe_tv_episodes(rss_info.get("id"))
             if episodes is None:
                 episodes = []
@@ -745,7 +757,7 @@ class Subscribe:
                 media_info.res_order = self.dbhelper.get_rss_overedition_order(rtype=MediaType.TV,
                                                                                rssid=rssid)
 
-            # 开始检索
+            # 加入批量检索
             filter_dict = {
                 "restype": rss_info.get('filter_restype'),
                 "pix": rss_info.get('filter_pix'),
@@ -753,12 +765,21 @@ class Subscribe:
                 "rule": rss_info.get('filter_rule'),
                 "site": rss_info.get("search_sites")
             }
-            search_result, no_exists, _, _ = self.searcher.search_one_media(
+            search_items.append((rssid, over_edition, media_info, rss_no_exists,
+                                 rss_info.get("search_sites"), filter_dict))
+        if not search_items:
+            return
+        # 所有订阅一起检索，相同站点的相同请求只检索一次
+        media_lists = self.searcher.batch_search_medias(
+            search_items=[(media_info, sites, filter_dict)
+                          for _, _, media_info, _, sites, filter_dict in search_items],
+            in_from=SearchType.RSS)
+        for (rssid, over_edition, media_info, rss_no_exists, _, _), media_list in zip(search_items, media_lists):
+            search_result, no_exists, _, _ = self.searcher.download_search_results(
                 media_info=media_info,
+                media_list=media_list,
                 in_from=SearchType.RSS,
-                no_exists=rss_no_exists,
-                sites=rss_info.get("search_sites"),
-                filters=filter_dict)
+                no_exists=rss_no_exists)
             if search_result \
                     or not no_exists \
                     or not no_exists.get(media_info.tmdb_id):
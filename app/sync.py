@@ -11,6 +11,7 @@ from app.conf import ModuleConf
 from app.helper import DbHelper
 from config import RMT_MEDIAEXT, Config
 from app.filetransfer import FileTransfer
+from app.media import LibraryIndex, LibraryMonitorHandler
 from app.utils.commons import singleton
 from app.utils import PathUtils, ExceptionUtils
 from app.utils.types import SyncType, OsType
@@ -313,6 +314,26 @@ class Sync(object):
                 except Exception as e:
                     ExceptionUtils.exception_traceback(e)
                     log.error("%s 启动目录监控失败：%s" % (monpath, str(e)))
+        # 媒体库目录监控，用于更新媒体库索引
+        if self._sync_sys == OsType.WINDOWS:
+            # 轮询方式遍历整个媒体库开销太大，只依赖转移记录和定时校对更新索引
+            return
+        library_index = LibraryIndex()
+        for library_path in library_index.get_library_paths():
+            if not os.path.exists(library_path):
+                continue
+            try:
+                observer = Observer(timeout=10)
+                self._observer.append(observer)
+                observer.schedule(LibraryMonitorHandler(library_path, library_index),
+                                  path=library_path,
+                                  recursive=True)
+                observer.daemon = True
+                observer.start()
+                log.info("%s 的媒体库监控服务启动" % library_path)
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("%s 启动媒体库监控失败：%s" % (library_path, str(e)))
 
     def stop_service(self):
         """
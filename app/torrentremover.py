@@ -128,9 +128,10 @@ class TorrentRemover(object):
                         text_item = f"{name} 来自站点：{site} 大小：{size} GB"
                         log.info(f"【TorrentRemover】暂停种子：{text_item}")
                         text = f"{text}\n{text_item}"
-                        # 暂停种子
+                    # 批量暂停种子
+                    if torrents:
                         self.downloader.stop_torrents(downloader=downloader_type,
-                                                      ids=[torrent.get("id")])
+                                                      ids=[torrent.get("id") for torrent in torrents])
                 elif task.get("action") == 2:
                     text = f"共删除{len(torrents)}个种子"
                     for torrent in torrents:
@@ -140,10 +141,11 @@ class TorrentRemover(object):
                         text_item = f"{name} 来自站点：{site} 大小：{size} GB"
                         log.info(f"【TorrentRemover】删除种子：{text_item}")
                         text = f"{text}\n{text_item}"
-                        # 删除种子
+                    # 批量删除种子
+                    if torrents:
                         self.downloader.delete_torrents(downloader=downloader_type,
                                                         delete_file=False,
-                                                        ids=[torrent.get("id")])
+                                                        ids=[torrent.get("id") for torrent in torrents])
                 elif task.get("action") == 3:
                     text = f"共删除{len(torrents)}个种子（及文件）"
                     for torrent in torrents:
@@ -153,10 +155,11 @@ class TorrentRemover(object):
                         text_item = f"{name} 来自站点：{site} 大小：{size} GB"
                         log.info(f"【TorrentRemover】删除种子及文件：{text_item}")
                         text = f"{text}\n{text_item}"
-                        # 删除种子
+                    # 批量删除种子及文件
+                    if torrents:
                         self.downloader.delete_torrents(downloader=downloader_type,
                                                         delete_file=True,
-                                                        ids=[torrent.get("id")])
+                                                        ids=[torrent.get("id") for torrent in torrents])
                 if torrents and title and text:
                     self.message.send_brushtask_remove_message(title=title, text=text)
             except Exception as e:
@@ -1,6 +1,8 @@
 from .dom_utils import DomUtils
+from .feed_parser import FeedParser, FeedItem
 from .episode_format import EpisodeFormat
 from .http_utils import RequestUtils
+from .rate_limiter import SiteRateLimiter
 from .json_utils import JsonUtils
 from .number_utils import NumberUtils
 from .path_utils import PathUtils
@@ -8,6 +10,7 @@ from .string_utils import StringUtils
 from .system_utils import SystemUtils
 from .tokens import Tokens
 from .torrent import Torrent
-from .cache_manager import cacheman, TokenCache, ConfigLoadCache
+from .torrent_cache import TorrentCache
+from .cache_manager import cacheman, TokenCache, ConfigLoadCache, TorrentAttrCache
 from .exception_utils import ExceptionUtils
 from .rsstitle_utils import RssTitleUtils
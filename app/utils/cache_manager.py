@@ -12,3 +12,6 @@ cacheman = CacheManager(CACHES, cache_class=LRUCache)
 TokenCache = Cache(maxsize=256, ttl=4*3600, timer=time.time, default=None)
 
 ConfigLoadCache = Cache(maxsize=1, ttl=10, timer=time.time, default=None)
+
+# 种子详情页面解析出的促销、HR、做种人数，按站点和种子ID缓存
+TorrentAttrCache = Cache(maxsize=2048, ttl=600, timer=time.time, default=None)
@@ -0,0 +1,109 @@
+from io import BytesIO
+
+from lxml import etree
+
+
+class FeedItem:
+    """
+    RSS/Torznab条目，未出现的标签为None
+    """
+    __slots__ = ("title", "link", "description", "comments", "pubdate", "size",
+                 "enclosure", "enclosure_length", "indexer", "indexer_id", "attrs")
+
+    def __init__(self):
+        self.title = None
+        self.link = None
+        self.description = None
+        self.comments = None
+        self.pubdate = None
+        self.size = None
+        self.enclosure = None
+        self.enclosure_length = None
+        self.indexer = None
+        self.indexer_id = None
+        # torznab:attr属性，name -> value
+        self.attrs = {}
+
+
+class FeedParser:
+    """
+    RSS/Torznab流式解析，逐个条目解析并清理已处理的节点，不构建完整的文档树，
+    取值规则与DomUtils.tag_value一致：同名标签取第一个，标签名按带前缀的名称匹配
+    """
+    # 取文本的标签 -> 字段
+    _text_tags = {
+        "title": "title",
+        "link": "link",
+        "description": "description",
+        "comments": "comments",
+        "pubDate": "pubdate",
+        "size": "size"
+    }
+
+    @classmethod
+    def parse(cls, content):
+        """
+        解析RSS/Torznab报文
+        :param content: 报文，字符串或字节
+        :return: FeedItem迭代器，报文格式错误时返回错误之前的条目后抛出异常
+        """
+        if not content:
+            return
+        if isinstance(content, str):
+            # 字符串已经解码，忽略报文声明的编码
+            content = content.encode("utf-8")
+            encoding = "utf-8"
+        else:
+            encoding = None
+        context = etree.iterparse(BytesIO(content),
+                                  events=("end",),
+                                  tag="{*}item",
+                                  encoding=encoding,
+                                  resolve_entities=False,
+                                  no_network=True,
+                                  huge_tree=True)
+        for _, elem in context:
+            # 与DomUtils.tag_value一致，item按不带前缀的名称匹配
+            if elem.prefix:
+                continue
+            yield cls.__parse_item(elem)
+            # 清理已处理的条目
+            elem.clear(keep_tail=False)
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]
+
+    @classmethod
+    def __parse_item(cls, elem):
+        item = FeedItem()
+        found = set()
+        jackett = None
+        prowlarr = None
+        for child in elem.iterdescendants(tag=etree.Element):
+            tag = child.tag
+            if tag[0] == "{":
+                tag = tag[tag.index("}") + 1:]
+            if child.prefix:
+                if child.prefix == "torznab" and tag == "attr":
+                    item.attrs[child.get("name")] = child.get("value")
+                continue
+            if tag in found:
+                continue
+            found.add(tag)
+            field = cls._text_tags.get(tag)
+            if field:
+                setattr(item, field, child.text)
+            elif tag == "enclosure":
+                item.enclosure = child.get("url") or None
+                item.enclosure_length = child.get("length") or None
+            elif tag == "jackettindexer":
+                jackett = child
+            elif tag == "prowlarrindexer":
+                prowlarr = child
+        # 优先使用jackett的索引器信息
+        for indexer in [prowlarr, jackett]:
+            if indexer is None:
+                continue
+            item.indexer = indexer.text or item.indexer
+            item.indexer_id = indexer.get("id") or item.indexer_id
+        return item
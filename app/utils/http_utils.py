@@ -1,10 +1,80 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
 from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.retry import Retry
+
+from app.utils.rate_limiter import SiteRateLimiter
 from config import Config
 
 urllib3.disable_warnings(InsecureRequestWarning)
 
+# 每个主机保持的最大连接数
+SESSION_POOL_MAXSIZE = 20
+# 建立连接失败时的重试次数
+SESSION_CONNECT_RETRIES = 2
+# 重试间隔因子（秒）
+SESSION_BACKOFF_FACTOR = 0.3
+
+
+class SessionPool:
+    """
+    按（主机，代理）复用的会话，保持长连接，避免每次请求重新握手
+    共用会话不保存响应中的Cookie，请求间互不影响，与直接使用requests.get/post一致
+    """
+    _sessions = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, url, proxies=None):
+        """
+        获取url对应主机的共用会话
+        """
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.netloc, str(proxies) if proxies else "")
+        session = cls._sessions.get(key)
+        if session:
+            return session
+        with cls._lock:
+            session = cls._sessions.get(key)
+            if not session:
+                session = cls.__new_session()
+                cls._sessions[key] = session
+        return session
+
+    @staticmethod
+    def __new_session():
+        session = requests.Session()
+        # 不保存服务端返回的Cookie
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        retries = Retry(total=SESSION_CONNECT_RETRIES,
+                        connect=SESSION_CONNECT_RETRIES,
+                        read=0,
+                        status=0,
+                        redirect=None,
+                        backoff_factor=SESSION_BACKOFF_FACTOR,
+                        raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=SESSION_POOL_MAXSIZE,
+                              max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @classmethod
+    def clear(cls):
+        """
+        关闭所有共用会话
+        """
+        with cls._lock:
+            sessions, cls._sessions = cls._sessions, {}
+        for session in sessions.values():
+            session.close()
+
 
 class RequestUtils:
     _headers = None
@@ -12,6 +82,7 @@ class RequestUtils:
     _proxies = None
     _timeout = 20
     _session = None
+    _rate_limit = False
 
     def __init__(self,
                  headers=None,
@@ -20,7 +91,11 @@ class RequestUtils:
                  session=None,
                  timeout=None,
                  referer=None,
-                 content_type=None):
+                 content_type=None,
+                 rate_limit=False):
+        """
+        :param rate_limit: 是否为访问站点的请求，是则按站点限速，站点熔断时直接返回None
+        """
         if not content_type:
             content_type = "application/x-www-form-urlencoded; charset=UTF-8"
         if headers:
@@ -51,99 +126,98 @@ class RequestUtils:
             self._session = session
         if timeout:
             self._timeout = timeout
+        self._rate_limit = rate_limit
+
+    def __get_session(self, url):
+        """
+        未指定会话时使用按主机复用的共用会话
+        """
+        return self._session or SessionPool.get(url, self._proxies)
+
+    def __acquire(self, url):
+        """
+        站点请求按站点限速，站点熔断时不发起请求
+        """
+        if not self._rate_limit:
+            return True
+        return SiteRateLimiter().acquire(url)
+
+    def __report(self, url, res):
+        """
+        记录站点请求结果，连接失败、超时、限流、网关错误计为失败
+        """
+        if not self._rate_limit:
+            return
+        SiteRateLimiter().report(url, res.status_code if res is not None else None)
 
     def post(self, url, params=None, json=None):
         if json is None:
             json = {}
+        if not self.__acquire(url):
+            return None
         try:
-            if self._session:
-                return self._session.post(url,
-                                          data=params,
-                                          verify=False,
-                                          headers=self._headers,
-                                          proxies=self._proxies,
-                                          timeout=self._timeout,
-                                          json=json)
-            else:
-                return requests.post(url,
-                                     data=params,
-                                     verify=False,
-                                     headers=self._headers,
-                                     proxies=self._proxies,
-                                     timeout=self._timeout,
-                                     json=json)
+            res = self.__get_session(url).post(url,
+                                               data=params,
+                                               verify=False,
+                                               headers=self._headers,
+                                               proxies=self._proxies,
+                                               timeout=self._timeout,
+                                               json=json)
         except requests.exceptions.RequestException:
-            return None
+            res = None
+        self.__report(url, res)
+        return res
 
     def get(self, url, params=None):
+        if not self.__acquire(url):
+            return None
         try:
-            if self._session:
-                r = self._session.get(url,
-                                      verify=False,
-                                      headers=self._headers,
-                                      proxies=self._proxies,
-                                      timeout=self._timeout,
-                                      params=params)
-            else:
-                r = requests.get(url,
-                                 verify=False,
-                                 headers=self._headers,
-                                 proxies=self._proxies,
-                                 timeout=self._timeout,
-                                 params=params)
-            return str(r.content, 'utf-8')
+            r = self.__get_session(url).get(url,
+                                            verify=False,
+                                            headers=self._headers,
+                                            proxies=self._proxies,
+                                            timeout=self._timeout,
+                                            params=params)
         except requests.exceptions.RequestException:
-            return None
+            r = None
+        self.__report(url, r)
+        return str(r.content, 'utf-8') if r is not None else None
 
     def get_res(self, url, params=None, allow_redirects=True):
+        if not self.__acquire(url):
+            return None
         try:
-            if self._session:
-                return self._session.get(url,
-                                         params=params,
-                                         verify=False,
-                                         headers=self._headers,
-                                         proxies=self._proxies,
-                                         cookies=self._cookies,
-                                         timeout=self._timeout,
-                                         allow_redirects=allow_redirects)
-            else:
-                return requests.get(url,
-                                    params=params,
-                                    verify=False,
-                                    headers=self._headers,
-                                    proxies=self._proxies,
-                                    cookies=self._cookies,
-                                    timeout=self._timeout,
-                                    allow_redirects=allow_redirects)
+            res = self.__get_session(url).get(url,
+                                              params=params,
+                                              verify=False,
+                                              headers=self._headers,
+                                              proxies=self._proxies,
+                                              cookies=self._cookies,
+                                              timeout=self._timeout,
+                                              allow_redirects=allow_redirects)
         except requests.exceptions.RequestException:
-            return None
+            res = None
+        self.__report(url, res)
+        return res
 
     def post_res(self, url, params=None, allow_redirects=True, files=None, json=None):
+        if not self.__acquire(url):
+            return None
         try:
-            if self._session:
-                return self._session.post(url,
-                                          data=params,
-                                          verify=False,
-                                          headers=self._headers,
-                                          proxies=self._proxies,
-                                          cookies=self._cookies,
-                                          timeout=self._timeout,
-                                          allow_redirects=allow_redirects,
-                                          files=files,
-                                          json=json)
-            else:
-                return requests.post(url,
-                                     data=params,
-                                     verify=False,
-                                     headers=self._headers,
-                                     proxies=self._proxies,
-                                     cookies=self._cookies,
-                                     timeout=self._timeout,
-                                     allow_redirects=allow_redirects,
-                                     files=files,
-                                     json=json)
+            res = self.__get_session(url).post(url,
+                                               data=params,
+                                               verify=False,
+                                               headers=self._headers,
+                                               proxies=self._proxies,
+                                               cookies=self._cookies,
+                                               timeout=self._timeout,
+                                               allow_redirects=allow_redirects,
+                                               files=files,
+                                               json=json)
         except requests.exceptions.RequestException:
-            return None
+            res = None
+        self.__report(url, res)
+        return res
 
     @staticmethod
     def cookie_parse(cookies_str, array=False):
@@ -0,0 +1,234 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import log
+from app.utils.commons import singleton
+from config import Config, SITE_REQUEST_QPS, SITE_REQUEST_BURST, SITE_REQUEST_MAX_WAIT, \
+    SITE_CIRCUIT_FAILURES, SITE_CIRCUIT_COOLDOWN, SITE_CIRCUIT_MAX_COOLDOWN, SITE_CIRCUIT_FAILURE_CODES
+
+
+class TokenBucket:
+    """
+    令牌桶，按固定速率生成令牌，最多积累burst个，请求时预占令牌并返回需要等待的时间
+    """
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """
+        预占一个令牌
+        :param max_wait: 最长等待时间（秒），需要等待更久时不预占
+        :return: 需要等待的时间（秒），超过最长等待时间时返回None
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            wait = 0 if self._tokens >= 1 else (1 - self._tokens) / self._rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """
+    熔断器，连续失败达到阈值后熔断，冷却时间过后放行一个探测请求（半开），
+    探测成功则恢复，失败则再次熔断并加倍冷却时间
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failures, cooldown, max_cooldown):
+        self._failure_threshold = failures
+        self._base_cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._cooldown = cooldown
+        self._failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        """
+        是否允许发起请求，半开状态下只放行一个探测请求
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            # 冷却时间已过，或探测请求迟迟没有结果时，放行一个探测请求
+            if time.monotonic() - self._opened_at >= self._cooldown:
+                self._state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        """
+        请求成功，恢复正常
+        :return: 是否由熔断状态恢复
+        """
+        with self._lock:
+            recovered = self._state != self.CLOSED
+            self._state = self.CLOSED
+            self._failures = 0
+            self._cooldown = self._base_cooldown
+            return recovered
+
+    def failure(self):
+        """
+        请求失败，连续失败达到阈值或探测失败时熔断
+        :return: 是否本次进入熔断
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self._max_cooldown)
+            elif self._state == self.OPEN or self._failures < self._failure_threshold:
+                return False
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            return True
+
+    def get_retry_time(self):
+        """
+        熔断状态下距离下次探测的剩余时间（秒）
+        """
+        if self._state != self.OPEN:
+            return 0
+        return max(0, round(self._cooldown - (time.monotonic() - self._opened_at)))
+
+
+@singleton
+class SiteRateLimiter(object):
+    """
+    站点请求调度，检索、RSS、刷流、站点数据统计、种子下载等所有访问站点的请求按域名共用：
+    令牌桶控制每个站点的请求速率，熔断器在站点连续失败后暂停访问，避免占用工作线程
+    """
+    _qps = SITE_REQUEST_QPS
+    _burst = SITE_REQUEST_BURST
+    _buckets = {}
+    _breakers = {}
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        laboratory = Config().get_config('laboratory') or {}
+        qps = self.__to_number(laboratory.get("site_request_qps"), SITE_REQUEST_QPS)
+        burst = self.__to_number(laboratory.get("site_request_burst"), SITE_REQUEST_BURST)
+        with self._lock:
+            if (qps, burst) != (self._qps, self._burst):
+                self._buckets = {}
+            self._qps = qps
+            self._burst = max(burst, 1)
+
+    @staticmethod
+    def __to_number(value, default):
+        try:
+            return float(value) if value not in (None, "") else default
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def get_domain(url):
+        """
+        请求地址对应的站点域名
+        """
+        if not url:
+            return ""
+        return urlparse(url).netloc.lower()
+
+    def __get_bucket(self, domain):
+        bucket = self._buckets.get(domain)
+        if bucket:
+            return bucket
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(self._qps, self._burst)
+            return self._buckets[domain]
+
+    def __get_breaker(self, domain):
+        breaker = self._breakers.get(domain)
+        if breaker:
+            return breaker
+        with self._lock:
+            if domain not in self._breakers:
+                self._breakers[domain] = CircuitBreaker(SITE_CIRCUIT_FAILURES,
+                                                        SITE_CIRCUIT_COOLDOWN,
+                                                        SITE_CIRCUIT_MAX_COOLDOWN)
+            return self._breakers[domain]
+
+    def acquire(self, url, max_wait=SITE_REQUEST_MAX_WAIT):
+        """
+        请求站点前调用，站点熔断时立即返回，否则按站点速率等待到可以请求为止
+        :param url: 请求地址
+        :param max_wait: 最长等待时间（秒）
+        :return: 是否可以发起请求
+        """
+        domain = self.get_domain(url)
+        if not domain:
+            return True
+        breaker = self.__get_breaker(domain)
+        if not breaker.allow():
+            log.debug(f"【Sites】{domain} 已熔断，{breaker.get_retry_time()} 秒后重试")
+            return False
+        if self._qps <= 0:
+            return True
+        wait = self.__get_bucket(domain).reserve(max_wait=max_wait)
+        if wait is None:
+            log.warn(f"【Sites】{domain} 请求排队超过 {max_wait} 秒，已跳过")
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def report(self, url, status_code=None):
+        """
+        按响应状态记录请求结果，没有响应（连接失败、超时）及SITE_CIRCUIT_FAILURE_CODES中的状态码计为失败
+        :param url: 请求地址
+        :param status_code: 响应状态码，没有响应时为None
+        """
+        if status_code is None or status_code in SITE_CIRCUIT_FAILURE_CODES:
+            self.failure(url)
+        else:
+            self.success(url)
+
+    def success(self, url):
+        """
+        请求成功
+        """
+        domain = self.get_domain(url)
+        if domain and self.__get_breaker(domain).success():
+            log.info(f"【Sites】{domain} 已恢复访问")
+
+    def failure(self, url):
+        """
+        请求失败（连接失败、超时、限流、网关错误）
+        """
+        domain = self.get_domain(url)
+        if not domain:
+            return
+        breaker = self.__get_breaker(domain)
+        if breaker.failure():
+            log.warn(f"【Sites】{domain} 连续请求失败，暂停访问 {breaker.get_retry_time()} 秒")
+
+    def get_status(self):
+        """
+        返回熔断中的站点及剩余时间
+        """
+        return {domain: breaker.get_retry_time()
+                for domain, breaker in self._breakers.items()
+                if breaker.state != CircuitBreaker.CLOSED}
@@ -6,6 +6,7 @@ from urllib.parse import quote, unquote
 from bencode import bdecode
 
 from app.utils.http_utils import RequestUtils
+from app.utils.torrent_cache import TorrentCache
 from config import Config
 
 # Trackers列表
@@ -56,6 +57,12 @@ class Torrent:
         if url.startswith("magnet:"):
             return None, url, "", [], f"{url} 为磁力链接"
         try:
+            # 已缓存的种子不再下载和解析
+            cache_info = TorrentCache().get(url)
+            if cache_info and cache_info.get("path"):
+                with open(cache_info.get("path"), 'rb') as f:
+                    content = f.read()
+                return cache_info.get("path"), content, cache_info.get("folder"), cache_info.get("files"), ""
             # 下载保存种子文件
             file_path, content, errmsg = self.save_torrent_file(url=url,
                                                                 cookie=cookie,
@@ -65,7 +72,11 @@ class Torrent:
             if not file_path:
                 return None, content, "", [], errmsg
             # 解析种子文件
-            files_folder, files, retmsg = self.get_torrent_files(file_path)
+            cache_info = TorrentCache().get(url)
+            if cache_info:
+                files_folder, files, retmsg = cache_info.get("folder"), cache_info.get("files"), ""
+            else:
+                files_folder, files, retmsg = self.get_torrent_files(file_path)
             # 种子文件路径、种子内容、种子文件列表主目录、种子文件列表、错误信息
             return file_path, content, files_folder, files, retmsg
 
@@ -74,14 +85,16 @@ class Torrent:
 
     def save_torrent_file(self, url, cookie=None, ua=None, referer=None, proxy=False):
         """
-        把种子下载到本地
+        把种子下载到本地，种子按内容缓存，同一个种子只保存一份
         :return: 种子保存路径，错误信息
         """
+        origin_url = url
         req = RequestUtils(
             headers=ua,
             cookies=cookie,
             referer=referer,
-            proxies=Config().get_proxies() if proxy else None
+            proxies=Config().get_proxies() if proxy else None,
+            rate_limit=True
         ).get_res(url=url, allow_redirects=False)
         while req and req.status_code in [301, 302]:
             url = req.headers['Location']
@@ -91,7 +104,8 @@ class Torrent:
                 headers=ua,
                 cookies=cookie,
                 referer=referer,
-                proxies=Config().get_proxies() if proxy else None
+                proxies=Config().get_proxies() if proxy else None,
+                rate_limit=True
             ).get_res(url=url, allow_redirects=False)
         if req and req.status_code == 200:
             if not req.content:
@@ -101,19 +115,22 @@ class Torrent:
                 return None, req.text, "磁力链接"
             else:
                 try:
-                    bdecode(req.content)
+                    torrent = bdecode(req.content)
                 except Exception as err:
                     print(str(err))
                     return None, None, "种子数据有误，请确认链接是否正确，如为PT站点则需手工在站点下载一次种子"
-            # 读取种子文件名
-            file_name = self.__get_url_torrent_filename(req, url)
-            # 种子文件路径
-            file_path = os.path.join(self._torrent_temp_path, file_name)
             # 种子内容
             file_content = req.content
-            # 写入磁盘
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            # 写入缓存
+            file_path = TorrentCache().put(url=origin_url, content=file_content, torrent=torrent)
+            if not file_path:
+                # 读取种子文件名
+                file_name = self.__get_url_torrent_filename(req, url)
+                # 种子文件路径
+                file_path = os.path.join(self._torrent_temp_path, file_name)
+                # 写入磁盘
+                with open(file_path, 'wb') as f:
+                    f.write(file_content)
         elif req is None:
             return None, None, "无法打开链接：%s" % url
         else:
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from threading import RLock
+
+from bencode import bdecode, bencode
+
+from app.utils.commons import singleton
+from app.utils.exception_utils import ExceptionUtils
+from config import Config, TORRENT_CACHE_MAX_SIZE, TORRENT_CACHE_EXPIRE
+
+lock = RLock()
+
+
+@singleton
+class TorrentCache(object):
+    """
+    种子缓存，按种子内容寻址：下载链接 -> 种子Hash，种子Hash -> 名称、文件清单、大小，
+    映射和摘要持久化在配置目录下的torrent.db，种子文件按Hash保存在临时目录的torrents目录下，
+    总大小超过TORRENT_CACHE_MAX_SIZE时按最近访问时间淘汰种子文件，摘要超过TORRENT_CACHE_EXPIRE未访问时清除
+    """
+    _db = None
+    _db_path = None
+    _cache_path = None
+    # 缓存的种子文件总大小
+    _cache_size = 0
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        db_path = os.path.join(Config().get_config_path(), 'torrent.db')
+        cache_path = os.path.join(Config().get_temp_path(), 'torrents')
+        if self._db and db_path == self._db_path:
+            return
+        with lock:
+            if self._db:
+                self._db.close()
+            self._db_path = db_path
+            self._cache_path = cache_path
+            if not os.path.exists(cache_path):
+                os.makedirs(cache_path)
+            self._db = self.__open_db(db_path)
+            self.__purge()
+
+    @staticmethod
+    def __open_db(path):
+        """
+        打开缓存数据库，不存在时创建
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS TORRENT_URLS ("
+                     "URL TEXT PRIMARY KEY, "
+                     "HASH TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS TORRENT_INFOS ("
+                     "HASH TEXT PRIMARY KEY, "
+                     "NAME TEXT, "
+                     "FOLDER TEXT, "
+                     "FILES TEXT, "
+                     "SIZE INTEGER, "
+                     "FILE_SIZE INTEGER, "
+                     "ACCESS_TIME INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_TORRENT_URLS_HASH ON TORRENT_URLS (HASH)")
+        return conn
+
+    def __get_file_path(self, torrent_hash):
+        return os.path.join(self._cache_path, f"{torrent_hash}.torrent")
+
+    def __purge(self):
+        """
+        清除过期的摘要和已不存在的种子文件记录，并统计缓存的种子文件总大小
+        """
+        try:
+            expire_time = int(time.time()) - TORRENT_CACHE_EXPIRE
+            for torrent_hash, in self._db.execute("SELECT HASH FROM TORRENT_INFOS WHERE ACCESS_TIME < ?",
+                                                  (expire_time,)).fetchall():
+                self.__remove_file(torrent_hash)
+            self._db.execute("DELETE FROM TORRENT_INFOS WHERE ACCESS_TIME < ?", (expire_time,))
+            self._db.execute("DELETE FROM TORRENT_URLS WHERE HASH NOT IN (SELECT HASH FROM TORRENT_INFOS)")
+            self._cache_size = 0
+            for torrent_hash, file_size in self._db.execute(
+                    "SELECT HASH, FILE_SIZE FROM TORRENT_INFOS WHERE FILE_SIZE > 0").fetchall():
+                if os.path.exists(self.__get_file_path(torrent_hash)):
+                    self._cache_size += file_size
+                else:
+                    self._db.execute("UPDATE TORRENT_INFOS SET FILE_SIZE = 0 WHERE HASH = ?", (torrent_hash,))
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def __remove_file(self, torrent_hash):
+        file_path = self.__get_file_path(torrent_hash)
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def __evict(self):
+        """
+        种子文件总大小超过上限时，按最近访问时间淘汰种子文件，保留摘要
+        """
+        while self._cache_size > TORRENT_CACHE_MAX_SIZE:
+            row = self._db.execute("SELECT HASH, FILE_SIZE FROM TORRENT_INFOS WHERE FILE_SIZE > 0 "
+                                   "ORDER BY ACCESS_TIME LIMIT 1").fetchone()
+            if not row:
+                self._cache_size = 0
+                break
+            torrent_hash, file_size = row
+            self.__remove_file(torrent_hash)
+            self._db.execute("UPDATE TORRENT_INFOS SET FILE_SIZE = 0 WHERE HASH = ?", (torrent_hash,))
+            self._cache_size -= file_size
+
+    @staticmethod
+    def parse_torrent(torrent):
+        """
+        解析种子内容
+        :param torrent: bdecode后的种子
+        :return: 种子Hash、名称、种子文件列表主目录、种子文件列表、总大小
+        """
+        info = torrent.get("info") or {}
+        torrent_hash = hashlib.sha1(bencode(info)).hexdigest()
+        name = info.get("name") or ""
+        file_folder = ""
+        file_names = []
+        files = info.get("files") or []
+        if files:
+            for item in files:
+                if item.get("path"):
+                    file_names.append(item["path"][0])
+            file_folder = name
+            size = sum([item.get("length") or 0 for item in files])
+        else:
+            file_names.append(name)
+            size = info.get("length") or 0
+        return torrent_hash, name, file_folder, file_names, size
+
+    def get(self, url):
+        """
+        查询下载链接对应的种子缓存
+        :param url: 种子下载链接
+        :return: {hash, name, folder, files, size, path}，未缓存时返回None，种子文件已淘汰时path为None
+        """
+        if not url:
+            return None
+        with lock:
+            try:
+                row = self._db.execute("SELECT B.HASH, B.NAME, B.FOLDER, B.FILES, B.SIZE, B.FILE_SIZE "
+                                       "FROM TORRENT_URLS A, TORRENT_INFOS B "
+                                       "WHERE A.HASH = B.HASH AND A.URL = ?", (url,)).fetchone()
+                if not row:
+                    return None
+                torrent_hash, name, folder, files, size, file_size = row
+                self._db.execute("UPDATE TORRENT_INFOS SET ACCESS_TIME = ? WHERE HASH = ?",
+                                 (int(time.time()), torrent_hash))
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                return None
+        file_path = self.__get_file_path(torrent_hash)
+        return {
+            "hash": torrent_hash,
+            "name": name,
+            "folder": folder,
+            "files": json.loads(files),
+            "size": size,
+            "path": file_path if file_size and os.path.exists(file_path) else None
+        }
+
+    def put(self, url, content, torrent=None):
+        """
+        缓存下载链接对应的种子
+        :param url: 种子下载链接
+        :param content: 种子内容
+        :param torrent: bdecode后的种子，为空时解析content
+        :return: 缓存的种子文件路径，出错时返回None
+        """
+        if not url or not content:
+            return None
+        try:
+            if torrent is None:
+                torrent = bdecode(content)
+            torrent_hash, name, folder, files, size = self.parse_torrent(torrent)
+            file_path = self.__get_file_path(torrent_hash)
+            with lock:
+                row = self._db.execute("SELECT FILE_SIZE FROM TORRENT_INFOS WHERE HASH = ?",
+                                       (torrent_hash,)).fetchone()
+                if not row or not row[0] or not os.path.exists(file_path):
+                    with open(file_path, 'wb') as f:
+                        f.write(content)
+                    self._cache_size += len(content) - (row[0] if row and row[0] else 0)
+                self._db.execute("INSERT OR REPLACE INTO TORRENT_INFOS "
+                                 "(HASH, NAME, FOLDER, FILES, SIZE, FILE_SIZE, ACCESS_TIME) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (torrent_hash, name, folder, json.dumps(files, ensure_ascii=False),
+                                  size, len(content), int(time.time())))
+                self._db.execute("INSERT OR REPLACE INTO TORRENT_URLS (URL, HASH) VALUES (?, ?)",
+                                 (url, torrent_hash))
+                self.__evict()
+            return file_path if os.path.exists(file_path) else None
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return None
@@ -31,14 +31,103 @@ METAINFO_SAVE_INTERVAL = 600
 SYNC_TRANSFER_INTERVAL = 60
 # RSS队列中处理时间间隔
 RSS_CHECK_INTERVAL = 300
+# RSS订阅同时处理的站点数
+RSS_SITE_MAX_WORKERS = 8
+# RSS增量获取状态的有效期（秒），过期后重新处理RSS中的全部条目
+RSS_FEED_STATE_EXPIRE = 24 * 3600
+# 已不在RSS中的已处理条目，按发布时间保留最新水位前多长时间（秒）内的
+RSS_SEEN_RETENTION = 7 * 24 * 3600
+# 缓存的种子文件总大小上限，超过时按最近访问时间淘汰
+TORRENT_CACHE_MAX_SIZE = 200 * 1024 * 1024
+# 种子摘要缓存超过多长时间（秒）未访问时清除
+TORRENT_CACHE_EXPIRE = 30 * 24 * 3600
+# 检索结果按检索会话保存的有效期（秒），过期的会话结果在下次写入检索结果时清除
+SEARCH_RESULT_EXPIRE = 24 * 3600
 # 站点流量数据刷新时间间隔（小时）
 REFRESH_PT_DATA_INTERVAL = 6
 # 刷新订阅TMDB数据的时间间隔（小时）
 RSS_REFRESH_TMDB_INTERVAL = 6
+# qBittorrent种子状态快照的有效期（秒），有效期内的重复查询不再请求下载器
+QB_SYNC_INTERVAL = 3
+# 刷流已处理种子的记录数上限及有效期（秒）
+BRUSH_TORRENTS_CACHE_SIZE = 10000
+BRUSH_TORRENTS_CACHE_EXPIRE = 24 * 3600
+# 刷流预取种子详情页面的最大线程数，及每个站点同时获取的详情页面数
+BRUSH_PREFETCH_MAX_WORKERS = 10
+BRUSH_PREFETCH_SITE_WORKERS = 3
 # 刷流删除的检查时间间隔
 BRUSH_REMOVE_TORRENTS_INTERVAL = 300
 # 定时清除未识别的缓存时间间隔（小时）
 META_DELETE_UNKNOWN_INTERVAL = 12
+# 媒体库索引全量校对的时间间隔（小时）
+LIBRARY_INDEX_RECONCILE_INTERVAL = 6
+# 索引器检索共用的最大线程数
+INDEXER_SEARCH_MAX_WORKERS = 30
+# 内置索引器爬虫共用的最大线程数
+INDEXER_SPIDER_MAX_WORKERS = 20
+# 单次检索等待站点返回的最长时间（秒），超时未返回的站点结果将被丢弃
+INDEXER_SEARCH_TIMEOUT = 45
+# 批量检索使用的最大线程数，与交互检索的线程池分开，避免订阅批量检索占满线程导致用户检索超时
+INDEXER_BATCH_MAX_WORKERS = 8
+# 批量检索时每个站点同时进行的请求数
+INDEXER_BATCH_SITE_WORKERS = 2
+# 批量检索时支持多关键字检索的站点单次请求合并的关键字数
+INDEXER_BATCH_KEYWORDS = 5
+# 站点检索结果每页的条数，合并关键字的请求返回结果数达到该值或检索结果条数设置时视为结果被截断，拆分为单关键字请求重新检索，
+# 站点批量检索配置中的page_size优先
+INDEXER_BATCH_PAGE_SIZE = 50
+# 批量检索等待所有站点请求完成的最长时间（秒），超时后未开始的请求不再执行
+INDEXER_BATCH_SEARCH_TIMEOUT = 600
+# 访问站点的默认速率（每秒请求数）及允许的突发请求数
+SITE_REQUEST_QPS = 1
+SITE_REQUEST_BURST = 3
+# 访问站点排队等待的最长时间（秒）
+SITE_REQUEST_MAX_WAIT = 120
+# 站点连续失败多少次后熔断
+SITE_CIRCUIT_FAILURES = 5
+# 站点熔断后首次探测的冷却时间（秒），探测失败时加倍，最长不超过最大冷却时间
+SITE_CIRCUIT_COOLDOWN = 300
+SITE_CIRCUIT_MAX_COOLDOWN = 3600
+# 计为站点请求失败的状态码，其它服务端错误（如部分站点用500返回正常页面）不触发熔断
+SITE_CIRCUIT_FAILURE_CODES = [429, 502, 503, 504]
+# 媒体库增量同步的时间间隔（分钟）
+MEDIASYNC_DELTA_INTERVAL = 30
+# 媒体库增量同步时向前多取的时间（分钟），避免服务器时间差导致遗漏
+MEDIASYNC_DELTA_OVERLAP = 10
+# 媒体库同步时每页获取的项目数
+MEDIASYNC_PAGE_SIZE = 200
+# 媒体库同步时每批写入数据库的项目数
+MEDIASYNC_BATCH_SIZE = 500
+# 数据库存储配置，连接建立时设置对应的PRAGMA
+DB_STORAGE_PROFILES = {
+    # 兼容：传统回滚日志，适用于不支持WAL的网络文件系统
+    "compatible": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 30000
+    },
+    # 均衡：WAL模式，读写互不阻塞
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 67108864,
+        "busy_timeout": 30000
+    },
+    # 性能：更大的缓存和内存映射，适用于内存充足的设备
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000
+    }
+}
+# 数据库连接池常驻连接数
+DB_POOL_SIZE = 20
+# 数据库连接池最多额外创建的连接数，用完即关闭
+DB_MAX_OVERFLOW = 30
 # 定时刷新壁纸的间隔（小时）
 REFRESH_WALLPAPER_INTERVAL = 1
 # fanart的api，用于拉取封面图片
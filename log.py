@@ -1,18 +1,70 @@
+import atexit
+import itertools
 import logging
 import os
-import re
+import queue
 import threading
-import time
 from collections import deque
-from html import escape
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 from config import Config
 
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
 lock = threading.Lock()
+# WEB实时日志，只由日志写入线程追加，结构：序号、时间戳、级别、来源、内容
 LOG_QUEUE = deque(maxlen=200)
-LOG_INDEX = 0
+# WEB实时日志级别，由低到高
+LOG_LEVELS = ["INFO", "WARN", "ERROR"]
+
+
+class _LogQueueHandler(QueueHandler):
+    """
+    调用方只将日志放入队列，格式化和输出都由写入线程完成
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class _LogListener(QueueListener):
+    """
+    日志写入线程，按模块将日志分发到各自的文件/终端/日志服务器，并追加到WEB实时日志
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        # 模块 -> 日志处理器
+        self.module_handlers = {}
+        self.__seq = itertools.count(1)
+
+    def handle(self, record):
+        if getattr(record, "weblog", False):
+            self.__append_log_queue(record)
+        for handler in self.module_handlers.get(record.name) or []:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def __append_log_queue(self, record):
+        text = str(record.msg)
+        source = "System"
+        if text.startswith("【"):
+            pos = text.find("】")
+            if pos > 0:
+                source = text[1:pos]
+                text = text.replace(f"【{source}】", "")
+        LOG_QUEUE.append({
+            "id": next(self.__seq),
+            "time": record.created,
+            "level": "WARN" if record.levelno == logging.WARNING else record.levelname,
+            "source": source,
+            "text": text})
+
+
+_log_queue = queue.SimpleQueue()
+_listener = _LogListener(_log_queue)
+_listener.start()
+# 退出时输出队列中剩余的日志
+atexit.register(_listener.stop)
 
 
 class Logger:
@@ -32,6 +84,7 @@ class Logger:
         logtype = self.__config.get_config('app').get('logtype') or "console"
         loglevel = self.__config.get_config('app').get('loglevel') or "info"
         self.logger.setLevel(level=self.__loglevels.get(loglevel))
+        handlers = []
         if logtype == "server":
             logserver = self.__config.get_config('app').get('logserver', '').split(':')
             if logserver:
@@ -43,7 +96,7 @@ class Logger:
                 log_server_handler = logging.handlers.SysLogHandler((logip, logport),
                                                                     logging.handlers.SysLogHandler.LOG_USER)
                 log_server_handler.setFormatter(logging.Formatter('%(filename)s: %(message)s'))
-                self.logger.addHandler(log_server_handler)
+                handlers.append(log_server_handler)
         elif logtype == "file":
             # 记录日志到文件
             logpath = os.environ.get('NASTOOL_LOG') or self.__config.get_config('app').get('logpath') or ""
@@ -55,11 +108,14 @@ class Logger:
                                                        backupCount=3,
                                                        encoding='utf-8')
                 log_file_handler.setFormatter(logging.Formatter('%(asctime)s\t%(levelname)s: %(message)s'))
-                self.logger.addHandler(log_file_handler)
+                handlers.append(log_file_handler)
         # 记录日志到终端
         log_console_handler = logging.StreamHandler()
         log_console_handler.setFormatter(logging.Formatter('%(asctime)s\t%(levelname)s: %(message)s'))
-        self.logger.addHandler(log_console_handler)
+        handlers.append(log_console_handler)
+        # 日志处理器交给写入线程，当前模块只放入队列
+        _listener.module_handlers[module] = handlers
+        self.logger.addHandler(_LogQueueHandler(_log_queue))
 
     @staticmethod
     def get_instance(module):
@@ -72,21 +128,43 @@ class Logger:
         return Logger.__instance.get(module)
 
 
-def __append_log_queue(level, text):
-    global LOG_INDEX, LOG_QUEUE
-    with lock:
-        text = escape(text)
-        if text.startswith("【"):
-            source = re.findall(r"(?<=【).*?(?=】)", text)[0]
-            text = text.replace(f"【{source}】", "")
-        else:
-            source = "System"
-        LOG_QUEUE.append({
-            "time": time.strftime('%H:%M:%S', time.localtime(time.time())),
-            "level": level,
-            "source": source,
-            "text": text})
-        LOG_INDEX += 1
+def get_logs(source=None, level=None, last_id=0):
+    """
+    查询WEB实时日志，不加锁，复制当前的日志后筛选
+    :param source: 来源
+    :param level: 最低级别，INFO/WARN/ERROR
+    :param last_id: 只返回序号大于该值的日志
+    :return: 日志列表，按时间先后排序
+    """
+    logs = list(LOG_QUEUE)
+    if last_id:
+        logs = [message for message in logs if message.get("id") > last_id]
+    if source:
+        logs = [message for message in logs if message.get("source") == source]
+    if level in LOG_LEVELS:
+        levels = LOG_LEVELS[LOG_LEVELS.index(level):]
+        logs = [message for message in logs if message.get("level") in levels]
+    return logs
+
+
+def __put_web_log(level, text):
+    """
+    只显示在WEB实时日志中，不输出
+    """
+    _log_queue.put(logging.makeLogRecord({"name": "",
+                                          "msg": text,
+                                          "levelno": level,
+                                          "levelname": logging.getLevelName(level),
+                                          "weblog": True}))
+
+
+def __log(level, text, module):
+    logger = Logger.get_instance(module).logger
+    if logger.isEnabledFor(level):
+        logger.log(level, text, extra={"weblog": True})
+    else:
+        # 低于设置的日志级别时仍显示在WEB实时日志中
+        __put_web_log(level, text)
 
 
 def debug(text, module=None):
@@ -94,20 +172,17 @@ def debug(text, module=None):
 
 
 def info(text, module=None):
-    __append_log_queue("INFO", text)
-    return Logger.get_instance(module).logger.info(text)
+    return __log(logging.INFO, text, module)
 
 
 def error(text, module=None):
-    __append_log_queue("ERROR", text)
-    return Logger.get_instance(module).logger.error(text)
+    return __log(logging.ERROR, text, module)
 
 
 def warn(text, module=None):
-    __append_log_queue("WARN", text)
-    return Logger.get_instance(module).logger.warning(text)
+    return __log(logging.WARNING, text, module)
 
 
 def console(text):
-    __append_log_queue("INFO", text)
+    __put_web_log(logging.INFO, text)
     print(text)
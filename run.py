@@ -36,7 +36,7 @@ import log
 from web.main import App
 from app.utils import SystemUtils, ConfigLoadCache
 from app.utils.commons import INSTANCES
-from app.db import init_db, update_db, init_data
+from app.db import init_db, update_db, init_data, benchmark_db
 from app.helper import IndexerHelper, DisplayHelper, ChromeHelper
 from app.brushtask import BrushTask
 from app.rsschecker import RssChecker
@@ -100,6 +100,8 @@ def init_system():
     update_db()
     # 数据初始化
     init_data()
+    # 数据库性能测试
+    benchmark_db()
     # 升级配置文件
     update_config()
     # 检查配置文件
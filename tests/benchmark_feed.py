@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+RSS/Torznab报文解析性能测试，使用tests/cases/feeds中录制的报文，将条目复制到指定数量，
+对比minidom整树解析与流式解析的结果、耗时和内存峰值
+运行：python -m tests.benchmark_feed [条目数量]
+"""
+import os
+import re
+import sys
+import time
+import tracemalloc
+import xml.dom.minidom
+
+from app.indexer.client._base import _IIndexClient
+from app.rss import Rss
+from app.utils import DomUtils, StringUtils
+
+FEEDS_PATH = os.path.join(os.path.dirname(__file__), "cases", "feeds")
+
+
+def load_feed(name, count):
+    """
+    读取录制的报文，循环复制其中的条目直到达到指定数量，复制的条目标题和链接加上序号
+    """
+    with open(os.path.join(FEEDS_PATH, name), "r", encoding="utf-8") as f:
+        content = f.read()
+    items = re.findall(r"\s*<item>.*?</item>", content, re.S)
+    copies = []
+    for i in range(count):
+        item = re.sub(r"(]]>)?</title>", rf" {i}\1</title>", items[i % len(items)], count=1)
+        copies.append(item.replace("&amp;", f"&amp;n={i}&amp;", 1))
+    start = content.index(items[0])
+    end = content.index(items[-1]) + len(items[-1])
+    return content[:start] + "".join(copies) + content[end:]
+
+
+def legacy_parse_rss(content):
+    """
+    minidom整树解析RSS，与流式解析前Rss.parse_rssxml的逻辑一致，作为对比基准
+    """
+    ret_array = []
+    dom_tree = xml.dom.minidom.parseString(content)
+    for item in dom_tree.documentElement.getElementsByTagName("item"):
+        title = DomUtils.tag_value(item, "title", default="")
+        if not title:
+            continue
+        description = DomUtils.tag_value(item, "description", default="")
+        link = DomUtils.tag_value(item, "link", default="")
+        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+        if not enclosure and not link:
+            continue
+        if not enclosure and link:
+            enclosure = link
+            link = None
+        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
+        size = int(size) if size and str(size).isdigit() else 0
+        pubdate = DomUtils.tag_value(item, "pubDate", default="")
+        if pubdate:
+            pubdate = StringUtils.get_time_stamp(pubdate)
+        ret_array.append({'title': title,
+                          'enclosure': enclosure,
+                          'size': size,
+                          'description': description,
+                          'link': link,
+                          'pubdate': pubdate})
+    return ret_array
+
+
+def legacy_parse_torznab(content):
+    """
+    minidom整树解析Torznab，与流式解析前_IIndexClient.__parse_torznabxml的逻辑一致，作为对比基准
+    """
+    torrents = []
+    dom_tree = xml.dom.minidom.parseString(content)
+    for item in dom_tree.documentElement.getElementsByTagName("item"):
+        indexer_id = DomUtils.tag_value(item, "jackettindexer", "id",
+                                        default=DomUtils.tag_value(item, "prowlarrindexer", "id", ""))
+        indexer = DomUtils.tag_value(item, "jackettindexer",
+                                     default=DomUtils.tag_value(item, "prowlarrindexer", default=""))
+        title = DomUtils.tag_value(item, "title", default="")
+        if not title:
+            continue
+        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+        if not enclosure:
+            continue
+        description = DomUtils.tag_value(item, "description", default="")
+        size = DomUtils.tag_value(item, "size", default=0)
+        page_url = DomUtils.tag_value(item, "comments", default="")
+        seeders, peers, freeleech = 0, 0, False
+        downloadvolumefactor, uploadvolumefactor, imdbid = 1.0, 1.0, ""
+        for torznab_attr in item.getElementsByTagName("torznab:attr"):
+            name = torznab_attr.getAttribute('name')
+            value = torznab_attr.getAttribute('value')
+            if name == "seeders":
+                seeders = value
+            if name == "peers":
+                peers = value
+            if name == "downloadvolumefactor":
+                downloadvolumefactor = value
+                if float(downloadvolumefactor) == 0:
+                    freeleech = True
+            if name == "uploadvolumefactor":
+                uploadvolumefactor = value
+            if name == "imdbid":
+                imdbid = value
+        torrents.append({'indexer_id': indexer_id,
+                         'indexer': indexer,
+                         'title': title,
+                         'enclosure': enclosure,
+                         'description': description,
+                         'size': size,
+                         'seeders': seeders,
+                         'peers': peers,
+                         'freeleech': freeleech,
+                         'downloadvolumefactor': downloadvolumefactor,
+                         'uploadvolumefactor': uploadvolumefactor,
+                         'page_url': page_url,
+                         'imdbid': imdbid})
+    return torrents
+
+
+def measure(func, content, rounds):
+    """
+    返回平均耗时（毫秒）和内存峰值（MB）
+    """
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        func(content)
+    cost = (time.perf_counter() - start_time) / rounds * 1000
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cost, peak / 1024 / 1024
+
+
+def main(count=1000, rounds=5):
+    cases = [
+        ("rss.xml", legacy_parse_rss, Rss.parse_rss_content),
+        ("torznab.xml", legacy_parse_torznab, _IIndexClient.parse_torznab_content)
+    ]
+    mismatches = 0
+    for name, legacy_func, stream_func in cases:
+        content = load_feed(name, count)
+        legacy_result = legacy_func(content)
+        stream_result = stream_func(content)
+        if legacy_result != stream_result:
+            mismatches += 1
+            print(f"{name} 解析结果不一致")
+        legacy_cost, legacy_peak = measure(legacy_func, content, rounds)
+        stream_cost, stream_peak = measure(stream_func, content, rounds)
+        print(f"{name}：条目数量：{len(stream_result)}，报文大小：{len(content) / 1024:.0f} KB")
+        print(f"  minidom解析：{legacy_cost:.1f} ms，内存峰值 {legacy_peak:.1f} MB")
+        print(f"  流式解析：{stream_cost:.1f} ms，内存峰值 {stream_peak:.1f} MB")
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000) else 0)
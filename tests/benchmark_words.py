@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+自定义识别词处理性能测试，使用tests/cases/meta_cases.py中的标题，
+对比逐个识别词处理与预编译处理的结果和耗时
+运行：python -m tests.benchmark_words [识别词数量]
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+from app.helper import WordsHelper
+from tests.cases.meta_cases import meta_cases
+
+
+def make_words(count):
+    """
+    生成测试用识别词，按比例分配各类型，并包含少量能命中测试标题的识别词
+    """
+    def word(**kwargs):
+        info = dict(REPLACED=None, REPLACE=None, FRONT=None, BACK=None, OFFSET=None)
+        info.update(kwargs)
+        return SimpleNamespace(**info)
+
+    ignored = [word(REPLACED=r"\[招募%d[^\]]*\]" % i) for i in range(count // 5)]
+    ignored += [word(REPLACED="招募翻译校对")]
+    ignored_noregex = [word(REPLACED="屏蔽词%d" % i) for i in range(count * 2 // 5)]
+    ignored_noregex += [word(REPLACED="[GB]")]
+    replaced = [word(REPLACED=r"替换%d(\d+)" % i, REPLACE=r"\1") for i in range(count // 10)]
+    replaced += [word(REPLACED=r"Shijou\s+Shugi", REPLACE="Shijou-Shugi")]
+    replaced_noregex = [word(REPLACED="旧名称%d" % i, REPLACE="新名称%d" % i) for i in range(count // 5)]
+    replaced_noregex += [word(REPLACED="HEVC", REPLACE="x265")]
+    replaced_offset = [word(REPLACED="剧集%d" % i, REPLACE="剧集", FRONT=r"\[", BACK=r"\]", OFFSET="EP+1")
+                       for i in range(count // 20)]
+    offset = [word(FRONT="偏移前%d" % i, BACK="偏移后%d" % i, OFFSET="EP-1") for i in range(count // 20)]
+    offset += [word(FRONT=r"Kyoushitsu e S2\]\[", BACK=r"\]\[1080p", OFFSET="EP+12")]
+    return ignored, ignored_noregex, replaced, replaced_noregex, replaced_offset, offset
+
+
+def legacy_process(words, title):
+    """
+    逐个识别词处理，与预编译前WordsHelper.process的逻辑一致，作为对比基准
+    """
+    helper = WordsHelper()
+    ignored, ignored_noregex, replaced, replaced_noregex, replaced_offset, offset = words
+    msg, used_ignored, used_replaced, used_offset = [], [], [], []
+    for info in ignored:
+        title, err, flag = helper.replace_regex(info.REPLACED, "", title)
+        if flag:
+            used_ignored.append(info.REPLACED)
+        elif err:
+            msg.append(err)
+    for info in ignored_noregex:
+        title, err, flag = helper.replace_noregex(info.REPLACED, "", title)
+        if flag:
+            used_ignored.append(info.REPLACED)
+        elif err:
+            msg.append(err)
+    for info in replaced:
+        title, err, flag = helper.replace_regex(info.REPLACED, info.REPLACE, title)
+        if flag:
+            used_replaced.append(f"{info.REPLACED}@{info.REPLACE}")
+        elif err:
+            msg.append(err)
+    for info in replaced_noregex:
+        title, err, flag = helper.replace_noregex(info.REPLACED, info.REPLACE, title)
+        if flag:
+            used_replaced.append(f"{info.REPLACED}@{info.REPLACE}")
+        elif err:
+            msg.append(err)
+    for info in replaced_offset:
+        title_replace, err, flag = helper.replace_regex(info.REPLACED, info.REPLACE, title)
+        if flag:
+            title_offset, err, flag = helper.episode_offset(info.FRONT, info.BACK, info.OFFSET, title_replace)
+            if flag:
+                used_replaced.append(f"{info.REPLACED}@{info.REPLACE}")
+                used_offset.append(f"{info.FRONT}@{info.BACK}@{info.OFFSET}")
+                title = title_offset
+            elif err:
+                msg.append(err)
+        elif err:
+            msg.append(err)
+    for info in offset:
+        title, err, flag = helper.episode_offset(info.FRONT, info.BACK, info.OFFSET, title)
+        if flag:
+            used_offset.append(f"{info.FRONT}@{info.BACK}@{info.OFFSET}")
+        elif err:
+            msg.append(err)
+    return title, msg, {"ignored": used_ignored, "replaced": used_replaced, "offset": used_offset}
+
+
+def timeit(func, titles, rounds):
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        for title in titles:
+            func(title)
+    return (time.perf_counter() - start_time) / rounds / len(titles) * 1e6
+
+
+def main(count=500, rounds=5):
+    words = make_words(count)
+    helper = WordsHelper()
+    (helper.ignored_words_info,
+     helper.ignored_words_noregex_info,
+     helper.replaced_words_info,
+     helper.replaced_words_noregex_info,
+     helper.replaced_offset_words_info,
+     helper.offset_words_info) = words
+    helper.compile_words()
+    titles = [case.get("title") for case in meta_cases if case.get("title")]
+    mismatches = 0
+    for title in titles:
+        if legacy_process(words, title) != helper.process(title):
+            mismatches += 1
+            print(f"结果不一致：{title}")
+    # 逐个处理依赖正则模块的内部缓存，识别词较多时缓存会被挤出，与实际运行情况一致
+    legacy_cost = timeit(lambda t: legacy_process(words, t), titles, rounds)
+    compiled_cost = timeit(helper.process, titles, rounds)
+    print(f"识别词数量：{sum(len(items) for items in words)}，标题数量：{len(titles)}，结果不一致：{mismatches}")
+    print(f"逐个处理：{legacy_cost:.1f} us/标题")
+    print(f"预编译处理：{compiled_cost:.1f} us/标题")
+    print(f"加速：{legacy_cost / max(compiled_cost, 1e-6):.1f}x")
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 500) else 0)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+刷流规则离线回测，使用tests/cases/brush中录制的RSS快照和种子状态时间线：
+按时间顺序回放RSS快照，用刷流任务的选种规则选种，再回放入选种子的状态时间线，用删种规则判断何时删除，
+统计各规则的淘汰/删除次数、规则判断的吞吐量，以及模拟的上传下载量、分享率和做种时间
+运行：python -m tests.simulate_brush [规则判断轮数]
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from app.helper import BrushRuleHelper
+
+BRUSH_PATH = os.path.join(os.path.dirname(__file__), "cases", "brush")
+
+# 不需要访问详情页面的选种规则
+BASIC_RULE_KEYS = ["size", "include", "exclude", "pubdate"]
+# 需要访问详情页面的选种规则
+ATTR_RULE_KEYS = ["free", "hr", "peercount"]
+
+
+def load_json(name):
+    with open(os.path.join(BRUSH_PATH, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_snapshots():
+    """
+    读取RSS快照，时间转换为datetime，按快照时间排序
+    """
+    snapshots = load_json("rss_snapshots.json")
+    for snapshot in snapshots:
+        snapshot["time"] = datetime.fromisoformat(snapshot["time"])
+        for item in snapshot["items"]:
+            item["pubdate"] = datetime.fromisoformat(item["pubdate"]) if item.get("pubdate") else None
+    return sorted(snapshots, key=lambda x: x["time"])
+
+
+def check_rss_item(rss_rule, item, now):
+    """
+    与刷流任务一致，先检查不需要访问详情页面的规则，再检查种子属性
+    """
+    return BrushRuleHelper.check_rss_rule(rss_rule=rss_rule,
+                                          title=item["title"],
+                                          torrent_size=item["size"],
+                                          pubdate=item["pubdate"],
+                                          now=now) \
+        and BrushRuleHelper.check_torrent_attr_rule(rss_rule=rss_rule,
+                                                    title=item["title"],
+                                                    torrent_attr=item["attr"])
+
+
+def get_rejected_rules(rss_rule, item, now):
+    """
+    逐条规则单独判断，返回不符合的规则
+    """
+    rejected = []
+    for key in BASIC_RULE_KEYS:
+        if rss_rule.get(key) and not BrushRuleHelper.check_rss_rule(rss_rule={key: rss_rule[key]},
+                                                                    title=item["title"],
+                                                                    torrent_size=item["size"],
+                                                                    pubdate=item["pubdate"],
+                                                                    now=now):
+            rejected.append(key)
+    for key in ATTR_RULE_KEYS:
+        if rss_rule.get(key) and not BrushRuleHelper.check_torrent_attr_rule(rss_rule={key: rss_rule[key]},
+                                                                            title=item["title"],
+                                                                            torrent_attr=item["attr"]):
+            rejected.append(key)
+    return rejected
+
+
+def get_state(timeline, offset):
+    """
+    种子在指定时间点的状态，取不晚于该时间点的最后一条记录
+    """
+    state = None
+    for point in timeline:
+        if point["offset"] > offset:
+            break
+        state = point
+    return state
+
+
+def get_remove_metrics(timeline, point):
+    """
+    与刷流任务删种检查中qBittorrent的计算方式一致，返回已完成的做种时间、分享率、上传量、
+    下载耗时、平均上传速度、未活动时间，下载中的种子做种时间、分享率、上传量为None
+    """
+    dltime = point["offset"]
+    avg_upspeed = int(point["uploaded"] / dltime) if dltime else 0
+    iatime = point["offset"] - point["last_activity"] if point["last_activity"] else 0
+    if point["progress"] < 1:
+        return None, None, None, dltime, avg_upspeed, iatime
+    date_done = next((p["offset"] for p in timeline if p["progress"] >= 1), 0)
+    seeding_time = point["offset"] - date_done
+    ratio = point["uploaded"] / point["downloaded"] if point["downloaded"] else 0
+    return seeding_time, ratio, point["uploaded"], None, avg_upspeed, iatime
+
+
+def check_remove(remove_rule, metrics):
+    seeding_time, ratio, uploaded, dltime, avg_upspeed, iatime = metrics
+    if seeding_time is None:
+        ret = BrushRuleHelper.check_remove_rule(remove_rule=remove_rule,
+                                                dltime=dltime,
+                                                avg_upspeed=avg_upspeed,
+                                                iatime=iatime)
+    else:
+        ret = BrushRuleHelper.check_remove_rule(remove_rule=remove_rule,
+                                                seeding_time=seeding_time,
+                                                ratio=ratio,
+                                                uploaded=uploaded,
+                                                avg_upspeed=avg_upspeed,
+                                                iatime=iatime)
+    # 未设置删种规则时只返回False
+    if not ret or not ret[0]:
+        return None
+    return ret[1]
+
+
+def replay(remove_rule, timeline, added):
+    """
+    回放种子状态时间线，逐个时间点检查删种规则，返回加入时间、删除时间、删除原因、最后的状态及做种时间
+    """
+    last_point = None
+    reason = None
+    for point in timeline:
+        last_point = point
+        # 刚加入时没有下载耗时，不检查
+        if not point["offset"]:
+            continue
+        reason = check_remove(remove_rule, get_remove_metrics(timeline, point))
+        if reason:
+            break
+    seeding_time = get_remove_metrics(timeline, last_point)[0] if last_point else None
+    return {
+        "added": added,
+        "deleted": added + last_point["offset"] if reason else None,
+        "reason": reason.value if reason else "未删除",
+        "last_point": last_point,
+        "seeding_time": seeding_time or 0
+    }
+
+
+def simulate(task, snapshots, timelines):
+    """
+    回放一个刷流任务，返回统计结果
+    """
+    rss_rule = task.get("rss_rule") or {}
+    remove_rule = task.get("remove_rule") or {}
+    max_dlcount = int(rss_rule.get("dlcount") or 0)
+    seed_size = float(task.get("seed_size") or 0) * 1024 ** 3
+    stats = {
+        "items": 0,
+        "duplicates": 0,
+        "accepted": 0,
+        "rejected": {},
+        "limited": 0,
+        "deleted": {},
+        "uploaded": 0,
+        "downloaded": 0,
+        "seeding_time": 0
+    }
+    seen = set()
+    # 下载链接 -> 回放结果
+    torrents = {}
+    start_time = snapshots[0]["time"]
+    end_offset = 0
+
+    def get_active(now_offset):
+        return [(enclosure, torrent) for enclosure, torrent in torrents.items()
+                if torrent["deleted"] is None or torrent["deleted"] > now_offset]
+
+    for snapshot in snapshots:
+        now = snapshot["time"]
+        now_offset = (now - start_time).total_seconds()
+        for item in snapshot["items"]:
+            stats["items"] += 1
+            if item["enclosure"] in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(item["enclosure"])
+            if not check_rss_item(rss_rule, item, now):
+                for key in get_rejected_rules(rss_rule, item, now):
+                    stats["rejected"][key] = stats["rejected"].get(key, 0) + 1
+                continue
+            active = get_active(now_offset)
+            if max_dlcount:
+                downloading = 0
+                for enclosure, torrent in active:
+                    state = get_state(timelines.get(enclosure) or [], now_offset - torrent["added"])
+                    if state and state["progress"] < 1:
+                        downloading += 1
+                if downloading >= max_dlcount:
+                    stats["limited"] += 1
+                    continue
+            if seed_size and sum(torrent["size"] for _, torrent in active) + item["size"] > seed_size:
+                stats["limited"] += 1
+                continue
+            stats["accepted"] += 1
+            torrents[item["enclosure"]] = replay(remove_rule, timelines.get(item["enclosure"]) or [], now_offset)
+            torrents[item["enclosure"]]["size"] = item["size"]
+
+    for torrent in torrents.values():
+        stats["deleted"][torrent["reason"]] = stats["deleted"].get(torrent["reason"], 0) + 1
+        point = torrent["last_point"]
+        if point:
+            stats["uploaded"] += point["uploaded"]
+            stats["downloaded"] += point["downloaded"]
+            stats["seeding_time"] += torrent["seeding_time"]
+            end_offset = max(end_offset, torrent["added"] + point["offset"])
+    stats["hours"] = end_offset / 3600
+    return stats
+
+
+def measure(tasks, snapshots, timelines, rounds):
+    """
+    重复执行选种和删种规则判断，返回每秒判断次数
+    """
+    items = [item for snapshot in snapshots for item in snapshot["items"]]
+    points = [(timeline, point) for timeline in timelines.values() for point in timeline if point["offset"]]
+    metrics = [get_remove_metrics(timeline, point) for timeline, point in points]
+    start_time = time.perf_counter()
+    count = 0
+    for _ in range(rounds):
+        for task in tasks:
+            rss_rule = task.get("rss_rule") or {}
+            remove_rule = task.get("remove_rule") or {}
+            for snapshot in snapshots:
+                for item in snapshot["items"]:
+                    check_rss_item(rss_rule, item, snapshot["time"])
+            for metric in metrics:
+                check_remove(remove_rule, metric)
+            count += len(items) + len(metrics)
+    cost = time.perf_counter() - start_time
+    return count / cost if cost else 0
+
+
+def main(rounds=20):
+    snapshots = load_snapshots()
+    timelines = load_json("torrent_timelines.json")
+    tasks = load_json("tasks.json")
+    if not snapshots or not tasks:
+        print("没有回测数据")
+        return 1
+    for task in tasks:
+        stats = simulate(task, snapshots, timelines)
+        ratio = stats["uploaded"] / stats["downloaded"] if stats["downloaded"] else 0
+        avg_seeding = stats["seeding_time"] / stats["accepted"] / 3600 if stats["accepted"] else 0
+        print(f"{task.get('name')}：RSS条目 {stats['items']}，重复 {stats['duplicates']}，"
+              f"入选 {stats['accepted']}，超出下载数/保种体积 {stats['limited']}，回放 {stats['hours']:.0f} 小时")
+        print(f"  选种淘汰：{'，'.join(f'{k} {v}' for k, v in stats['rejected'].items()) or '无'}")
+        print(f"  删种：{'，'.join(f'{k} {v}' for k, v in stats['deleted'].items()) or '无'}")
+        print(f"  上传 {stats['uploaded'] / 1024 ** 3:.1f} GB，下载 {stats['downloaded'] / 1024 ** 3:.1f} GB，"
+              f"分享率 {ratio:.2f}，平均做种 {avg_seeding:.1f} 小时")
+    speed = measure(tasks, snapshots, timelines, rounds)
+    print(f"规则判断：{speed:.0f} 次/秒（{rounds} 轮）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
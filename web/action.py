@@ -6,6 +6,9 @@ import os.path
 import re
 import shutil
 import signal
+import threading
+import time
+from html import escape
 from math import floor
 from urllib.parse import unquote
 
@@ -22,7 +25,7 @@ from app.downloader.client import Qbittorrent, Transmission
 from app.filetransfer import FileTransfer
 from app.filter import Filter
 from app.helper import DbHelper, ProgressHelper, ThreadHelper, \
-    MetaHelper, DisplayHelper, WordsHelper, CookieCloudHelper
+    MetaHelper, DisplayHelper, WordsHelper, CookieCloudHelper, TmdbCacheHelper, RssHelper
 from app.indexer import Indexer
 from app.media import Category, Media, Bangumi, DouBan
 from app.media.meta import MetaInfo, MetaBase
@@ -49,6 +52,9 @@ from web.backend.web_utils import WebUtils
 class WebAction:
     dbhelper = None
     _actions = {}
+    # 检索会话标识 -> 分组后的检索结果
+    _search_views = {}
+    _search_views_lock = threading.Lock()
     TvTypes = ['TV', '电视剧']
 
     def __init__(self):
@@ -450,7 +456,8 @@ class WebAction:
                                                  ident_flag=ident_flag,
                                                  filters=filters,
                                                  tmdbid=tmdbid,
-                                                 media_type=media_type)
+                                                 media_type=media_type,
+                                                 session=WebAction.__get_search_session())
             if ret != 0:
                 return {"code": ret, "msg": ret_msg}
         return {"code": 0}
@@ -988,32 +995,18 @@ class WebAction:
         """
         查询实时日志
         """
-        log_list = []
-        refresh_new = data.get('refresh_new')
-        source = data.get('source')
-
-        if not source:
-            if not refresh_new:
-                log_list = list(log.LOG_QUEUE)
-            elif log.LOG_INDEX:
-                if log.LOG_INDEX > len(list(log.LOG_QUEUE)):
-                    log_list = list(log.LOG_QUEUE)
-                else:
-                    log_list = list(log.LOG_QUEUE)[-log.LOG_INDEX:]
-            log.LOG_INDEX = 0
-        else:
-            queue_logs = list(log.LOG_QUEUE)
-            for message in queue_logs:
-                if str(message.get("source")) == source:
-                    log_list.append(message)
-                else:
-                    continue
-
-            if refresh_new:
-                if int(refresh_new) < len(log_list):
-                    log_list = log_list[int(refresh_new):]
-                elif int(refresh_new) >= len(log_list):
-                    log_list = []
+        # 增量刷新时只返回序号大于last_id的日志，否则返回全部日志
+        last_id = data.get('last_id') if str(data.get('refresh_new') or 0) == "1" else 0
+        log_list = log.get_logs(source=data.get('source'),
+                                level=data.get('level'),
+                                last_id=int(last_id) if last_id else 0)
+        log_list = [{
+            "id": message.get("id"),
+            "time": time.strftime('%H:%M:%S', time.localtime(message.get("time"))),
+            "level": message.get("level"),
+            "source": escape(message.get("source")),
+            "text": escape(message.get("text"))
+        } for message in log_list]
         return {"loglist": log_list}
 
     @staticmethod
@@ -1900,6 +1893,7 @@ class WebAction:
         """
         self.dbhelper.truncate_rss_history()
         self.dbhelper.truncate_rss_episodes()
+        RssHelper().reset()
         return {"code": 0}
 
     def __add_brushtask(self, data):
@@ -2575,7 +2569,7 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
-            os.remove(MetaHelper().get_meta_data_path())
+            TmdbCacheHelper().clear()
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             return {"code": 0, "msg": str(e)}
@@ -3463,111 +3457,196 @@ class WebAction:
 
     def get_search_result(self, data=None):
         """
-        查询所有搜索结果
+        查询检索会话的搜索结果，分组结果缓存在内存中，有新写入的记录时只合并新记录
+        :param data: session为消息中的检索会话标识，为空时查询当前登录用户WEB检索的结果
+        """
+        session = self.__get_search_session((data or {}).get("session"))
+        generation, max_id = self.dbhelper.get_search_state(session)
+        with self._search_views_lock:
+            view = self._search_views.get(session)
+            # 结果被清除过，重新分组
+            if not view or view.get("generation") != generation:
+                view = {
+                    "generation": generation,
+                    "max_id": 0,
+                    "total": 0,
+                    "results": {},
+                    "sorted": {}
+                }
+                self._search_views[session] = view
+            if view.get("max_id") < max_id:
+                for item in self.dbhelper.get_search_results(session=session, min_id=view.get("max_id")):
+                    self.__merge_search_result(view.get("results"), item)
+                    view["total"] += 1
+                    view["max_id"] = max(view.get("max_id"), item.ID)
+                view["sorted"] = self.__sort_search_results(view.get("results"))
+            return {"code": 0, "total": view.get("total"), "result": view.get("sorted")}
+
+    @staticmethod
+    def __get_search_session(session=None):
         """
-        SearchResults = {}
-        res = self.dbhelper.get_search_results()
-        total = len(res)
-        for item in res:
-            # 质量(来源、效果)、分辨率
-            if item.RES_TYPE:
-                try:
-                    res_mix = json.loads(item.RES_TYPE)
-                except Exception as err:
-                    ExceptionUtils.exception_traceback(err)
-                    continue
-                respix = res_mix.get("respix") or ""
-                video_encode = res_mix.get("video_encode") or ""
-                restype = res_mix.get("restype") or ""
-                reseffect = res_mix.get("reseffect") or ""
-            else:
-                restype = ""
-                respix = ""
-                reseffect = ""
-                video_encode = ""
-            # 分组标识 (来源，分辨率)
-            group_key = re.sub(r"[-.\s@|]", "", f"{respix}_{restype}").lower()
-            # 分组信息
-            group_info = {
-                "respix": respix,
-                "restype": restype,
-            }
-            # 种子唯一标识 （大小，质量(来源、效果)，制作组组成）
-            unique_key = re.sub(r"[-.\s@|]", "",
-                                f"{respix}_{restype}_{video_encode}_{reseffect}_{item.SIZE}_{item.OTHERINFO}").lower()
-            # 标识信息
-            unique_info = {
-                "video_encode": video_encode,
-                "size": item.SIZE,
-                "reseffect": reseffect,
-                "releasegroup": item.OTHERINFO
-            }
-            # 结果
-            title_string = f"{item.TITLE}"
-            if item.YEAR:
-                title_string = f"{title_string} ({item.YEAR})"
-            # 电视剧季集标识
-            mtype = item.TYPE or ""
-            SE_key = item.ES_STRING if item.ES_STRING and mtype != "MOV" else "MOV"
-            media_type = {"MOV": "电影", "TV": "电视剧", "ANI": "动漫"}.get(mtype)
-            # 种子信息
-            torrent_item = {
-                "id": item.ID,
-                "seeders": item.SEEDERS,
-                "enclosure": item.ENCLOSURE,
-                "site": item.SITE,
-                "torrent_name": item.TORRENT_NAME,
-                "description": item.DESCRIPTION,
-                "pageurl": item.PAGEURL,
-                "uploadvalue": item.UPLOAD_VOLUME_FACTOR,
-                "downloadvalue": item.DOWNLOAD_VOLUME_FACTOR,
-                "size": item.SIZE,
-                "respix": respix,
-                "restype": restype,
-                "reseffect": reseffect,
-                "releasegroup": item.OTHERINFO,
-                "video_encode": video_encode
-            }
-            # 促销
-            free_item = {
-                "value": f"{item.UPLOAD_VOLUME_FACTOR} {item.DOWNLOAD_VOLUME_FACTOR}",
-                "name": MetaBase.get_free_string(item.UPLOAD_VOLUME_FACTOR, item.DOWNLOAD_VOLUME_FACTOR)
-            }
-            # 季
-            filter_season = SE_key.split()[0] if SE_key and SE_key not in [
-                "MOV", "TV"] else None
-            # 合并搜索结果
-            if SearchResults.get(title_string):
-                # 种子列表
-                result_item = SearchResults[title_string]
-                torrent_dict = SearchResults[title_string].get("torrent_dict")
-                SE_dict = torrent_dict.get(SE_key)
-                if SE_dict:
-                    group = SE_dict.get(group_key)
-                    if group:
-                        unique = group.get("group_torrents").get(unique_key)
-                        if unique:
-                            unique["torrent_list"].append(torrent_item)
-                            group["group_total"] += 1
-                        else:
-                            group["group_total"] += 1
-                            group.get("group_torrents")[unique_key] = {
+        检索会话标识，消息渠道的检索结果从消息链接中的会话标识打开，WEB检索按登录用户区分
+        :param session: 消息链接中的检索会话标识，不能查询其它用户WEB检索的结果
+        """
+        web_prefix = DbHelper.get_search_session(SearchType.WEB)
+        if session and not session.startswith(web_prefix):
+            return session
+        try:
+            user_name = current_user.username if current_user.is_authenticated else None
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            user_name = None
+        return DbHelper.get_search_session(SearchType.WEB, user_name)
+
+    @staticmethod
+    def __merge_search_result(SearchResults, item):
+        """
+        将一条检索结果按标题、季集、分组、种子唯一标识合并到分组结果中
+        """
+        # 质量(来源、效果)、分辨率
+        if item.RES_TYPE:
+            try:
+                res_mix = json.loads(item.RES_TYPE)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                return
+            respix = res_mix.get("respix") or ""
+            video_encode = res_mix.get("video_encode") or ""
+            restype = res_mix.get("restype") or ""
+            reseffect = res_mix.get("reseffect") or ""
+        else:
+            restype = ""
+            respix = ""
+            reseffect = ""
+            video_encode = ""
+        # 分组标识 (来源，分辨率)
+        group_key = re.sub(r"[-.\s@|]", "", f"{respix}_{restype}").lower()
+        # 分组信息
+        group_info = {
+            "respix": respix,
+            "restype": restype,
+        }
+        # 种子唯一标识 （大小，质量(来源、效果)，制作组组成）
+        unique_key = re.sub(r"[-.\s@|]", "",
+                            f"{respix}_{restype}_{video_encode}_{reseffect}_{item.SIZE}_{item.OTHERINFO}").lower()
+        # 标识信息
+        unique_info = {
+            "video_encode": video_encode,
+            "size": item.SIZE,
+            "reseffect": reseffect,
+            "releasegroup": item.OTHERINFO
+        }
+        # 结果
+        title_string = f"{item.TITLE}"
+        if item.YEAR:
+            title_string = f"{title_string} ({item.YEAR})"
+        # 电视剧季集标识
+        mtype = item.TYPE or ""
+        SE_key = item.ES_STRING if item.ES_STRING and mtype != "MOV" else "MOV"
+        media_type = {"MOV": "电影", "TV": "电视剧", "ANI": "动漫"}.get(mtype)
+        # 种子信息
+        torrent_item = {
+            "id": item.ID,
+            "seeders": item.SEEDERS,
+            "enclosure": item.ENCLOSURE,
+            "site": item.SITE,
+            "torrent_name": item.TORRENT_NAME,
+            "description": item.DESCRIPTION,
+            "pageurl": item.PAGEURL,
+            "uploadvalue": item.UPLOAD_VOLUME_FACTOR,
+            "downloadvalue": item.DOWNLOAD_VOLUME_FACTOR,
+            "size": item.SIZE,
+            "respix": respix,
+            "restype": restype,
+            "reseffect": reseffect,
+            "releasegroup": item.OTHERINFO,
+            "video_encode": video_encode
+        }
+        # 促销
+        free_item = {
+            "value": f"{item.UPLOAD_VOLUME_FACTOR} {item.DOWNLOAD_VOLUME_FACTOR}",
+            "name": MetaBase.get_free_string(item.UPLOAD_VOLUME_FACTOR, item.DOWNLOAD_VOLUME_FACTOR)
+        }
+        # 季
+        filter_season = SE_key.split()[0] if SE_key and SE_key not in [
+            "MOV", "TV"] else None
+        # 合并搜索结果
+        if SearchResults.get(title_string):
+            # 种子列表
+            result_item = SearchResults[title_string]
+            torrent_dict = SearchResults[title_string].get("torrent_dict")
+            SE_dict = torrent_dict.get(SE_key)
+            if SE_dict:
+                group = SE_dict.get(group_key)
+                if group:
+                    unique = group.get("group_torrents").get(unique_key)
+                    if unique:
+                        unique["torrent_list"].append(torrent_item)
+                        group["group_total"] += 1
+                    else:
+                        group["group_total"] += 1
+                        group.get("group_torrents")[unique_key] = {
+                            "unique_info": unique_info,
+                            "torrent_list": [torrent_item]
+                        }
+                else:
+                    SE_dict[group_key] = {
+                        "group_info": group_info,
+                        "group_total": 1,
+                        "group_torrents": {
+                            unique_key: {
                                 "unique_info": unique_info,
                                 "torrent_list": [torrent_item]
                             }
-                    else:
-                        SE_dict[group_key] = {
-                            "group_info": group_info,
-                            "group_total": 1,
-                            "group_torrents": {
-                                unique_key: {
-                                    "unique_info": unique_info,
-                                    "torrent_list": [torrent_item]
-                                }
+                        }
+                    }
+            else:
+                torrent_dict[SE_key] = {
+                    group_key: {
+                        "group_info": group_info,
+                        "group_total": 1,
+                        "group_torrents": {
+                            unique_key: {
+                                "unique_info": unique_info,
+                                "torrent_list": [torrent_item]
                             }
                         }
-                else:
-                    torrent_dict[SE_key] = {
+                    }
+                }
+            # 过滤条件
+            torrent_filter = dict(result_item.get("filter"))
+            if free_item not in torrent_filter.get("free"):
+                torrent_filter["free"].append(free_item)
+            if item.SITE not in torrent_filter.get("site"):
+                torrent_filter["site"].append(item.SITE)
+            if video_encode \
+                    and video_encode not in torrent_filter.get("video"):
+                torrent_filter["video"].append(video_encode)
+            if filter_season \
+                    and filter_season not in torrent_filter.get("season"):
+                torrent_filter["season"].append(filter_season)
+        else:
+            # 是否已存在
+            if item.TMDBID:
+                exist_flag = MediaServer().check_item_exists(
+                    title=item.TITLE, year=item.YEAR, tmdbid=item.TMDBID)
+            else:
+                exist_flag = False
+            SearchResults[title_string] = {
+                "key": item.ID,
+                "title": item.TITLE,
+                "year": item.YEAR,
+                "type_key": mtype,
+                "image": item.IMAGE,
+                "type": media_type,
+                "vote": item.VOTE,
+                "tmdbid": item.TMDBID,
+                "backdrop": item.IMAGE,
+                "poster": item.POSTER,
+                "overview": item.OVERVIEW,
+                "exist": exist_flag,
+                "torrent_dict": {
+                    SE_key: {
                         group_key: {
                             "group_info": group_info,
                             "group_total": 1,
@@ -3579,60 +3658,20 @@ class WebAction:
                             }
                         }
                     }
-                # 过滤条件
-                torrent_filter = dict(result_item.get("filter"))
-                if free_item not in torrent_filter.get("free"):
-                    torrent_filter["free"].append(free_item)
-                if item.SITE not in torrent_filter.get("site"):
-                    torrent_filter["site"].append(item.SITE)
-                if video_encode \
-                        and video_encode not in torrent_filter.get("video"):
-                    torrent_filter["video"].append(video_encode)
-                if filter_season \
-                        and filter_season not in torrent_filter.get("season"):
-                    torrent_filter["season"].append(filter_season)
-            else:
-                # 是否已存在
-                if item.TMDBID:
-                    exist_flag = MediaServer().check_item_exists(
-                        title=item.TITLE, year=item.YEAR, tmdbid=item.TMDBID)
-                else:
-                    exist_flag = False
-                SearchResults[title_string] = {
-                    "key": item.ID,
-                    "title": item.TITLE,
-                    "year": item.YEAR,
-                    "type_key": mtype,
-                    "image": item.IMAGE,
-                    "type": media_type,
-                    "vote": item.VOTE,
-                    "tmdbid": item.TMDBID,
-                    "backdrop": item.IMAGE,
-                    "poster": item.POSTER,
-                    "overview": item.OVERVIEW,
-                    "exist": exist_flag,
-                    "torrent_dict": {
-                        SE_key: {
-                            group_key: {
-                                "group_info": group_info,
-                                "group_total": 1,
-                                "group_torrents": {
-                                    unique_key: {
-                                        "unique_info": unique_info,
-                                        "torrent_list": [torrent_item]
-                                    }
-                                }
-                            }
-                        }
-                    },
-                    "filter": {
-                        "site": [item.SITE],
-                        "free": [free_item],
-                        "video": [video_encode] if video_encode else [],
-                        "season": [filter_season] if filter_season else []
-                    }
+                },
+                "filter": {
+                    "site": [item.SITE],
+                    "free": [free_item],
+                    "video": [video_encode] if video_encode else [],
+                    "season": [filter_season] if filter_season else []
                 }
+            }
 
+    @staticmethod
+    def __sort_search_results(SearchResults):
+        """
+        按季集排序分组结果，不改变分组结果本身
+        """
         # 提升整季的顺序到顶层
         def se_sort(k):
             k = re.sub(r" +|(?<=s\d)\D*?(?=e)|(?<=s\d\d)\D*?(?=e)",
@@ -3640,14 +3679,15 @@ class WebAction:
             return (k[0], k[1]) if len(k) > 1 else ("Z" + k[0], "ZZZ")
 
         # 开始排序季集顺序
+        SortedResults = {}
         for title, item in SearchResults.items():
             # 排序筛选器 季
             item["filter"]["season"].sort(reverse=True)
             # 排序种子列 集
-            item["torrent_dict"] = sorted(item["torrent_dict"].items(),
-                                          key=se_sort,
-                                          reverse=True)
-        return {"code": 0, "total": total, "result": SearchResults}
+            SortedResults[title] = dict(item, torrent_dict=sorted(item["torrent_dict"].items(),
+                                                                  key=se_sort,
+                                                                  reverse=True))
+        return SortedResults
 
     @staticmethod
     def search_media_infos(data):
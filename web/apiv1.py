@@ -835,7 +835,11 @@ class LibrarySpace(ClientResource):
 @system.route('/logging')
 class SystemLogging(ClientResource):
     parser = reqparse.RequestParser()
-    parser.add_argument('refresh_new', type=int, help='是否刷新增量日志（0-否/1-是）', location='form', required=True)
+    parser.add_argument('refresh_new', type=int, help='是否刷新增量日志（0-否，返回全部日志/1-是，只返回序号大于last_id的日志）',
+                        location='form', required=True)
+    parser.add_argument('source', type=str, help='来源', location='form')
+    parser.add_argument('level', type=str, help='最低级别（INFO/WARN/ERROR）', location='form')
+    parser.add_argument('last_id', type=int, help='已获取的最后一条日志序号，即上次返回的最后一条日志的id', location='form')
 
     @system.doc(parser=parser)
     def post(self):
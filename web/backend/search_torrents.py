@@ -1,5 +1,6 @@
 import os.path
 import re
+from urllib.parse import quote
 
 import log
 from app.downloader import Downloader
@@ -11,7 +12,7 @@ from app.message import Message
 from app.searcher import Searcher
 from app.sites import Sites
 from app.subscribe import Subscribe
-from app.utils import StringUtils, Torrent
+from app.utils import StringUtils, Torrent, TorrentCache
 from app.utils.types import SearchType, IndexerType
 from config import Config
 from web.backend.web_utils import WebUtils
@@ -20,7 +21,7 @@ SEARCH_MEDIA_CACHE = {}
 SEARCH_MEDIA_TYPE = {}
 
 
-def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None):
+def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None, session=""):
     """
     WEB资源搜索
     :param content: 关键字文本，可以包括 类型、标题、季、集、年份等信息，使用 空格分隔，也支持种子的命名格式
@@ -28,6 +29,7 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
     :param filters: 其它过滤条件
     :param tmdbid: TMDBID或DB:豆瓣ID
     :param media_type: 媒体类型，配合tmdbid传入
+    :param session: 检索会话标识，检索结果按会话保存
     :return: 错误码，错误原因，成功时直接插入数据库
     """
     mtype, key_word, season_num, episode_num, year, content = StringUtils.get_keyword_from_string(content)
@@ -128,12 +130,23 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
     # 整合高级查询条件
     if filters:
         filter_args.update(filters)
+    # 清空本会话的缓存结果，检索过程中每个站点返回后即写入，便于页面展示部分结果
+    dbhepler = DbHelper()
+    dbhepler.delete_search_results(session=session)
+
+    def __insert_site_results(_, site_results):
+        dbhepler.insert_search_results(media_items=site_results,
+                                       ident_flag=ident_flag,
+                                       title=content,
+                                       session=session)
+
     # 开始检索
     log.info("【Web】开始检索 %s ..." % content)
     media_list = Searcher().search_medias(key_word=first_search_name,
                                           filter_args=filter_args,
                                           match_media=media_info,
-                                          in_from=SearchType.WEB)
+                                          in_from=SearchType.WEB,
+                                          callback=__insert_site_results)
     # 使用第二名称重新搜索
     if ident_flag \
             and len(media_list) == 0 \
@@ -146,10 +159,10 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
         media_list = Searcher().search_medias(key_word=second_search_name,
                                               filter_args=filter_args,
                                               match_media=media_info,
-                                              in_from=SearchType.WEB)
-    # 清空缓存结果
-    dbhepler = DbHelper()
-    dbhepler.delete_all_search_torrents()
+                                              in_from=SearchType.WEB,
+                                              callback=__insert_site_results)
+    # 清空部分结果，按排序重新写入
+    dbhepler.delete_search_results(session=session)
     # 结束进度
     search_process.end('search')
     if len(media_list) == 0:
@@ -163,7 +176,8 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
                                                                   str(x.seeders).rjust(10, '0')), reverse=True)
         dbhepler.insert_search_results(media_items=media_list,
                                        ident_flag=ident_flag,
-                                       title=content)
+                                       title=content,
+                                       session=session)
         return 0, ""
 
 
@@ -272,8 +286,12 @@ def search_media_by_message(input_str, in_from: SearchType, user_id, user_name=N
                         upload_volume_factor=1
                     )
                 else:
-                    # 识别文件名
-                    filename = os.path.basename(filepath)
+                    # 识别种子名称，种子文件按Hash缓存时文件名不是种子名称
+                    cache_info = TorrentCache().get(input_str)
+                    if cache_info and cache_info.get("name"):
+                        filename = cache_info.get("name")
+                    else:
+                        filename = os.path.basename(filepath)
                     # 识别
                     meta_info = Media().get_media_info(title=filename)
                     meta_info.set_torrent_info(
@@ -443,7 +461,8 @@ def __search_media(in_from, media_info, user_id, user_name=None):
             Message().send_channel_msg(channel=in_from,
                                        title="%s 共搜索到%s个资源，点击选择下载" % (media_info.title, search_count),
                                        image=media_info.get_message_image(),
-                                       url="search",
+                                       url="search?session=%s" % quote(
+                                           DbHelper.get_search_session(in_from, user_name), safe=""),
                                        user_id=user_id)
             return
         else:
@@ -247,7 +247,7 @@ def search():
     else:
         pris = ""
     # 结果
-    res = WebAction().get_search_result()
+    res = WebAction().get_search_result({"session": request.args.get("session")})
     SearchResults = res.get("result")
     Count = res.get("total")
     return render_template("search.html",